@@ -0,0 +1,360 @@
+# benchmarks/run.py
+"""
+Pipeline benchmarks on deterministic synthetic data.
+
+    python -m benchmarks.run                          # default scenarios
+    python -m benchmarks.run --scenario 5000x5y       # one scenario
+    python -m benchmarks.run --update-baseline        # store results as baseline
+
+Each stage is timed (best of --repeat runs) and, unless --no-memory, run once
+more under tracemalloc for its peak allocation. The processed data is also
+stored once per daily_metrics storage schema to report database size and the
+time to read every ticker's history back (the scan stages). Results are
+written as JSON and compared with benchmarks/baseline.json; the run exits with
+status 1 when a stage is slower or uses more memory than the baseline by more
+than --max-regression percent.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_RESULTS = BENCH_DIR / "results.json"
+
+
+@dataclass
+class Scenario:
+    tickers: int
+    bars: Optional[int]  # None: IPO-length histories
+    description: str
+
+
+SCENARIOS = {
+    "1x20y": Scenario(1, 20 * 252, "one ticker, 20 years"),
+    "500x5y": Scenario(500, 5 * 252, "500 tickers, 5 years"),
+    "5000x5y": Scenario(5000, 5 * 252, "5,000 tickers, 5 years"),
+    "ipo": Scenario(500, None, "500 tickers with 5-252 bar histories"),
+}
+
+DEFAULT_SCENARIOS = ["1x20y", "500x5y", "ipo"]
+
+STAGES = [
+    "fetch",
+    "process",
+    "panel",
+    "signals",
+    "save",
+    "save_compact",
+    "scan",
+    "scan_compact",
+    "scan_columns",
+    "end_to_end",
+]
+
+
+def build_stages(
+    scenario: Scenario, workdir: Path
+) -> Tuple[Dict[str, Callable[[], int]], Dict[str, Any]]:
+    """
+    One callable per stage, each returning the number of rows it handled, and
+    the database size per storage schema. Inputs for later stages are prepared
+    once up front so every stage is timed on its own.
+    """
+    from src.column_store import ColumnStore
+    from src.data_fetcher import fetch_stock_data
+    from src.database import init_db, load_price_history, save_ticker_results
+    from src.pipeline import run_universe
+    from src.panel import process_panel
+    from src.processor import process_data
+    from src.signals import DEFAULT_RULES, SignalRule, evaluate_rules
+    from src.synthetic import SyntheticProvider, ipo_lengths, synthetic_universe
+
+    tickers = synthetic_universe(scenario.tickers)
+    if scenario.bars is None:
+        provider = SyntheticProvider(lengths=ipo_lengths(tickers))
+    else:
+        provider = SyntheticProvider(bars=scenario.bars)
+    rules = DEFAULT_RULES + [
+        SignalRule(
+            "drawdown_20pct",
+            "threshold",
+            column="pct_from_52w_high",
+            level=-20,
+            direction="below",
+        ),
+        SignalRule("new_52w_high", "new_high", column="close", high="week52_high"),
+    ]
+
+    raws = {t: fetch_stock_data(t, provider=provider) for t in tickers}
+    processed = {t: process_data(raw) for t, raw in raws.items()}
+    events = {t: evaluate_rules(df, rules, t) for t, df in processed.items()}
+    rows = sum(len(df) for df in processed.values())
+    pragmas = {"journal_mode": "WAL", "synchronous": "NORMAL"}
+    runs = {"n": 0}
+
+    def fresh_db(schema: str = "numeric"):
+        runs["n"] += 1
+        return init_db(str(workdir / f"bench_{runs['n']}.db"), pragmas, schema)
+
+    # One stored copy per schema for the size report and the scan stages
+    stored, storage = {}, {}
+    for schema in ("numeric", "compact"):
+        path = workdir / f"stored_{schema}.db"
+        engine = init_db(str(path), pragmas, schema)
+        for t in tickers:
+            save_ticker_results(engine, processed[t], events[t])
+        engine.dispose()
+        stored[schema] = path
+        size = os.path.getsize(path)
+        storage[schema] = {
+            "db_mb": round(size / 2**20, 2),
+            "bytes_per_row": round(size / rows, 1),
+        }
+    columns = ColumnStore(str(workdir / "stored.columns"))
+    for t in tickers:
+        columns.write(processed[t])
+    columns.flush()
+
+    def fetch():
+        for t in tickers:
+            fetch_stock_data(t, provider=provider)
+        return rows
+
+    def process():
+        for raw in raws.values():
+            process_data(raw)
+        return rows
+
+    def panel():
+        items = list(raws.items())
+        for i in range(0, len(items), 500):
+            process_panel(dict(items[i : i + 500]))
+        return rows
+
+    def signals():
+        for t, df in processed.items():
+            evaluate_rules(df, rules, t)
+        return rows
+
+    def save(schema: str = "numeric"):
+        engine = fresh_db(schema)
+        for t in tickers:
+            save_ticker_results(engine, processed[t], events[t])
+        engine.dispose()
+        return rows
+
+    def scan(schema: str = "numeric"):
+        engine = init_db(str(stored[schema]), pragmas, schema)
+        scanned = sum(len(load_price_history(engine, t)) for t in tickers)
+        engine.dispose()
+        return scanned
+
+    def scan_columns():
+        store = ColumnStore(str(workdir / "stored.columns"))
+        scanned = 0
+        for t in tickers:
+            series = store.price_series(t)
+            # Sum the closes so the pages are actually read, not just mapped
+            series.close.sum()
+            scanned += len(series)
+        return scanned
+
+    def end_to_end():
+        engine = fresh_db()
+        for ticker, result, error in run_universe(
+            tickers, provider=provider, rules=rules
+        ):
+            if error is not None:
+                raise error
+            save_ticker_results(engine, result["processed"], result["signal_events"])
+        engine.dispose()
+        return rows
+
+    stages = {
+        "fetch": fetch,
+        "process": process,
+        "panel": panel,
+        "signals": signals,
+        "save": save,
+        "save_compact": lambda: save("compact"),
+        "scan": scan,
+        "scan_compact": lambda: scan("compact"),
+        "scan_columns": scan_columns,
+        "end_to_end": end_to_end,
+    }
+    return stages, storage
+
+
+def measure(fn: Callable[[], int], repeat: int, memory: bool) -> Dict[str, Any]:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    result = {
+        "seconds": round(best, 4),
+        "rows": rows,
+        "rows_per_sec": round(rows / best) if best else None,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_scenario(
+    name: str, repeat: int = 3, memory: bool = True, stages: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    scenario = SCENARIOS[name]
+    with tempfile.TemporaryDirectory() as tmp:
+        stage_fns, storage = build_stages(scenario, Path(tmp))
+        for schema, size in storage.items():
+            print(
+                f"  {name:>8} {schema + ' db':<11} {size['db_mb']:>8.2f}MB "
+                f"({size['bytes_per_row']:.0f} bytes/row)",
+                flush=True,
+            )
+        results = {}
+        for stage in stages or STAGES:
+            results[stage] = measure(stage_fns[stage], repeat, memory)
+            print(
+                f"  {name:>8} {stage:<11} {results[stage]['seconds']:>9.3f}s",
+                flush=True,
+            )
+    return {
+        "tickers": scenario.tickers,
+        "description": scenario.description,
+        "storage": storage,
+        "stages": results,
+    }
+
+
+def compare(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    max_regression: float,
+    min_seconds: float = 0.05,
+) -> List[str]:
+    """
+    Stage metrics that got worse than the baseline by more than `max_regression`
+    percent. Stages faster than `min_seconds` in the baseline are too noisy to
+    judge on time and are only checked for memory.
+    """
+    limit = 1 + max_regression / 100
+    regressions = []
+    for name, scenario in results.get("scenarios", {}).items():
+        base_stages = baseline.get("scenarios", {}).get(name, {}).get("stages", {})
+        for stage, current in scenario["stages"].items():
+            base = base_stages.get(stage)
+            if base is None:
+                continue
+            metrics = ["peak_mb"]
+            if base["seconds"] >= min_seconds:
+                metrics.append("seconds")
+            for metric in metrics:
+                if metric not in base or metric not in current:
+                    continue
+                if current[metric] > base[metric] * limit:
+                    change = (current[metric] / base[metric] - 1) * 100
+                    regressions.append(
+                        f"{name}/{stage} {metric}: {base[metric]} -> "
+                        f"{current[metric]} (+{change:.0f}%)"
+                    )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=list(SCENARIOS),
+        help=f"Scenario to run; repeatable (default: {', '.join(DEFAULT_SCENARIOS)})",
+    )
+    parser.add_argument("--stage", action="append", choices=STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--output", default=str(DEFAULT_RESULTS))
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=25.0,
+        help="Allowed slowdown / memory growth per stage, in percent",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Merge these results into the baseline instead of comparing",
+    )
+    args = parser.parse_args(argv)
+
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "scenarios": {},
+    }
+    for name in args.scenario or DEFAULT_SCENARIOS:
+        print(f"Running {name}: {SCENARIOS[name].description}", flush=True)
+        results["scenarios"][name] = run_scenario(
+            name, args.repeat, not args.no_memory, args.stage
+        )
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    baseline_path = Path(args.baseline)
+    baseline = {}
+    if baseline_path.exists():
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        # Merge per stage, so a run of selected stages keeps the others
+        scenarios = baseline.get("scenarios", {})
+        for name, scenario in results["scenarios"].items():
+            stages = {**scenarios.get(name, {}).get("stages", {}), **scenario["stages"]}
+            scenarios[name] = {**scenario, "stages": stages}
+        baseline = {
+            **baseline,
+            **{k: v for k, v in results.items() if k != "scenarios"},
+            "scenarios": scenarios,
+        }
+        with open(baseline_path, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline updated: {baseline_path}")
+        return 0
+
+    if not baseline:
+        print("No baseline to compare against")
+        return 0
+    regressions = compare(results, baseline, args.max_regression)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        return 1
+    print(f"No stage regressed by more than {args.max_regression:g}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+# src/api.py
+"""
+Read-only HTTP API over the database, for dashboards.
+
+    GET /health
+    GET /tickers
+    GET /latest               [?tickers=AAPL,MSFT]
+    GET /latest/<ticker>
+    GET /metrics/<ticker>     [?start=YYYY-MM-DD&end=YYYY-MM-DD&columns=close,sma_50]
+    GET /signals              [?type=golden_crossover&start=...&end=...]
+    GET /signals/<ticker>     [?type=...&start=...&end=...]
+
+Responses are JSON. Each one depends on a data version: the ticker's entry
+in ticker_versions, or the database's newest version for cross-ticker
+routes. The pipeline raises that version whenever it writes the ticker. The
+version is part of the ETag, so a poll with a matching If-None-Match costs one
+primary-key lookup and gets 304. Bodies are kept in a bounded LRU cache keyed
+by request and checked against the current version, so repeated polls for an
+unchanged ticker never re-run the query. Large bodies are streamed with
+chunked transfer encoding as they are encoded.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+import pandas as pd
+from .database import (
+    DailyMetricsTable,
+    LatestMetricsTable,
+    database_version,
+    indicator_columns,
+    load_metrics,
+    load_versions,
+)
+
+logger = logging.getLogger(__name__)
+
+METRIC_FIELDS = [c.name for c in DailyMetricsTable.__table__.columns]
+LATEST_FIELDS = [c.name for c in LatestMetricsTable.__table__.columns]
+
+# Rows encoded per streamed piece
+STREAM_ROWS = 5000
+
+# Bodies larger than this are sent chunked instead of with Content-Length
+STREAM_THRESHOLD = 256 * 1024
+
+
+class BadRequest(ValueError):
+    """Invalid query parameters; answered with 400."""
+
+
+class NotFound(LookupError):
+    """Unknown route or ticker; answered with 404."""
+
+
+@dataclass
+class CachedResponse:
+    version: int
+    etag: str
+    body: bytes
+
+
+class ResponseCache:
+    """
+    LRU cache of response bodies, bounded by entry count and total bytes.
+    An entry is only returned for the data version it was built from.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, version: int) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old.body)
+            self._entries[key] = entry
+            self.bytes += len(entry.body)
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted.body)
+
+
+@dataclass
+class Response:
+    status: int
+    etag: Optional[str] = None
+    body: Optional[bytes] = None  # complete body (cached or small)
+    chunks: Optional[Iterator[bytes]] = None  # streamed body
+
+
+def json_records(frame: pd.DataFrame, rows: int = STREAM_ROWS) -> Iterator[bytes]:
+    """
+    A frame as a JSON array of row objects, encoded `rows` rows at a time.
+    """
+    frame = frame.copy()
+    if "date" in frame:
+        frame["date"] = frame["date"].astype(str)
+    yield b"["
+    for i in range(0, len(frame), rows):
+        piece = frame.iloc[i : i + rows].to_json(orient="records")
+        yield (b"," if i else b"") + piece[1:-1].encode()
+    yield b"]"
+
+
+def _date_param(params: Dict[str, str], name: str) -> Optional[date]:
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be a YYYY-MM-DD date, got {value!r}")
+
+
+def _list_param(params: Dict[str, str], name: str) -> Optional[List[str]]:
+    value = params.get(name)
+    return [v for v in value.split(",") if v] if value else None
+
+
+class ReadAPI:
+    """
+    Routing, versioning and caching, independent of the HTTP server.
+    """
+
+    def __init__(self, engine, cache: Optional[ResponseCache] = None):
+        self.engine = engine
+        self.cache = cache if cache is not None else ResponseCache()
+
+    def handle(self, target: str, if_none_match: Optional[str] = None) -> Response:
+        """
+        Answer a GET of `target` (path and query string).
+        """
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.split("/") if p]
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            ticker, produce = self._route(parts, params)
+            with self.engine.connect() as conn:
+                if ticker is None:
+                    version = database_version(conn)
+                else:
+                    version = load_versions(conn, [ticker])[ticker]
+            # Read before the query: a write in between leaves newer data
+            # under the older version, which the next request replaces
+            key = f"{url.path}?{sorted(params.items())}"
+            digest = hashlib.blake2b(key.encode(), digest_size=6).hexdigest()
+            etag = f'"{version}-{digest}"'
+            if if_none_match and (
+                if_none_match.strip() == "*"
+                or etag in (tag.strip() for tag in if_none_match.split(","))
+            ):
+                return Response(304, etag)
+
+            cached = self.cache.get(key, version)
+            if cached is not None:
+                return Response(200, etag, body=cached.body)
+            # Queries run here, so their errors are answered before streaming
+            chunks = produce()
+            return Response(200, etag, chunks=self._cached(key, version, etag, chunks))
+        except BadRequest as e:
+            return Response(400, body=json.dumps({"error": str(e)}).encode())
+        except NotFound as e:
+            return Response(404, body=json.dumps({"error": str(e)}).encode())
+
+    def _cached(
+        self, key: str, version: int, etag: str, chunks: Iterator[bytes]
+    ) -> Iterator[bytes]:
+        # Keep the pieces while they fit in the cache; store once complete
+        pieces: List[bytes] = []
+        size = 0
+        for piece in chunks:
+            size += len(piece)
+            if size <= self.cache.max_bytes:
+                pieces.append(piece)
+            yield piece
+        if size <= self.cache.max_bytes:
+            self.cache.put(key, CachedResponse(version, etag, b"".join(pieces)))
+
+    def _route(
+        self, parts: List[str], params: Dict[str, str]
+    ) -> Tuple[Optional[str], Callable[[], Iterator[bytes]]]:
+        """
+        The ticker a route reads (None for cross-ticker routes) and a function
+        producing its body.
+        """
+        if parts == ["health"]:
+            return None, lambda: iter([json.dumps({"status": "ok"}).encode()])
+        if parts == ["tickers"]:
+            return None, lambda: self._latest(None, ["ticker", "date"])
+        if parts and parts[0] == "latest" and len(parts) <= 2:
+            if len(parts) == 2:
+                return parts[1], lambda: self._latest_one(parts[1])
+            return None, lambda: self._latest(_list_param(params, "tickers"))
+        if parts and parts[0] == "metrics" and len(parts) == 2:
+            start, end = _date_param(params, "start"), _date_param(params, "end")
+            columns = _list_param(params, "columns")
+            unknown = set(columns or []) - set(self._fields("daily_metrics"))
+            if unknown:
+                raise BadRequest(f"Unknown columns: {', '.join(sorted(unknown))}")
+            return parts[1], lambda: self._metrics(parts[1], start, end, columns)
+        if parts and parts[0] == "signals" and len(parts) <= 2:
+            ticker = parts[1] if len(parts) == 2 else None
+            start, end = _date_param(params, "start"), _date_param(params, "end")
+            types = _list_param(params, "type")
+            return ticker, lambda: self._signals(ticker, types, start, end)
+        raise NotFound(f"No route for /{'/'.join(parts)}")
+
+    def _fields(self, table: str) -> List[str]:
+        # Model columns plus the configured indicator columns added so far
+        fields = METRIC_FIELDS if table == "daily_metrics" else LATEST_FIELDS
+        with self.engine.connect() as conn:
+            return fields + indicator_columns(conn, table)
+
+    def _query(self, sql: str, params: tuple, columns: List[str]) -> pd.DataFrame:
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=columns)
+
+    def _latest(
+        self, tickers: Optional[List[str]], columns: Optional[List[str]] = None
+    ) -> Iterator[bytes]:
+        columns = columns or self._fields("latest_metrics")
+        sql = f"SELECT {', '.join(columns)} FROM latest_metrics"
+        params: tuple = ()
+        if tickers:
+            sql += f" WHERE ticker IN ({', '.join('?' for _ in tickers)})"
+            params = tuple(tickers)
+        return json_records(self._query(sql + " ORDER BY ticker", params, columns))
+
+    def _latest_one(self, ticker: str) -> Iterator[bytes]:
+        columns = self._fields("latest_metrics")
+        frame = self._query(
+            f"SELECT {', '.join(columns)} FROM latest_metrics WHERE ticker = ?",
+            (ticker,),
+            columns,
+        )
+        if frame.empty:
+            raise NotFound(f"No stored metrics for {ticker}")
+        body = b"".join(json_records(frame))
+        return iter([body[1:-1]])
+
+    def _metrics(
+        self,
+        ticker: str,
+        start: Optional[date],
+        end: Optional[date],
+        columns: Optional[List[str]],
+    ) -> Iterator[bytes]:
+        frame = load_metrics(self.engine, ticker, start, end)
+        if columns:
+            frame = frame[["date", *[c for c in columns if c != "date"]]]
+        return json_records(frame)
+
+    def _signals(
+        self,
+        ticker: Optional[str],
+        types: Optional[List[str]],
+        start: Optional[date],
+        end: Optional[date],
+    ) -> Iterator[bytes]:
+        clauses, params = [], []
+        if ticker is not None:
+            clauses.append("ticker = ?")
+            params.append(ticker)
+        if types:
+            clauses.append(f"signal_type IN ({', '.join('?' for _ in types)})")
+            params.extend(types)
+        for op, bound in ((">=", start), ("<=", end)):
+            if bound is not None:
+                clauses.append(f"date {op} ?")
+                params.append(bound.isoformat())
+        sql = "SELECT ticker, signal_type, date FROM signal_events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY date, ticker, signal_type"
+        return json_records(
+            self._query(sql, tuple(params), ["ticker", "signal_type", "date"])
+        )
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    api: ReadAPI  # set on the subclass built by make_server
+
+    def do_GET(self):
+        response = self.api.handle(self.path, self.headers.get("If-None-Match"))
+        self.send_response(response.status)
+        if response.etag:
+            self.send_header("ETag", response.etag)
+            self.send_header("Cache-Control", "no-cache")
+        if response.status == 304:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_header("Content-Type", "application/json")
+        if response.body is not None:
+            self._send_body(response.body)
+            return
+
+        # Buffer small bodies; switch to chunked encoding past the threshold
+        buffered: List[bytes] = []
+        size = 0
+        chunks = iter(response.chunks)
+        for piece in chunks:
+            buffered.append(piece)
+            size += len(piece)
+            if size > STREAM_THRESHOLD:
+                break
+        else:
+            self._send_body(b"".join(buffered))
+            return
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for piece in [*buffered, *chunks]:
+            if piece:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_body(self, body: bytes):
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def make_server(
+    engine,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    cache: Optional[ResponseCache] = None,
+) -> ThreadingHTTPServer:
+    """
+    A threaded HTTP server for the read API; call serve_forever() on it.
+    """
+    handler = type("Handler", (RequestHandler,), {"api": ReadAPI(engine, cache)})
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,293 @@
+# src/async_fetch.py
+import asyncio
+import json
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+from .data_fetcher import (
+    FETCH_ERRORS,
+    CacheMissError,
+    SymbolNotFoundError,
+    build_raw_data,
+    parse_price_history,
+)
+from .providers import MarketDataProvider
+
+logger = logging.getLogger(__name__)
+
+# Errors that retrying cannot fix
+PERMANENT_ERRORS = (SymbolNotFoundError, CacheMissError, KeyError, TypeError)
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: `rate` requests per second with bursts up to `capacity`.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable = asyncio.sleep,
+    ):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await self.sleep((1 - self.tokens) / self.rate)
+
+
+class NegativeCache:
+    """
+    Tickers known to be delisted or invalid, skipped until `ttl_hours` pass.
+    Persisted as JSON when `path` is given.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_hours: float = 24):
+        self.path = Path(path) if path else None
+        self.ttl = ttl_hours * 3600
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if self.path and self.path.exists():
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    def __contains__(self, ticker: str) -> bool:
+        entry = self.entries.get(ticker)
+        if entry is None:
+            return False
+        if time.time() - entry["at"] > self.ttl:
+            del self.entries[ticker]
+            return False
+        return True
+
+    def reason(self, ticker: str) -> str:
+        return self.entries[ticker]["reason"]
+
+    def add(self, ticker: str, reason: str):
+        self.entries[ticker] = {"reason": reason, "at": time.time()}
+
+    def save(self):
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(self.entries, f)
+
+
+class AsyncFetcher:
+    """
+    Fetches many tickers concurrently through a blocking provider.
+    Every provider call runs in a thread under a global concurrency cap and a
+    token-bucket rate limit. Transient errors are retried with jittered
+    exponential backoff; tickers with no price history go to the negative cache.
+    """
+
+    def __init__(
+        self,
+        provider: MarketDataProvider,
+        concurrency: int = 16,
+        rate_per_sec: float = 5.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        negative_cache: Optional[NegativeCache] = None,
+        sleep: Callable = asyncio.sleep,
+    ):
+        self.provider = provider
+        self.concurrency = concurrency
+        self.rate_per_sec = rate_per_sec
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.negative_cache = negative_cache or NegativeCache()
+        self.sleep = sleep
+        self.requests = 0
+        self.retries = 0
+
+    async def _call(self, fn: Callable, *args, **kwargs) -> Any:
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                await self._bucket.acquire()
+                self.requests += 1
+                try:
+                    return await asyncio.to_thread(fn, *args, **kwargs)
+                except PERMANENT_ERRORS:
+                    raise
+                except Exception as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    error = e
+            # Back off outside the semaphore so other requests can proceed
+            delay = random.uniform(
+                0, min(self.backoff_max, self.backoff_base * 2**attempt)
+            )
+            attempt += 1
+            self.retries += 1
+            logger.warning(
+                f"Retry {attempt}/{self.max_retries} for {fn.__name__}{args} "
+                f"in {delay:.2f}s: {error}"
+            )
+            await self.sleep(delay)
+
+    async def _optional(self, fn: Callable, ticker: str) -> Any:
+        # Same policy as optional_balance_sheet: fall back only on FETCH_ERRORS
+        try:
+            return await self._call(fn, ticker)
+        except FETCH_ERRORS as e:
+            logger.debug(f"{fn.__name__} failed for {ticker}: {e}")
+            return None
+
+    async def fetch(
+        self,
+        ticker: str,
+        start: Optional[date] = None,
+        period: str = "5y",
+        fundamentals: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Async equivalent of `fetch_stock_data`: history, info and the quarterly
+        balance sheet are requested concurrently, the annual one only as fallback.
+        With `fundamentals=False` only the history is requested.
+        """
+        if ticker in self.negative_cache:
+            raise SymbolNotFoundError(
+                f"{ticker} skipped: {self.negative_cache.reason(ticker)}"
+            )
+
+        p = self.provider
+        hist_task = asyncio.ensure_future(
+            self._call(p.history, ticker, period=period, start=start)
+        )
+        if start is not None or not fundamentals:
+            # Incremental runs usually find no new bars; don't fetch fundamentals yet
+            await asyncio.wait([hist_task])
+        pending = []
+        if fundamentals:
+            info_task = asyncio.ensure_future(self._call(p.info, ticker))
+            quarterly_task = asyncio.ensure_future(
+                self._optional(p.quarterly_balance_sheet, ticker)
+            )
+            pending = [info_task, quarterly_task]
+        try:
+            price_series = parse_price_history(ticker, await hist_task, start)
+        except Exception as e:
+            for task in pending:
+                task.cancel()
+            if isinstance(e, SymbolNotFoundError):
+                self.negative_cache.add(ticker, str(e))
+            else:
+                logger.error(f"Failed to fetch price data for {ticker}: {e}")
+            raise
+
+        if not len(price_series) or not fundamentals:
+            for task in pending:
+                task.cancel()
+            return build_raw_data(ticker, price_series, {}, None, "none")
+
+        try:
+            # Like fetch_stock_data, a failed info request fails the ticker
+            info = await info_task
+        except Exception:
+            quarterly_task.cancel()
+            raise
+        balance_sheet = await quarterly_task
+        source = "quarterly"
+        if balance_sheet is None or balance_sheet.empty:
+            balance_sheet = await self._optional(p.balance_sheet, ticker)
+            source = "annual"
+            if balance_sheet is None or balance_sheet.empty:
+                logger.warning(
+                    f"No balance sheet data for {ticker}. Using info fallback."
+                )
+                source = "info"
+
+        return build_raw_data(ticker, price_series, info, balance_sheet, source)
+
+    async def fetch_many(
+        self,
+        tickers: List[str],
+        starts: Optional[Dict[str, date]] = None,
+        period: str = "5y",
+        skip_fundamentals: Iterable[str] = (),
+    ) -> Dict[str, Union[Dict[str, Any], Exception]]:
+        """
+        Fetch every ticker; the result maps each ticker to raw data or its exception.
+        Tickers in `skip_fundamentals` get prices only.
+        """
+        # Created here so they bind to the running event loop
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.concurrency)
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._bucket = TokenBucket(self.rate_per_sec, sleep=self.sleep)
+        starts = starts or {}
+        skip_fundamentals = set(skip_fundamentals)
+
+        async def one(ticker):
+            try:
+                return await self.fetch(
+                    ticker,
+                    starts.get(ticker),
+                    period,
+                    fundamentals=ticker not in skip_fundamentals,
+                )
+            except Exception as e:
+                return e
+
+        results = await asyncio.gather(*(one(t) for t in tickers))
+        self.negative_cache.save()
+        return dict(zip(tickers, results))
+
+
+def build_async_fetcher(
+    provider: MarketDataProvider, config: Dict[str, Any]
+) -> AsyncFetcher:
+    """
+    AsyncFetcher configured from the `fetch` section of config.yaml.
+    """
+    settings = config.get("fetch", {})
+    return AsyncFetcher(
+        provider,
+        concurrency=settings.get("concurrency", 16),
+        rate_per_sec=settings.get("rate_per_sec", 5.0),
+        max_retries=settings.get("max_retries", 3),
+        backoff_base=settings.get("backoff_base", 0.5),
+        backoff_max=settings.get("backoff_max", 30.0),
+        negative_cache=NegativeCache(
+            settings.get("negative_cache_path"),
+            ttl_hours=settings.get("negative_cache_ttl_hours", 24),
+        ),
+    )
+
+
+def fetch_universe(
+    fetcher: AsyncFetcher,
+    tickers: List[str],
+    starts: Optional[Dict[str, date]] = None,
+    period: str = "5y",
+    skip_fundamentals: Iterable[str] = (),
+) -> Dict[str, Union[Dict[str, Any], Exception]]:
+    """
+    Blocking entry point: run `fetcher.fetch_many` in a fresh event loop.
+    """
+    return asyncio.run(fetcher.fetch_many(tickers, starts, period, skip_fundamentals))
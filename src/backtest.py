@@ -0,0 +1,319 @@
+# src/backtest.py
+"""
+Event study of stored signals: forward returns, hit rates and drawdowns per
+signal type and market.
+
+Closes for every ticker with events are loaded into one flat array in (ticker,
+date) order, and each event is located in it with a single searchsorted over a
+combined (ticker code, day number) key. A horizon is then plain index
+arithmetic: the close `h` rows after the event, if that row still belongs to
+the same ticker. Large universes are split into ticker chunks that run in a
+process pool, each reading its own closes.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from .column_store import ColumnStore
+from .database import PRICE_SCALE, SQLITE_MAX_VARIABLES, daily_metrics_schema
+from .signals import SignalRule, load_rules
+
+logger = logging.getLogger(__name__)
+
+# Forward horizons in trading days
+HORIZONS = (5, 20, 60, 252)
+
+# Tickers per worker task when fanning out
+CHUNK_TICKERS = 500
+
+# Cells of the drawdown window matrix evaluated at once
+WINDOW_CELLS = 1 << 22
+
+
+@dataclass
+class ClosePanel:
+    """
+    Closes of several tickers in one flat array, sorted by ticker then date;
+    ticker i owns rows offsets[i]:offsets[i + 1].
+    """
+
+    tickers: List[str]
+    offsets: np.ndarray  # int64, len(tickers) + 1
+    dates: np.ndarray  # datetime64[D]
+    close: np.ndarray  # float64
+
+    def codes(self) -> np.ndarray:
+        """
+        Ticker code (position in `tickers`) of every row.
+        """
+        return np.repeat(np.arange(len(self.tickers)), np.diff(self.offsets))
+
+
+def market(ticker: str) -> str:
+    """
+    Exchange suffix of a yfinance ticker ("NS" for RELIANCE.NS), "US" without one.
+    """
+    return ticker.rsplit(".", 1)[1] if "." in ticker else "US"
+
+
+def _select_closes(conn, tickers: List[str], compact: bool) -> Dict[str, tuple]:
+    """
+    (dates, closes) per ticker from daily_metrics. Rows come back as plain
+    numbers (the day number computed in SQL) through the DBAPI cursor, since
+    wrapping millions of rows in SQLAlchemy Row objects dominates the load.
+    """
+    day = "date" if compact else "CAST(julianday(date) - 2440587.5 AS INTEGER)"
+    where = f"WHERE ticker IN ({', '.join('?' for _ in tickers)})"
+    driver = conn.connection.driver_connection
+    counts = driver.execute(
+        f"SELECT ticker, COUNT(*) FROM daily_metrics {where} "
+        "GROUP BY ticker ORDER BY ticker",
+        tickers,
+    ).fetchall()
+    rows = driver.execute(
+        f"SELECT {day}, close FROM daily_metrics {where} ORDER BY ticker, date",
+        tickers,
+    ).fetchall()
+    values = np.array(rows, dtype=np.float64).reshape(-1, 2)
+    dates = values[:, 0].astype(np.int64).astype("datetime64[D]")
+    closes = values[:, 1] / PRICE_SCALE if compact else values[:, 1]
+    parts = {}
+    start = 0
+    for ticker, count in counts:
+        parts[ticker] = (dates[start : start + count], closes[start : start + count])
+        start += count
+    return parts
+
+
+def load_close_panel(
+    engine, tickers: Sequence[str], store: Optional[ColumnStore] = None
+) -> ClosePanel:
+    """
+    Stored closes of `tickers` (those without rows are dropped), from the
+    column store when it has the ticker, else from daily_metrics.
+    """
+    tickers = sorted(set(tickers))
+    from_store = [t for t in tickers if store is not None and t in store]
+    from_db = [t for t in tickers if t not in set(from_store)]
+    parts: Dict[str, tuple] = {}
+    for ticker in from_store:
+        cols = store.columns(ticker, ["date", "close"])
+        parts[ticker] = (cols["date"], cols["close"])
+
+    with engine.connect() as conn:
+        compact = daily_metrics_schema(conn) == "compact"
+        for i in range(0, len(from_db), SQLITE_MAX_VARIABLES):
+            parts.update(
+                _select_closes(conn, from_db[i : i + SQLITE_MAX_VARIABLES], compact)
+            )
+
+    present = [t for t in tickers if t in parts]
+    lengths = [len(parts[t][0]) for t in present]
+    return ClosePanel(
+        tickers=present,
+        offsets=np.r_[0, np.cumsum(lengths)].astype(np.int64),
+        dates=np.concatenate([parts[t][0] for t in present] or [np.empty(0)]).astype(
+            "datetime64[D]"
+        ),
+        close=np.concatenate([parts[t][1] for t in present] or [np.empty(0)]).astype(
+            np.float64
+        ),
+    )
+
+
+def load_events(
+    engine,
+    tickers: Optional[Sequence[str]] = None,
+    signal_types: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Stored signal events (ticker, signal_type, date), optionally filtered.
+    """
+    sql = "SELECT ticker, signal_type, date FROM signal_events"
+    params: List[str] = []
+    clauses = []
+    if signal_types:
+        clauses.append(f"signal_type IN ({', '.join('?' for _ in signal_types)})")
+        params.extend(signal_types)
+    if tickers is not None:
+        clauses.append(f"ticker IN ({', '.join('?' for _ in tickers)})")
+        params.extend(tickers)
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(sql, tuple(params)).fetchall()
+    events = pd.DataFrame(rows, columns=["ticker", "signal_type", "date"])
+    events["date"] = pd.to_datetime(events["date"])
+    return events
+
+
+def event_returns(
+    panel: ClosePanel,
+    events: pd.DataFrame,
+    horizons: Iterable[int] = HORIZONS,
+    bearish: Iterable[str] = (),
+) -> pd.DataFrame:
+    """
+    One row per event found in `panel`: entry close on the signal date and,
+    per horizon h, `ret_<h>` (close h rows later / entry - 1) and `dd_<h>`
+    (worst move against the signal over those h rows: the lowest close for
+    bullish signals, the highest for `bearish` ones). Both are NaN when fewer
+    than h bars follow the event.
+    """
+    codes = {t: i for i, t in enumerate(panel.tickers)}
+    code = events["ticker"].map(codes).fillna(-1).to_numpy(dtype=np.int64)
+    day = events["date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+    # Rows are sorted by (code, day), so this key is sorted too
+    span = np.int64(1 << 32)
+    row_keys = panel.codes() * span + panel.dates.astype(np.int64)
+    event_keys = code * span + day
+    idx = np.searchsorted(row_keys, event_keys)
+    found = (code >= 0) & (idx < len(row_keys))
+    found[found] = row_keys[idx[found]] == event_keys[found]
+    if not found.all():
+        logger.warning(f"{int((~found).sum())} event(s) without a stored close skipped")
+
+    events = events[found].reset_index(drop=True)
+    idx, code = idx[found], code[found]
+    end = panel.offsets[code + 1]
+    entry = panel.close[idx]
+    short = events["signal_type"].isin(list(bearish)).to_numpy()
+
+    out = {
+        "ticker": events["ticker"].to_numpy(),
+        "market": events["ticker"].map(market).to_numpy(),
+        "signal_type": events["signal_type"].to_numpy(),
+        "date": events["date"].to_numpy(),
+        "entry": entry,
+    }
+    last_row = max(len(panel.close) - 1, 0)
+    for h in horizons:
+        complete = idx + h < end
+        low, high = np.empty(len(idx)), np.empty(len(idx))
+        # The (events x h) window matrix is built in slices to bound memory
+        step = max(1, WINDOW_CELLS // h)
+        for i in range(0, len(idx), step):
+            window = idx[i : i + step, None] + np.arange(1, h + 1)
+            closes = panel.close[np.minimum(window, last_row)]
+            low[i : i + step] = closes.min(axis=1, initial=np.inf)
+            high[i : i + step] = closes.max(axis=1, initial=-np.inf)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret = panel.close[np.minimum(idx + h, last_row)] / entry - 1
+            adverse = np.where(
+                short, -np.maximum(high / entry - 1, 0), np.minimum(low / entry - 1, 0)
+            )
+        out[f"ret_{h}"] = np.where(complete, ret, np.nan)
+        out[f"dd_{h}"] = np.where(complete, adverse, np.nan)
+    return pd.DataFrame(out)
+
+
+def summarize(
+    returns: pd.DataFrame,
+    horizons: Iterable[int] = HORIZONS,
+    bearish: Iterable[str] = (),
+) -> pd.DataFrame:
+    """
+    Per signal type, market and horizon: event count, mean and median forward
+    return, hit rate (share of events moving in the signal's direction) and
+    mean and worst drawdown.
+    """
+    bearish = set(bearish)
+    frames = []
+    for h in horizons:
+        ret, dd = f"ret_{h}", f"dd_{h}"
+        df = returns[["signal_type", "market", ret, dd]].dropna()
+        sign = np.where(df["signal_type"].isin(bearish), -1.0, 1.0)
+        df = df.assign(hit=(df[ret] * sign > 0).astype(np.float64))
+        stats = (
+            df.groupby(["signal_type", "market"])
+            .agg(
+                events=(ret, "size"),
+                mean_return=(ret, "mean"),
+                median_return=(ret, "median"),
+                hit_rate=("hit", "mean"),
+                mean_drawdown=(dd, "mean"),
+                worst_drawdown=(dd, "min"),
+            )
+            .reset_index()
+        )
+        stats.insert(2, "horizon", h)
+        frames.append(stats)
+    if not frames:
+        return pd.DataFrame()
+    return (
+        pd.concat(frames, ignore_index=True)
+        .sort_values(["signal_type", "market", "horizon"], kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+def _backtest_chunk(
+    db_path: str,
+    store_path: Optional[str],
+    tickers: List[str],
+    signal_types: Optional[List[str]],
+    horizons: List[int],
+    bearish: List[str],
+) -> pd.DataFrame:
+    engine = create_engine(f"sqlite:///{db_path}")
+    store = ColumnStore(store_path) if store_path else None
+    try:
+        events = load_events(engine, tickers, signal_types)
+        panel = load_close_panel(engine, tickers, store)
+        return event_returns(panel, events, horizons, bearish)
+    finally:
+        engine.dispose()
+
+
+def bearish_signals(rules: Iterable[SignalRule]) -> List[str]:
+    """
+    Signal types that fire on a downward move (direction "below").
+    """
+    return [rule.name for rule in rules if rule.direction == "below"]
+
+
+def run_backtest(
+    engine,
+    signal_types: Optional[Sequence[str]] = None,
+    horizons: Sequence[int] = HORIZONS,
+    rules: Optional[List[SignalRule]] = None,
+    workers: int = 1,
+    store: Optional[ColumnStore] = None,
+    chunk_size: int = CHUNK_TICKERS,
+) -> pd.DataFrame:
+    """
+    Forward returns of every stored event (see `event_returns`). With
+    workers > 1 and more than `chunk_size` tickers, ticker chunks are
+    processed in a process pool.
+    """
+    bearish = bearish_signals(rules if rules is not None else load_rules({}))
+    signal_types = list(signal_types) if signal_types else None
+    horizons = list(horizons)
+    with engine.connect() as conn:
+        sql = "SELECT DISTINCT ticker FROM signal_events"
+        params: tuple = ()
+        if signal_types:
+            sql += f" WHERE signal_type IN ({', '.join('?' for _ in signal_types)})"
+            params = tuple(signal_types)
+        tickers = sorted(t for (t,) in conn.exec_driver_sql(sql, params))
+
+    store_path = str(store.path) if store is not None else None
+    chunks = [
+        tickers[i : i + chunk_size] for i in range(0, len(tickers), chunk_size)
+    ] or [[]]
+    args = (signal_types, horizons, bearish)
+    db_path = engine.url.database
+    if workers <= 1 or len(chunks) == 1:
+        frames = [_backtest_chunk(db_path, store_path, c, *args) for c in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_backtest_chunk, db_path, store_path, c, *args)
+                for c in chunks
+            ]
+            frames = [future.result() for future in futures]
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,319 @@
+# src/column_store.py
+import json
+import logging
+import os
+import shutil
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .models import PriceSeries
+from .processor import METRIC_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# One file per field; every other metric column is float64
+FIELD_DTYPES = {
+    name: np.dtype("datetime64[D]")
+    if name == "date"
+    else np.dtype(np.int64)
+    if name == "volume"
+    else np.dtype(np.float64)
+    for name in METRIC_COLUMNS
+    if name != "ticker"
+}
+
+# Relocated segments leave dead rows behind; compact once they pass this share
+COMPACT_DEAD_RATIO = 0.25
+
+
+class ColumnStore:
+    """
+    Columnar on-disk copy of daily_metrics: one contiguous file per field
+    (<field>.bin, raw little-endian values) and index.json mapping each ticker
+    to the (offset, length) of its rows, which are stored in date order.
+
+    Readers get zero-copy np.memmap views of a ticker's rows or of the whole
+    universe. New tickers and new bars at the end of the files are appended.
+    A ticker whose merged rows still fit its segment is rewritten in place
+    (rows it no longer needs become dead); one that outgrows it is rewritten
+    at the end and its old rows become dead until `compact()`. index.json is
+    the commit point for appended rows: bytes past its row count (from a run
+    that stopped before `flush()`) are truncated on the next write. Rows
+    rewritten in place are visible to readers at once.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.rows = 0
+        self.dead = 0
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self._maps: Dict[str, np.memmap] = {}
+        self._truncated = False
+        index_path = self.path / "index.json"
+        if index_path.exists():
+            with open(index_path) as f:
+                data = json.load(f)
+            self.rows = data["rows"]
+            self.dead = data["dead"]
+            self.index = {t: tuple(entry) for t, entry in data["tickers"].items()}
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def tickers(self) -> List[str]:
+        return list(self.index)
+
+    def _file(self, field: str) -> Path:
+        return self.path / f"{field}.bin"
+
+    def column(self, field: str) -> np.ndarray:
+        """
+        The whole universe's values of one field (dead rows included), as a
+        read-only memmap; slice it with `index` offsets.
+        """
+        if self.rows == 0:
+            return np.empty(0, dtype=FIELD_DTYPES[field])
+        if field not in self._maps:
+            self._maps[field] = np.memmap(
+                self._file(field),
+                dtype=FIELD_DTYPES[field],
+                mode="r",
+                shape=(self.rows,),
+            )
+        return self._maps[field]
+
+    def columns(
+        self,
+        ticker: str,
+        fields: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Zero-copy views of one ticker's rows; with `limit`, only the most recent.
+        """
+        offset, length = self.index[ticker]
+        start = offset + max(0, length - limit) if limit is not None else offset
+        return {
+            field: self.column(field)[start : offset + length]
+            for field in (fields or FIELD_DTYPES)
+        }
+
+    def last_date(self, ticker: str) -> Optional[np.datetime64]:
+        if ticker not in self.index:
+            return None
+        offset, length = self.index[ticker]
+        return self.column("date")[offset + length - 1] if length else None
+
+    def price_series(self, ticker: str, limit: Optional[int] = None) -> PriceSeries:
+        """
+        OHLCV as a PriceSeries over memmap views, ready for process_data.
+        """
+        cols = self.columns(ticker, ["date", *PriceSeries.FIELDS], limit)
+        return PriceSeries(dates=cols.pop("date"), **cols)
+
+    def frame(self, ticker: str) -> pd.DataFrame:
+        """
+        The ticker's metrics as a DataFrame over the memmaps (no copy of the
+        value columns), e.g. for evaluate_rules.
+        """
+        return pd.DataFrame(self.columns(ticker), copy=False)
+
+    def _prepare_append(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        if self._truncated:
+            return
+        for field, dtype in FIELD_DTYPES.items():
+            file = self._file(field)
+            if file.exists():
+                os.truncate(file, self.rows * dtype.itemsize)
+        self._truncated = True
+
+    def _append(self, values: Dict[str, np.ndarray]) -> int:
+        self._prepare_append()
+        n = len(values["date"])
+        for field, dtype in FIELD_DTYPES.items():
+            with open(self._file(field), "ab") as f:
+                f.write(np.ascontiguousarray(values[field], dtype=dtype).tobytes())
+        self._maps.clear()
+        offset = self.rows
+        self.rows += n
+        return offset
+
+    def _overwrite(self, offset: int, values: Dict[str, np.ndarray]):
+        for field, dtype in FIELD_DTYPES.items():
+            with open(self._file(field), "r+b") as f:
+                f.seek(offset * dtype.itemsize)
+                f.write(np.ascontiguousarray(values[field], dtype=dtype).tobytes())
+        self._maps.clear()
+
+    def write(
+        self,
+        metrics: pd.DataFrame,
+        on_conflict: str = "ignore",
+        replace_from: Optional[date] = None,
+    ) -> int:
+        """
+        Add one ticker's metrics rows. Dates already stored are kept
+        (on_conflict="ignore") or replaced ("update"), as in the database;
+        with `replace_from`, stored rows from that date on are dropped first.
+        Returns the number of rows written to the files.
+        """
+        if metrics.empty:
+            return 0
+        ticker = metrics["ticker"].iloc[0]
+        new = metrics_arrays(metrics)
+        if ticker not in self.index:
+            offset = self._append(new)
+            self.index[ticker] = (offset, len(new["date"]))
+            return len(new["date"])
+
+        offset, length = self.index[ticker]
+        stored = self.columns(ticker)
+        if replace_from is not None:
+            # Copy, as the rows may be overwritten in place below
+            keep_rows = stored["date"] < np.datetime64(replace_from, "D")
+            stored = {field: values[keep_rows] for field, values in stored.items()}
+        kept = len(stored["date"])
+        at_end = offset + length == self.rows
+        if (
+            at_end
+            and kept == length
+            and (not kept or new["date"][0] > stored["date"][-1])
+        ):
+            # Only new bars: extend the ticker's segment in place
+            self._append(new)
+            self.index[ticker] = (offset, length + len(new["date"]))
+            return len(new["date"])
+
+        keep = "first" if on_conflict == "ignore" else "last"
+        merged = (
+            pd.concat([pd.DataFrame(stored), pd.DataFrame(new)], ignore_index=True)
+            .drop_duplicates("date", keep=keep)
+            .sort_values("date", kind="stable")
+        )
+        values = {field: merged[field].to_numpy() for field in FIELD_DTYPES}
+        values["date"] = values["date"].astype("datetime64[D]")
+        if len(merged) <= length or at_end:
+            # Fits the ticker's segment (a re-run or a restatement), or the
+            # segment is last and grows into the appended rows
+            self._overwrite(offset, {f: v[:length] for f, v in values.items()})
+            if len(merged) > length:
+                self._append({f: v[length:] for f, v in values.items()})
+            self.dead += max(length - len(merged), 0)
+            self.index[ticker] = (offset, len(merged))
+            return len(merged)
+        self.index[ticker] = (self._append(values), len(merged))
+        self.dead += length
+        return len(merged)
+
+    def flush(self):
+        """
+        Write index.json atomically, making the appended rows visible to readers.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / "index.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "rows": self.rows,
+                    "dead": self.dead,
+                    "tickers": {t: list(entry) for t, entry in self.index.items()},
+                },
+                f,
+            )
+        os.replace(tmp, self.path / "index.json")
+
+    def close(self):
+        """
+        Flush, compacting first when dead rows pass COMPACT_DEAD_RATIO.
+        """
+        if self.dead > COMPACT_DEAD_RATIO * max(self.rows - self.dead, 1):
+            self.compact()
+        else:
+            self.flush()
+
+    def compact(self):
+        """
+        Rewrite the live rows contiguously, in ticker order, and swap the new
+        files in. Readers holding old memmaps keep their (unlinked) files.
+        """
+        shutil.rmtree(f"{self.path}.tmp", ignore_errors=True)
+        tmp = ColumnStore(f"{self.path}.tmp")
+        tmp._truncated = True
+        for ticker in sorted(self.index):
+            # One ticker at a time, so memory stays bounded by the largest history
+            tmp.index[ticker] = (
+                tmp._append(self.columns(ticker)),
+                self.index[ticker][1],
+            )
+        tmp.flush()
+
+        old = Path(f"{self.path}.old")
+        shutil.rmtree(old, ignore_errors=True)
+        if self.path.exists():
+            self.path.rename(old)
+        tmp.path.rename(self.path)
+        shutil.rmtree(old, ignore_errors=True)
+        logger.info(f"Compacted column store: {self.dead} dead rows dropped")
+        self.rows, self.dead, self.index = tmp.rows, 0, tmp.index
+        self._maps.clear()
+
+
+def metrics_arrays(metrics: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    A metrics frame as one array per store field, sorted by date.
+    """
+    metrics = metrics.sort_values("date", kind="stable")
+    values = {}
+    for field, dtype in FIELD_DTYPES.items():
+        if field == "date":
+            values[field] = pd.to_datetime(metrics[field]).to_numpy().astype(dtype)
+        elif dtype.kind == "f":
+            values[field] = metrics[field].to_numpy(dtype=dtype, na_value=np.nan)
+        else:
+            values[field] = metrics[field].to_numpy(dtype=dtype)
+    return values
+
+
+def rebuild_column_store(engine, path: str) -> ColumnStore:
+    """
+    Write a fresh column store from daily_metrics, one ticker at a time.
+    """
+    from .database import load_metrics
+
+    shutil.rmtree(path, ignore_errors=True)
+    store = ColumnStore(path)
+    with engine.connect() as conn:
+        tickers = [
+            t
+            for (t,) in conn.exec_driver_sql(
+                "SELECT DISTINCT ticker FROM daily_metrics"
+            )
+        ]
+    for ticker in sorted(tickers):
+        store.write(load_metrics(engine, ticker))
+    store.flush()
+    return store
+
+
+def column_store_path(config: Dict) -> str:
+    """
+    column_store.path, by default next to the database (financial_data.columns).
+    """
+    db_path = config.get("database", {}).get("path", "financial_data.db")
+    path = config.get("column_store", {}).get("path")
+    return path or str(Path(db_path).with_suffix(".columns"))
+
+
+def open_column_store(config: Dict) -> Optional[ColumnStore]:
+    """
+    The configured store, or None unless column_store.enabled.
+    """
+    if not config.get("column_store", {}).get("enabled", False):
+        return None
+    return ColumnStore(column_store_path(config))
@@ -2,6 +2,12 @@ import yaml
 from pathlib import Path
 from typing import Any
 
+# Output formats for output.format / --format (here so the CLI needs no pandas)
+FORMATS = ("json", "ndjson", "parquet")
+
+# daily_metrics storage schemas (database.schema, see src/database.py)
+SCHEMAS = ("numeric", "compact")
+
 
 def load_config(config_path: str = "config.yaml") -> dict[str, Any]:
     if not Path(config_path).exists():
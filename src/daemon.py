@@ -0,0 +1,395 @@
+# src/daemon.py
+"""
+Long-running refresh daemon.
+
+One process keeps the database engine, the market data provider (and its HTTP
+sessions and response cache), the online indicator states and the stored
+fundamentals in memory, and refreshes each ticker once per trading day after
+its exchange closes. An exchange's tickers are spread evenly over its refresh
+window, so a universe is fetched at a steady rate rather than all at once.
+
+Time comes from a clock object, so a SimulatedClock can drive the whole
+schedule in tests without waiting.
+"""
+
+import heapq
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from .backtest import market
+from .column_store import ColumnStore
+from .database import load_fundamentals
+from .indicators import IndicatorSpec
+from .models import RawFundamentalData
+from .online import IndicatorState
+from .pipeline import load_online_states, run_ticker, save_result
+from .providers import MarketDataProvider
+from .signals import SignalRule
+
+logger = logging.getLogger(__name__)
+
+# Refresh windows per exchange; a ticker belongs to the exchange listing its
+# yfinance suffix, or to the one without suffixes
+DEFAULT_EXCHANGES = {
+    "US": {
+        "timezone": "America/New_York",
+        "close": "16:00",
+        "delay_minutes": 30,
+        "window_minutes": 120,
+        "suffixes": [],
+    },
+    "NSE": {
+        "timezone": "Asia/Kolkata",
+        "close": "15:30",
+        "delay_minutes": 30,
+        "window_minutes": 120,
+        "suffixes": ["NS", "BO"],
+    },
+}
+
+# Longest single sleep, so the status file stays fresh and stop() is noticed
+POLL_SECONDS = 60
+
+
+class SystemClock:
+    def __init__(self):
+        self._wake = threading.Event()
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def sleep(self, seconds: float):
+        self._wake.wait(max(seconds, 0))
+
+    def wake(self):
+        """
+        End the current (and any later) sleep early, e.g. on shutdown.
+        """
+        self._wake.set()
+
+
+class SimulatedClock:
+    """
+    A clock that jumps forward instead of sleeping.
+    """
+
+    def __init__(self, start: datetime):
+        self.current = start.astimezone(timezone.utc)
+        self.sleeps: List[float] = []
+
+    def now(self) -> datetime:
+        return self.current
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.current += timedelta(seconds=max(seconds, 0))
+
+
+@dataclass
+class Exchange:
+    name: str
+    timezone: str
+    close: dt_time
+    delay: timedelta
+    window: timedelta
+    suffixes: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_config(cls, name: str, settings: Dict[str, Any]) -> "Exchange":
+        return cls(
+            name=name,
+            timezone=settings["timezone"],
+            close=dt_time.fromisoformat(settings["close"]),
+            delay=timedelta(minutes=settings.get("delay_minutes", 30)),
+            window=timedelta(minutes=settings.get("window_minutes", 120)),
+            suffixes=tuple(settings.get("suffixes", [])),
+        )
+
+    def window_after(self, moment: datetime) -> Tuple[datetime, datetime]:
+        """
+        The first weekday refresh window (UTC start, end) ending after
+        `moment`, its start clipped to `moment`. Exchange holidays are not
+        modelled: a refresh on a holiday finds no new bars.
+        """
+        tz = ZoneInfo(self.timezone)
+        day = moment.astimezone(tz).date() - timedelta(days=1)
+        while True:
+            if day.weekday() < 5:
+                start = datetime.combine(day, self.close, tz) + self.delay
+                end = start + self.window
+                if end > moment:
+                    return (
+                        max(start, moment).astimezone(timezone.utc),
+                        end.astimezone(timezone.utc),
+                    )
+            day += timedelta(days=1)
+
+
+def load_exchanges(config: Dict[str, Any]) -> List[Exchange]:
+    settings = config.get("daemon", {}).get("exchanges") or DEFAULT_EXCHANGES
+    return [Exchange.from_config(name, s) for name, s in settings.items()]
+
+
+def exchange_for(ticker: str, exchanges: List[Exchange]) -> Exchange:
+    suffix = market(ticker)
+    default = None
+    for exchange in exchanges:
+        if suffix in exchange.suffixes:
+            return exchange
+        if not exchange.suffixes and default is None:
+            default = exchange
+    if default is None:
+        raise ValueError(f"No exchange configured for {ticker}")
+    return default
+
+
+def _iso(moment: Optional[datetime]) -> Optional[str]:
+    return moment.isoformat(timespec="seconds") if moment is not None else None
+
+
+class Daemon:
+    """
+    Refreshes `tickers` once per exchange window, forever or until run()'s
+    limits. Each refresh is an online update of the ticker (a full fetch the
+    first time) and is saved before the next one starts.
+    """
+
+    def __init__(
+        self,
+        engine,
+        tickers: List[str],
+        provider: MarketDataProvider,
+        exchanges: List[Exchange],
+        rules: Optional[List[SignalRule]] = None,
+        indicators: Optional[List[IndicatorSpec]] = None,
+        clock=None,
+        status_path: Optional[str] = None,
+        store: Optional[ColumnStore] = None,
+        period: str = "5y",
+        on_conflict: str = "ignore",
+        refresh_fundamentals: timedelta = timedelta(days=30),
+        daily_fundamentals: bool = False,
+        poll_seconds: float = POLL_SECONDS,
+    ):
+        self.engine = engine
+        self.provider = provider
+        self.rules = rules
+        self.indicators = indicators or []
+        self.clock = clock or SystemClock()
+        self.status_path = Path(status_path) if status_path else None
+        self.store = store
+        self.period = period
+        self.on_conflict = on_conflict
+        self.refresh_fundamentals = refresh_fundamentals
+        self.daily_fundamentals = daily_fundamentals
+        self.poll_seconds = poll_seconds
+        self.stopping = False
+        self.started_at = self.clock.now()
+        self.counters = {"refreshed": 0, "failed": 0}
+
+        # Warm state, filled on first use and kept across windows
+        self.states: Dict[str, IndicatorState] = {}
+        self.fundamentals: Dict[str, Tuple[date, List[RawFundamentalData]]] = (
+            load_fundamentals(engine, tickers)
+        )
+
+        self.queue: List[Tuple[datetime, str]] = []
+        self.slots: Dict[str, Tuple[Exchange, float]] = {}
+        self.windows: Dict[str, datetime] = {}
+        self.status: Dict[str, Dict[str, Any]] = {}
+        previous = self._read_status()
+        by_exchange: Dict[str, List[str]] = {}
+        for ticker in dict.fromkeys(tickers):
+            by_exchange.setdefault(exchange_for(ticker, exchanges).name, []).append(
+                ticker
+            )
+        exchanges_by_name = {exchange.name: exchange for exchange in exchanges}
+        now = self.clock.now()
+        for name, members in by_exchange.items():
+            for i, ticker in enumerate(sorted(members)):
+                self.slots[ticker] = (exchanges_by_name[name], i / len(members))
+                self.status[ticker] = {
+                    "exchange": name,
+                    "last_success": None,
+                    "last_attempt": None,
+                    "last_result": None,
+                    "last_error": None,
+                    **previous.get(ticker, {}),
+                }
+                self._schedule(ticker, now)
+
+    def _read_status(self) -> Dict[str, Dict[str, Any]]:
+        # Keep last-success times across restarts
+        if self.status_path is None or not self.status_path.exists():
+            return {}
+        try:
+            with open(self.status_path) as f:
+                tickers = json.load(f).get("tickers", {})
+        except (OSError, ValueError):
+            return {}
+        keep = ("last_success", "last_attempt", "last_result", "last_error")
+        return {
+            t: {k: v for k, v in entry.items() if k in keep}
+            for t, entry in tickers.items()
+        }
+
+    def _schedule(self, ticker: str, after: datetime):
+        exchange, fraction = self.slots[ticker]
+        start, end = exchange.window_after(after)
+        due = start + (end - start) * fraction
+        self.windows[ticker] = end
+        self.status[ticker]["next_run"] = _iso(due)
+        heapq.heappush(self.queue, (due, ticker))
+
+    def queue_depth(self) -> int:
+        """
+        Tickers whose refresh is due and not yet done.
+        """
+        now = self.clock.now()
+        return sum(1 for due, _ in self.queue if due <= now)
+
+    def job(self, ticker: str) -> Dict[str, Any]:
+        """
+        run_ticker arguments: the ticker's online state (loaded from the
+        database the first time) and its stored fundamentals, fetched again
+        once they are `refresh_fundamentals` old.
+        """
+        if ticker not in self.states:
+            self.states.update(
+                load_online_states(
+                    self.engine,
+                    self.store,
+                    [ticker],
+                    self.fundamentals,
+                    self.indicators,
+                )
+            )
+        state = self.states.get(ticker)
+        job: Dict[str, Any] = (
+            {"since": state.last_date, "state": state}
+            if state is not None
+            else {"online": True}
+        )
+        if ticker in self.fundamentals:
+            fetched_on, records = self.fundamentals[ticker]
+            job["fundamentals"] = records
+            today = self.clock.now().date()
+            job["fetch_fundamentals"] = today - fetched_on >= self.refresh_fundamentals
+        return job
+
+    def refresh(self, ticker: str) -> bool:
+        """
+        Fetch, process and save one ticker, recording the outcome in its status.
+        """
+        now = self.clock.now()
+        status = self.status[ticker]
+        status["last_attempt"] = _iso(now)
+        try:
+            result = run_ticker(
+                ticker,
+                provider=self.provider,
+                period=self.period,
+                rules=self.rules,
+                indicators=self.indicators,
+                **self.job(ticker),
+            )
+            if result["status"] != "up_to_date":
+                save_result(
+                    self.engine,
+                    result,
+                    self.on_conflict,
+                    self.daily_fundamentals,
+                    self.store,
+                )
+                if self.store is not None:
+                    self.store.flush()
+                self.states[ticker] = result["state"]
+            if result.get("fundamentals"):
+                self.fundamentals.update(load_fundamentals(self.engine, [ticker]))
+                self.fundamentals[ticker] = (now.date(), self.fundamentals[ticker][1])
+        except Exception as e:
+            logger.error(f"Refresh failed for {ticker}: {e}", exc_info=True)
+            # The in-memory state may have been advanced; reload it next time
+            self.states.pop(ticker, None)
+            status["last_error"] = f"{type(e).__name__}: {e}"
+            self.counters["failed"] += 1
+            return False
+        status.update(last_success=_iso(now), last_result=result["status"])
+        status["last_error"] = None
+        self.counters["refreshed"] += 1
+        return True
+
+    def stop(self):
+        self.stopping = True
+        wake = getattr(self.clock, "wake", None)
+        if wake is not None:
+            wake()
+
+    def run(
+        self, until: Optional[datetime] = None, max_refreshes: Optional[int] = None
+    ) -> int:
+        """
+        Refresh tickers as they fall due until stop(), `until` or
+        `max_refreshes` refreshes. Returns the number of refreshes.
+        """
+        done = 0
+        self.write_status("running")
+        while not self.stopping and self.queue:
+            now = self.clock.now()
+            if until is not None and now >= until:
+                break
+            due, ticker = self.queue[0]
+            if due > now:
+                wake = min(due, now + timedelta(seconds=self.poll_seconds))
+                if until is not None:
+                    wake = min(wake, until)
+                self.write_status("sleeping")
+                self.clock.sleep((wake - now).total_seconds())
+                continue
+
+            heapq.heappop(self.queue)
+            self.refresh(ticker)
+            self._schedule(ticker, self.windows[ticker])
+            done += 1
+            self.write_status("running")
+            if max_refreshes is not None and done >= max_refreshes:
+                break
+        if self.store is not None:
+            self.store.close()
+        self.write_status("stopped")
+        return done
+
+    def status_report(self, state: str) -> Dict[str, Any]:
+        now = self.clock.now()
+        next_due = self.queue[0] if self.queue else None
+        return {
+            "state": state,
+            "pid": os.getpid(),
+            "started_at": _iso(self.started_at),
+            "updated_at": _iso(now),
+            "queue_depth": self.queue_depth(),
+            "scheduled": len(self.queue),
+            "next_run": (
+                {"ticker": next_due[1], "at": _iso(next_due[0])} if next_due else None
+            ),
+            **self.counters,
+            "tickers": self.status,
+        }
+
+    def write_status(self, state: str):
+        """
+        Write the status report atomically (readers never see a partial file).
+        """
+        if self.status_path is None:
+            return
+        self.status_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.status_path.with_name(self.status_path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.status_report(state), f, indent=2)
+        os.replace(tmp, self.status_path)
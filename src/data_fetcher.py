@@ -1,141 +1,377 @@
 # src/data_fetcher.py
-import yfinance as yf
 import pandas as pd
+import hashlib
 import logging
+import os
+import pickle
+import tempfile
+import time
 from decimal import Decimal
-from datetime import datetime
-from typing import Dict, Any, List
-from .models import RawPriceData, RawFundamentalData
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from .models import PriceSeries, RawFundamentalData
+from .providers import MarketDataProvider, YFinanceProvider, get_provider
 
 logger = logging.getLogger(__name__)
 
+PRICE_ENDPOINTS = {"history"}
 
-def fetch_stock_data(ticker: str) -> Dict[str, Any]:
+# Balance sheet line items per fundamental field, newest yfinance names first
+LINE_ITEMS = {
+    "TotalAssets": ["Total Assets"],
+    "TotalLiab": ["Total Liabilities Net Minority Interest", "Total Liab"],
+    "ShareholderEquity": [
+        "Stockholders Equity",
+        "Total Stockholder Equity",
+        "Common Stock Equity",
+    ],
+    "SharesOutstanding": ["Ordinary Shares Number", "Share Issued"],
+}
+
+
+class CacheMissError(LookupError):
+    """Raised in offline mode when a response is not in the cache."""
+
+
+# Provider (network) and response-parsing errors an optional fetch falls back on
+FETCH_ERRORS = (OSError, ValueError, KeyError, TypeError, AttributeError)
+
+
+class ResponseCache:
+    """
+    On-disk cache of provider responses, one pickle file per (ticker, endpoint).
+    Prices and fundamentals have separate TTLs. File mtime tracks last use,
+    and the least recently used files are evicted once the cache exceeds
+    `max_size_mb`. In offline mode every lookup is served from disk, expired
+    or not, and a miss raises CacheMissError.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        prices_ttl_hours: float = 12,
+        fundamentals_ttl_hours: float = 168,
+        max_size_mb: float = 2048,
+        offline: bool = False,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.prices_ttl = prices_ttl_hours * 3600
+        self.fundamentals_ttl = fundamentals_ttl_hours * 3600
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._size = sum(f.stat().st_size for f in self.path.glob("*.pkl"))
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{hashlib.sha1(key.encode()).hexdigest()}.pkl"
+
+    def get(self, key: str, endpoint: str) -> Any:
+        """
+        Return the cached value for `key`, or None when missing or expired.
+        """
+        path = self._file(key)
+        try:
+            with open(path, "rb") as f:
+                written_at, value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            if self.offline:
+                raise CacheMissError(f"{key} is not cached (offline mode)")
+            return None
+
+        ttl = self.prices_ttl if endpoint in PRICE_ENDPOINTS else self.fundamentals_ttl
+        if not self.offline and time.time() - written_at > ttl:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass
+        return value
+
+    def put(self, key: str, value: Any):
+        if self.offline:
+            return
+        path = self._file(key)
+        try:
+            # The entry being replaced no longer counts towards the size
+            self._size -= path.stat().st_size
+        except FileNotFoundError:
+            pass
+        # Write to a temp file and rename so parallel workers never read partial files
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((time.time(), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._size += os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in max_size_mb.
+        """
+        entries = []
+        for f in self.path.glob("*.pkl"):
+            try:
+                stat = f.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, f))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, f in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                f.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self._size = total
+        if removed:
+            logger.info(f"Evicted {removed} entries from market data cache")
+
+
+class CachedProvider(MarketDataProvider):
+    """
+    Wraps another provider and serves repeated requests from a ResponseCache.
+    """
+
+    def __init__(self, provider: MarketDataProvider, cache: ResponseCache):
+        self.provider = provider
+        self.cache = cache
+        self.name = f"cached-{provider.name}"
+
+    def _cached(self, ticker: str, endpoint: str, params: str, call):
+        key = f"{ticker}/{endpoint}/{params}"
+        value = self.cache.get(key, endpoint)
+        if value is None:
+            value = call()
+            self.cache.put(key, value)
+        return value
+
+    def history(self, ticker, period="5y", start=None):
+        params = f"start={start}" if start is not None else f"period={period}"
+        return self._cached(
+            ticker,
+            "history",
+            params,
+            lambda: self.provider.history(ticker, period=period, start=start),
+        )
+
+    def info(self, ticker):
+        return self._cached(ticker, "info", "", lambda: self.provider.info(ticker))
+
+    def quarterly_balance_sheet(self, ticker):
+        return self._cached(
+            ticker,
+            "quarterly_balance_sheet",
+            "",
+            lambda: self.provider.quarterly_balance_sheet(ticker),
+        )
+
+    def balance_sheet(self, ticker):
+        return self._cached(
+            ticker, "balance_sheet", "", lambda: self.provider.balance_sheet(ticker)
+        )
+
+
+def build_provider(config: Dict[str, Any]) -> MarketDataProvider:
+    """
+    Provider from `data_source`, wrapped in the response cache when `cache.enabled`.
+    """
+    provider = get_provider(config)
+    settings = config.get("cache", {})
+    if not settings.get("enabled", False):
+        return provider
+    cache = ResponseCache(
+        settings.get("path", ".cache/market_data"),
+        prices_ttl_hours=settings.get("prices_ttl_hours", 12),
+        fundamentals_ttl_hours=settings.get("fundamentals_ttl_hours", 168),
+        max_size_mb=settings.get("max_size_mb", 2048),
+        offline=settings.get("offline", False),
+    )
+    return CachedProvider(provider, cache)
+
+
+class SymbolNotFoundError(ValueError):
+    """Raised when a provider returns no price history at all for a ticker."""
+
+
+def fetch_stock_data(
+    ticker: str,
+    start: Optional[date] = None,
+    provider: Optional[MarketDataProvider] = None,
+    period: str = "5y",
+    fundamentals: bool = True,
+) -> Dict[str, Any]:
     """
     Fetch price and fundamental data for a given ticker.
     Implements fallbacks for missing fundamental data.
     Returns validated raw data.
+    With `start`, only bars on or after that date are fetched (incremental mode);
+    an empty range is not an error and returns an empty PriceSeries.
+    With `fundamentals=False` only prices are fetched (the caller already has
+    fresh stored fundamentals) and the source is "none".
+    `provider` defaults to yfinance.
     """
-    yf_ticker = yf.Ticker(ticker)
+    if provider is None:
+        provider = YFinanceProvider()
 
     # Fetch price data (5y or max for recent IPOs)
     try:
-        hist = yf_ticker.history(period="5y")
+        hist = provider.history(ticker, period=period, start=start)
     except Exception as e:
         logger.error(f"Failed to fetch price data for {ticker}: {e}")
         raise
 
+    price_series = parse_price_history(ticker, hist, start)
+    if not len(price_series) or not fundamentals:
+        return build_raw_data(ticker, price_series, {}, None, "none")
+
+    # Fundamental data strategy: quarterly, then annual, then info
+    info = provider.info(ticker)
+    balance_sheet = optional_balance_sheet(provider.quarterly_balance_sheet, ticker)
+    fundamental_source = "quarterly"
+    if balance_sheet is None or balance_sheet.empty:
+        balance_sheet = optional_balance_sheet(provider.balance_sheet, ticker)
+        fundamental_source = "annual"
+        if balance_sheet is None or balance_sheet.empty:
+            logger.warning(f"No balance sheet data for {ticker}. Using info fallback.")
+            fundamental_source = "info"
+
+    return build_raw_data(ticker, price_series, info, balance_sheet, fundamental_source)
+
+
+def optional_balance_sheet(
+    fetch: Callable[[str], pd.DataFrame], ticker: str
+) -> Optional[pd.DataFrame]:
+    """
+    A balance sheet from `fetch`, or None when the provider fails to return
+    one (FETCH_ERRORS), so the caller falls back to the next source. Other
+    errors, including offline cache misses, are raised.
+    """
+    try:
+        return fetch(ticker)
+    except FETCH_ERRORS as e:
+        logger.debug(f"{fetch.__name__} failed for {ticker}: {e}")
+        return None
+
+
+def parse_price_history(
+    ticker: str, hist: pd.DataFrame, start: Optional[date] = None
+) -> PriceSeries:
+    """
+    Validate a provider history frame into a PriceSeries.
+    An empty frame is an error unless `start` is set (no new bars).
+    """
     if hist.empty:
-        raise ValueError(f"No price history returned for {ticker}")
+        if start is not None:
+            logger.info(f"No new bars for {ticker} since {start}")
+            return PriceSeries.empty()
+        raise SymbolNotFoundError(f"No price history returned for {ticker}")
 
-    # yfinance returns a DatetimeIndex with NO name → reset_index() creates column 'index'
+    # yfinance returns a DatetimeIndex with NO name, so reset_index()
+    # creates a column named 'index'
     hist = hist.reset_index()  # Now has column named 'index'
     hist.rename(columns={"index": "Date"}, inplace=True)  # Rename to 'Date'
 
-    # Ensure Date is date (not datetime)
-    hist["Date"] = pd.to_datetime(hist["Date"]).dt.date
-
-    # Validate and collect price records
-    price_records: List[RawPriceData] = []
-    for _, row in hist.iterrows():
-        try:
-            record = RawPriceData(
-                Date=row["Date"],
-                Open=Decimal(str(row["Open"]))
-                if not pd.isna(row["Open"])
-                else Decimal("0"),
-                High=Decimal(str(row["High"]))
-                if not pd.isna(row["High"])
-                else Decimal("0"),
-                Low=Decimal(str(row["Low"]))
-                if not pd.isna(row["Low"])
-                else Decimal("0"),
-                Close=Decimal(str(row["Close"]))
-                if not pd.isna(row["Close"])
-                else Decimal("0"),
-                Volume=int(row["Volume"]) if not pd.isna(row["Volume"]) else 0,
-            )
-            price_records.append(record)
-        except Exception as e:
-            logger.warning(
-                f"Skipping invalid price row for {ticker} on {row.get('Date')}: {e}"
-            )
+    # Validate all bars at once; NaN prices/volumes become 0
+    price_series = PriceSeries.from_frame(hist)
+    bad_rows = price_series.check_high_ge_low()
+    if bad_rows.size:
+        logger.warning(
+            f"Skipping {bad_rows.size} invalid price rows for {ticker} (High < Low) "
+            f"at rows {bad_rows.tolist()}"
+        )
+        price_series = price_series.drop(bad_rows)
 
-    if not price_records:
+    if not len(price_series):
         raise ValueError(f"No valid price records after validation for {ticker}")
+    return price_series
 
-    # Fundamental data strategy
-    fundamental_source = "none"
-    balance_sheet = None
-    info = yf_ticker.info
 
-    try:
-        balance_sheet = yf_ticker.quarterly_balance_sheet
-        if not balance_sheet.empty:
-            fundamental_source = "quarterly"
-        else:
-            raise ValueError("Quarterly balance sheet empty")
-    except Exception:
-        try:
-            balance_sheet = yf_ticker.balance_sheet
-            if not balance_sheet.empty:
-                fundamental_source = "annual"
-            else:
-                raise ValueError("Annual balance sheet empty")
-        except Exception:
-            logger.warning(f"No balance sheet data for {ticker}. Using info fallback.")
-            fundamental_source = "info"
+def build_raw_data(
+    ticker: str,
+    price_series: PriceSeries,
+    info: Dict[str, Any],
+    balance_sheet: Optional[pd.DataFrame],
+    fundamental_source: str,
+) -> Dict[str, Any]:
+    """
+    Assemble the raw data dict from fetched responses.
+    `fundamental_source` is "quarterly"/"annual" when `balance_sheet` is usable,
+    "info" for the info-only fallback, or "none" when nothing was fetched.
 
-    # Extract fundamental records
+    Balance sheet records keep the values reported on their own date; only
+    shares fall back to the info snapshot when the sheet lacks them. Market
+    cap and enterprise value are current values, so they go in a separate
+    "info" record dated at the last price date rather than onto old reports.
+    """
     fundamental_records: List[RawFundamentalData] = []
+    info_shares = (
+        int(info["sharesOutstanding"]) if info.get("sharesOutstanding") else None
+    )
     if fundamental_source in ["quarterly", "annual"]:
         balance_sheet = balance_sheet.T
         balance_sheet.index = pd.to_datetime(balance_sheet.index).date
         for report_date, row in balance_sheet.iterrows():
-            rec = RawFundamentalData(
-                Date=report_date,
-                TotalAssets=Decimal(str(row.get("Total Assets", 0)))
-                if pd.notna(row.get("Total Assets"))
-                else None,
-                TotalLiab=Decimal(str(row.get("Total Liab", 0)))
-                if pd.notna(row.get("Total Liab"))
-                else None,
-                ShareholderEquity=Decimal(str(row.get("Total Stockholder Equity", 0)))
-                if pd.notna(row.get("Total Stockholder Equity"))
-                else None,
-                SharesOutstanding=int(info.get("sharesOutstanding", 0))
-                if info.get("sharesOutstanding")
-                else None,
-                MarketCap=Decimal(str(info.get("marketCap", 0)))
+            values = {
+                field: _line_item(row, names) for field, names in LINE_ITEMS.items()
+            }
+            shares = values.pop("SharesOutstanding")
+            fundamental_records.append(
+                RawFundamentalData(
+                    Date=report_date,
+                    SharesOutstanding=int(shares)
+                    if shares is not None
+                    else info_shares,
+                    Source=fundamental_source,
+                    **values,
+                )
+            )
+    if fundamental_source != "none" and (
+        info_shares or info.get("marketCap") or info.get("enterpriseValue")
+    ):
+        fundamental_records.append(
+            RawFundamentalData(
+                Date=price_series.last_date,
+                SharesOutstanding=info_shares,
+                MarketCap=Decimal(str(info["marketCap"]))
                 if info.get("marketCap")
                 else None,
-                EnterpriseValue=Decimal(str(info.get("enterpriseValue", 0)))
+                EnterpriseValue=Decimal(str(info["enterpriseValue"]))
                 if info.get("enterpriseValue")
                 else None,
+                Source="info",
             )
-            fundamental_records.append(rec)
-    else:
-        # Fallback: use latest info as of last price date
-        last_date = price_records[-1].Date if price_records else datetime.today().date()
-        rec = RawFundamentalData(
-            Date=last_date,
-            SharesOutstanding=int(info.get("sharesOutstanding", 0))
-            if info.get("sharesOutstanding")
-            else None,
-            MarketCap=Decimal(str(info.get("marketCap", 0)))
-            if info.get("marketCap")
-            else None,
-            EnterpriseValue=Decimal(str(info.get("enterpriseValue", 0)))
-            if info.get("enterpriseValue")
-            else None,
         )
-        fundamental_records = [rec]
 
-    logger.info(f"Used {fundamental_source} fundamental data for {ticker}")
+    if fundamental_source != "none":
+        logger.info(f"Used {fundamental_source} fundamental data for {ticker}")
 
     return {
         "ticker": ticker,
-        "price_data": price_records,
+        "price_data": price_series,
         "fundamental_data": fundamental_records,
         "fundamental_source": fundamental_source,
     }
+
+
+def _line_item(row: pd.Series, names: List[str]) -> Optional[Decimal]:
+    """
+    The first of `names` the balance sheet reports a value for.
+    """
+    for name in names:
+        value = row.get(name)
+        if value is not None and pd.notna(value):
+            return Decimal(str(value))
+    return None
@@ -1,12 +1,81 @@
-from sqlalchemy import create_engine, Column, String, Date, Numeric, Integer
+from sqlalchemy import (
+    create_engine,
+    event,
+    Column,
+    String,
+    Date,
+    Numeric,
+    Integer,
+    Index,
+    MetaData,
+    Text,
+    select,
+    func,
+    text,
+    type_coerce,
+)
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.schema import CreateTable
+import json
+import logging
+import sqlite3
+import time
+import numpy as np
 import pandas as pd
-from typing import List
-from .models import ProcessedDailyMetrics, SignalEvent
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from .config import SCHEMAS
+from .models import (
+    PriceSeries,
+    ProcessedDailyMetrics,
+    RawFundamentalData,
+    SignalEvent,
+)
+from .processor import ROUND_DECIMALS, fundamental_metrics
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# Bound-variable limit per statement, which sizes the chunks of IN-lists
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+# Rows per executemany call; each statement binds only one row's values
+UPSERT_CHUNK_ROWS = 1000
+
+# Compact daily_metrics (database.schema: compact) stores integer day numbers
+# and fixed-point price ticks in a WITHOUT ROWID table clustered on (ticker, date).
+# Compact prices are integer ticks at the precision metrics are rounded to
+PRICE_SCALE = 10**ROUND_DECIMALS
+PRICE_COLUMNS = [
+    "open",
+    "high",
+    "low",
+    "close",
+    "sma_50",
+    "sma_200",
+    "week52_high",
+    "book_value_per_share",
+]
+EPOCH = date(1970, 1, 1)
+
+# daily_metrics columns derived from fundamentals; with
+# fundamentals.daily_columns off they are stored as NULL and joined from the
+# fundamentals table when read
+FUNDAMENTAL_COLUMNS = ["book_value_per_share", "price_to_book", "enterprise_value"]
+
+# fundamentals table column per RawFundamentalData field
+FUNDAMENTAL_FIELD_COLUMNS = {
+    "TotalAssets": "total_assets",
+    "TotalLiab": "total_liab",
+    "ShareholderEquity": "shareholder_equity",
+    "SharesOutstanding": "shares_outstanding",
+    "MarketCap": "market_cap",
+    "EnterpriseValue": "enterprise_value",
+}
+
 
 class DailyMetricsTable(Base):
     __tablename__ = "daily_metrics"
@@ -25,43 +94,926 @@ class DailyMetricsTable(Base):
     price_to_book = Column(Numeric)
     enterprise_value = Column(Numeric)
 
+    __table_args__ = (Index("ix_daily_metrics_date", "date"),)
+
+
+class LatestMetricsTable(Base):
+    """
+    One row per ticker: its most recent daily_metrics row. Kept up to date by
+    save_ticker_results so screens never scan the full history.
+    """
+
+    __tablename__ = "latest_metrics"
+    ticker = Column(String, primary_key=True)
+    date = Column(Date)
+    open = Column(Numeric)
+    high = Column(Numeric)
+    low = Column(Numeric)
+    close = Column(Numeric)
+    volume = Column(Integer)
+    sma_50 = Column(Numeric)
+    sma_200 = Column(Numeric)
+    week52_high = Column(Numeric)
+    pct_from_52w_high = Column(Numeric)
+    book_value_per_share = Column(Numeric)
+    price_to_book = Column(Numeric)
+    enterprise_value = Column(Numeric)
+
+    __table_args__ = (
+        Index("ix_latest_metrics_date", "date"),
+        Index("ix_latest_metrics_close", "close"),
+        Index("ix_latest_metrics_volume", "volume"),
+        Index("ix_latest_metrics_pct_from_52w_high", "pct_from_52w_high"),
+        Index("ix_latest_metrics_price_to_book", "price_to_book"),
+    )
+
 
 class SignalEventsTable(Base):
     __tablename__ = "signal_events"
     ticker = Column(String, primary_key=True)
     date = Column(Date, primary_key=True)
-    signal_type = Column(String)
+    signal_type = Column(String, primary_key=True)
+
+    __table_args__ = (Index("ix_signal_events_type_date", "signal_type", "date"),)
+
+
+class IndicatorStateTable(Base):
+    """
+    Online indicator state per ticker (see src/online.py), stored as JSON.
+    """
+
+    __tablename__ = "indicator_state"
+    ticker = Column(String, primary_key=True)
+    last_date = Column(Date)
+    state = Column(Text)
 
 
-def init_db(db_path: str):
+class FingerprintsTable(Base):
+    """
+    Content fingerprint per ticker and data kind (see src/fingerprint.py),
+    stored as JSON {date key: digest}, used to skip unchanged tickers.
+    """
+
+    __tablename__ = "fingerprints"
+    ticker = Column(String, primary_key=True)
+    kind = Column(String, primary_key=True)
+    digests = Column(Text)
+
+
+class FundamentalsTable(Base):
+    """
+    One row per ticker, report date and source ("quarterly"/"annual" balance
+    sheets, "info" snapshots dated at the price date they were taken), so
+    fundamentals are stored once per report instead of on every trading day.
+    `fetched_on` drives the refresh cadence (fundamentals.refresh_days).
+    """
+
+    __tablename__ = "fundamentals"
+    ticker = Column(String, primary_key=True)
+    report_date = Column(Date, primary_key=True)
+    source = Column(String, primary_key=True)
+    total_assets = Column(Numeric)
+    total_liab = Column(Numeric)
+    shareholder_equity = Column(Numeric)
+    shares_outstanding = Column(Integer)
+    market_cap = Column(Numeric)
+    enterprise_value = Column(Numeric)
+    fetched_on = Column(Date)
+
+
+class TickerVersionsTable(Base):
+    """
+    Data version per ticker, raised on every write of its rows, events or
+    fundamentals. Versions come from one counter shared by all tickers, so
+    MAX(version) is the version of the whole database. Readers (the read API)
+    compare versions to tell whether a cached result is stale.
+    """
+
+    __tablename__ = "ticker_versions"
+    ticker = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+    __table_args__ = (Index("ix_ticker_versions_version", "version"),)
+
+
+def init_db(
+    db_path: str, pragmas: Optional[Dict[str, Any]] = None, schema: str = "numeric"
+):
+    """
+    Create the engine and tables. `pragmas` (e.g. journal_mode: WAL,
+    synchronous: NORMAL) are applied to every new connection. `schema` is the
+    daily_metrics storage schema for a new database; an existing table keeps
+    its schema until migrated with migrate_daily_metrics.
+    """
+    if schema not in SCHEMAS:
+        raise ValueError(
+            f"Unknown storage schema: {schema} (expected one of {SCHEMAS})"
+        )
     engine = create_engine(f"sqlite:///{db_path}")
+    if pragmas:
+
+        @event.listens_for(engine, "connect")
+        def _set_pragmas(dbapi_conn, _):
+            cursor = dbapi_conn.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    with engine.begin() as conn:
+        current = daily_metrics_schema(conn)
+        if current is None and schema == "compact":
+            conn.exec_driver_sql(daily_metrics_ddl("compact"))
+        elif current is not None and current != schema:
+            logger.warning(
+                f"daily_metrics uses the {current} schema, not {schema}; "
+                f"run `python -m src.main migrate --schema {schema}` to convert it"
+            )
     Base.metadata.create_all(engine)
+    migrate_signal_events_key(engine)
+    # create_all skips indexes on tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
     return engine
 
 
-def save_daily_metrics(engine, metrics: List[ProcessedDailyMetrics]):
-    df = pd.DataFrame([m.model_dump() for m in metrics])
-    df.to_sql(
-        "daily_metrics", engine, if_exists="append", index=False, method=upsert_metrics
+def migrate_signal_events_key(engine):
+    """
+    Older databases keyed signal_events on (ticker, date), which allows only one
+    signal per ticker and day. Rebuild such a table with signal_type in the key.
+    """
+    with engine.begin() as conn:
+        info = conn.exec_driver_sql("PRAGMA table_info(signal_events)").fetchall()
+        if any(row[1] == "signal_type" and row[5] for row in info):
+            return
+        logger.info(
+            "Migrating signal_events primary key to (ticker, date, signal_type)"
+        )
+        conn.exec_driver_sql("ALTER TABLE signal_events RENAME TO signal_events_old")
+        conn.exec_driver_sql("DROP INDEX IF EXISTS ix_signal_events_type_date")
+        SignalEventsTable.__table__.create(conn)
+        conn.exec_driver_sql(
+            "INSERT OR IGNORE INTO signal_events (ticker, date, signal_type) "
+            "SELECT ticker, date, signal_type FROM signal_events_old"
+        )
+        conn.exec_driver_sql("DROP TABLE signal_events_old")
+
+
+def daily_metrics_schema(conn) -> Optional[str]:
+    """
+    Storage schema of the daily_metrics table, or None if it does not exist yet.
+    """
+    info = conn.exec_driver_sql("PRAGMA table_info(daily_metrics)").fetchall()
+    if not info:
+        return None
+    types = {row[1]: row[2].upper() for row in info}
+    return "compact" if types["date"] == "INTEGER" else "numeric"
+
+
+def daily_metrics_ddl(
+    schema: str, name: str = "daily_metrics", indicators: Iterable[str] = ()
+) -> str:
+    """
+    CREATE TABLE statement for daily_metrics in the given schema, with the
+    given indicator columns after the model's.
+    """
+    if schema == "numeric":
+        table = DailyMetricsTable.__table__.to_metadata(MetaData(), name=name)
+        for column in indicators:
+            table.append_column(Column(column, Numeric))
+        return str(CreateTable(table).compile(dialect=sqlite.dialect())).strip()
+
+    columns = []
+    for column in DailyMetricsTable.__table__.columns:
+        if column.name == "ticker":
+            columns.append("ticker TEXT NOT NULL")
+        elif column.name == "date":
+            columns.append("date INTEGER NOT NULL")
+        elif column.name in PRICE_COLUMNS or column.name == "volume":
+            columns.append(f"{column.name} INTEGER")
+        else:
+            columns.append(f"{column.name} REAL")
+    columns.extend(f"{column} REAL" for column in indicators)
+    columns.append("PRIMARY KEY (ticker, date)")
+    return f"CREATE TABLE {name} ({', '.join(columns)}) WITHOUT ROWID"
+
+
+def indicator_columns(conn, table: str = "daily_metrics") -> List[str]:
+    """
+    Indicator columns `table` has beyond the model's (see
+    add_indicator_columns), in table order.
+    """
+    model = DailyMetricsTable.__table__.c
+    info = conn.exec_driver_sql(f"PRAGMA table_info({table})").fetchall()
+    return [row[1] for row in info if row[1] not in model]
+
+
+def add_indicator_columns(conn, names: Iterable[str]):
+    """
+    Add a nullable column per configured indicator (src/indicators.py) to
+    daily_metrics and latest_metrics where it is missing. Rows written
+    before it was added read NULL.
+    """
+    compact = daily_metrics_schema(conn) == "compact"
+    for table in ("daily_metrics", "latest_metrics"):
+        existing = set(indicator_columns(conn, table))
+        for name in names:
+            if name in existing:
+                continue
+            kind = "REAL" if compact and table == "daily_metrics" else "NUMERIC"
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+            logger.info(f"Added indicator column {name} to {table}")
+
+
+def decoded_columns(schema: str, columns: List[str]) -> List[str]:
+    """
+    SQL expressions reading daily_metrics `columns` as numeric-schema values.
+    """
+    if schema == "numeric":
+        return list(columns)
+    exprs = []
+    for name in columns:
+        if name == "date":
+            exprs.append("date(date * 86400, 'unixepoch')")
+        elif name in PRICE_COLUMNS:
+            exprs.append(f"{name} / {PRICE_SCALE}.0")
+        else:
+            exprs.append(name)
+    return exprs
+
+
+def encoded_columns(schema: str, columns: List[str]) -> List[str]:
+    """
+    SQL expressions converting numeric-schema values to `schema` (for migration).
+    """
+    if schema == "numeric":
+        return list(columns)
+    exprs = []
+    for name in columns:
+        if name == "date":
+            exprs.append("CAST(julianday(date) - 2440587.5 AS INTEGER)")
+        elif name in PRICE_COLUMNS:
+            exprs.append(f"CAST(ROUND({name} * {PRICE_SCALE}) AS INTEGER)")
+        elif name == "volume":
+            exprs.append("CAST(volume AS INTEGER)")
+        elif name == "ticker":
+            exprs.append(name)
+        else:
+            exprs.append(f"CAST({name} AS REAL)")
+    return exprs
+
+
+def migrate_daily_metrics(engine, schema: str, vacuum: bool = True) -> int:
+    """
+    Rewrite daily_metrics in the given storage schema, in one transaction, then
+    VACUUM to return the freed pages. Returns the number of rows converted
+    (0 when the table is already in that schema).
+    """
+    if schema not in SCHEMAS:
+        raise ValueError(
+            f"Unknown storage schema: {schema} (expected one of {SCHEMAS})"
+        )
+    with engine.begin() as conn:
+        current = daily_metrics_schema(conn)
+        if current == schema:
+            return 0
+        indicators = indicator_columns(conn)
+        columns = [c.name for c in DailyMetricsTable.__table__.columns] + indicators
+        logger.info(
+            f"Migrating daily_metrics from the {current} to the {schema} schema"
+        )
+        # Decode to numeric values first, then encode for the target schema
+        decoded = zip(decoded_columns(current, columns), columns)
+        source = (
+            f"SELECT {', '.join(f'{e} AS {c}' for e, c in decoded)} FROM daily_metrics"
+        )
+        conn.exec_driver_sql(daily_metrics_ddl(schema, "daily_metrics_new", indicators))
+        conn.exec_driver_sql(
+            f"INSERT INTO daily_metrics_new ({', '.join(columns)}) "
+            f"SELECT {', '.join(encoded_columns(schema, columns))} FROM ({source})"
+        )
+        rows = conn.exec_driver_sql("SELECT COUNT(*) FROM daily_metrics_new").scalar()
+        conn.exec_driver_sql("DROP TABLE daily_metrics")
+        conn.exec_driver_sql("ALTER TABLE daily_metrics_new RENAME TO daily_metrics")
+    for index in DailyMetricsTable.__table__.indexes:
+        index.create(engine, checkfirst=True)
+    if vacuum:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
+    return rows
+
+
+@dataclass
+class WriteStats:
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __add__(self, other: "WriteStats") -> "WriteStats":
+        return WriteStats(self.rows + other.rows, self.seconds + other.seconds)
+
+
+def get_last_dates(engine, tickers: Iterable[str]) -> Dict[str, date]:
+    """
+    Latest stored daily_metrics date per ticker; tickers with no rows are omitted.
+    """
+    table = DailyMetricsTable.__table__
+    tickers = list(tickers)
+    last_dates = {}
+    with engine.connect() as conn:
+        compact = daily_metrics_schema(conn) == "compact"
+        last = func.max(table.c.date)
+        if compact:
+            last = type_coerce(last, Integer)
+        for i in range(0, len(tickers), SQLITE_MAX_VARIABLES):
+            stmt = (
+                select(table.c.ticker, last)
+                .where(table.c.ticker.in_(tickers[i : i + SQLITE_MAX_VARIABLES]))
+                .group_by(table.c.ticker)
+            )
+            for ticker, value in conn.execute(stmt):
+                last_dates[ticker] = EPOCH + timedelta(days=value) if compact else value
+    return last_dates
+
+
+def load_price_history(engine, ticker: str, limit: Optional[int] = None) -> PriceSeries:
+    """
+    Stored OHLCV for a ticker in date order; with `limit`, only the most recent bars.
+    """
+    table = DailyMetricsTable.__table__
+    cols = [table.c.date, table.c.open, table.c.high, table.c.low, table.c.close]
+    with engine.connect() as conn:
+        if daily_metrics_schema(conn) == "compact":
+            return _load_compact_history(conn, ticker, limit)
+        stmt = (
+            select(*cols, table.c.volume)
+            .where(table.c.ticker == ticker)
+            .order_by(table.c.date.desc())
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        rows = conn.execute(stmt).fetchall()[::-1]
+    if not rows:
+        return PriceSeries.empty()
+    df = pd.DataFrame(rows, columns=["Date", "Open", "High", "Low", "Close", "Volume"])
+    df[["Open", "High", "Low", "Close"]] = df[["Open", "High", "Low", "Close"]].astype(
+        np.float64
+    )
+    return PriceSeries.from_frame(df)
+
+
+def _load_compact_history(conn, ticker: str, limit: Optional[int]) -> PriceSeries:
+    rows = conn.exec_driver_sql(
+        "SELECT date, open, high, low, close, volume FROM daily_metrics "
+        "WHERE ticker = ? ORDER BY date DESC LIMIT ?",
+        (ticker, -1 if limit is None else limit),
+    ).fetchall()[::-1]
+    if not rows:
+        return PriceSeries.empty()
+    days, open_, high, low, close, volume = zip(*rows)
+    prices = np.array([open_, high, low, close], dtype=np.float64) / PRICE_SCALE
+    return PriceSeries(
+        dates=np.array(days, dtype="datetime64[D]"),
+        open=prices[0],
+        high=prices[1],
+        low=prices[2],
+        close=prices[3],
+        volume=np.array(volume, dtype=np.int64),
+    )
+
+
+def load_metrics(
+    engine, ticker: str, start: Optional[date] = None, end: Optional[date] = None
+) -> pd.DataFrame:
+    """
+    Stored daily_metrics rows for a ticker in date order (all of them, or
+    those from `start` to `end` inclusive), in either schema. Fundamental
+    columns stored as NULL are joined from the fundamentals table.
+    """
+    with engine.connect() as conn:
+        schema = daily_metrics_schema(conn)
+        columns = [c.name for c in DailyMetricsTable.__table__.columns]
+        columns += indicator_columns(conn)
+        exprs = decoded_columns(schema, columns)
+        where, params = "ticker = ?", [ticker]
+        for op, bound in ((">=", start), ("<=", end)):
+            if bound is not None:
+                where += f" AND date {op} ?"
+                params.append(
+                    (bound - EPOCH).days if schema == "compact" else bound.isoformat()
+                )
+        rows = conn.exec_driver_sql(
+            f"SELECT {', '.join(exprs)} FROM daily_metrics WHERE {where} ORDER BY date",
+            tuple(params),
+        ).fetchall()
+    df = pd.DataFrame(rows, columns=columns)
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    df["volume"] = df["volume"].astype(np.int64)
+    float_cols = [c for c in columns if c not in ("ticker", "date", "volume")]
+    df[float_cols] = df[float_cols].astype(np.float64)
+    stored = load_fundamentals(engine, [ticker])
+    if ticker in stored and len(df):
+        joined = fundamental_metrics(
+            df["date"].to_numpy(dtype="datetime64[D]"),
+            df["close"].to_numpy(),
+            stored[ticker][1],
+        )
+        for name, values in joined.items():
+            df[name] = df[name].fillna(
+                pd.Series(values, index=df.index).round(ROUND_DECIMALS)
+            )
+    return df
+
+
+def upsert_sql(
+    table_name: str, columns: List[str], keys: List[str], on_conflict: str = "ignore"
+) -> str:
+    """
+    INSERT ... ON CONFLICT statement for executemany.
+    on_conflict="ignore" keeps existing rows, "update" overwrites them (restatements).
+    """
+    placeholders = ", ".join("?" for _ in columns)
+    sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+    if on_conflict == "ignore":
+        return f"{sql} ON CONFLICT({', '.join(keys)}) DO NOTHING"
+    if on_conflict == "update":
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in keys)
+        if not updates:
+            # Every column is part of the key: nothing to overwrite
+            return f"{sql} ON CONFLICT({', '.join(keys)}) DO NOTHING"
+        return f"{sql} ON CONFLICT({', '.join(keys)}) DO UPDATE SET {updates}"
+    raise ValueError(f"Unknown on_conflict mode: {on_conflict}")
+
+
+def frame_rows(df: pd.DataFrame) -> List[tuple]:
+    """
+    DataFrame rows as DBAPI parameter tuples: NaN becomes NULL, dates ISO strings.
+    """
+    if "date" in df.columns:
+        df = df.assign(date=pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d"))
+    values = df.astype(object).where(df.notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+
+def compact_rows(df: pd.DataFrame) -> List[tuple]:
+    """
+    DataFrame rows for the compact daily_metrics schema: dates as day numbers
+    since 1970-01-01, prices as integer ticks, NaN as NULL.
+    """
+    columns = []
+    for name in df.columns:
+        if name == "date":
+            days = pd.to_datetime(df[name]).to_numpy().astype("datetime64[D]")
+            columns.append(days.astype(np.int64).astype(object))
+            continue
+        values = df[name].to_numpy()
+        if name in PRICE_COLUMNS:
+            values = values.astype(np.float64)
+            missing = np.isnan(values)
+            ticks = np.round(np.where(missing, 0, values) * PRICE_SCALE)
+            values = ticks.astype(np.int64).astype(object)
+            values[missing] = None
+        elif values.dtype.kind == "f":
+            missing = np.isnan(values)
+            values = values.astype(object)
+            values[missing] = None
+        else:
+            values = values.astype(object)
+        columns.append(values)
+    return list(zip(*columns))
+
+
+def bulk_upsert(
+    conn,
+    table_name: str,
+    df: pd.DataFrame,
+    keys: List[str],
+    on_conflict="ignore",
+    encode: Callable[[pd.DataFrame], List[tuple]] = frame_rows,
+) -> int:
+    """
+    Write a frame with executemany on an open connection, UPSERT_CHUNK_ROWS
+    rows per call. Returns the number of rows sent.
+    """
+    if df.empty:
+        return 0
+    columns = list(df.columns)
+    sql = upsert_sql(table_name, columns, keys, on_conflict)
+    rows = encode(df)
+    for i in range(0, len(rows), UPSERT_CHUNK_ROWS):
+        conn.exec_driver_sql(sql, rows[i : i + UPSERT_CHUNK_ROWS])
+    return len(rows)
+
+
+def update_latest_snapshot(conn, metrics: pd.DataFrame):
+    """
+    Move each ticker's latest_metrics row forward to the newest row in `metrics`.
+    """
+    if metrics.empty:
+        return
+    latest = metrics.sort_values("date").groupby("ticker").tail(1)
+    columns = [c.name for c in LatestMetricsTable.__table__.columns]
+    columns += [c for c in metrics.columns if c not in DailyMetricsTable.__table__.c]
+    sql = upsert_sql("latest_metrics", columns, ["ticker"], "update")
+    sql += " WHERE excluded.date >= latest_metrics.date"
+    conn.exec_driver_sql(sql, frame_rows(latest[columns]))
+
+
+def rebuild_latest_snapshot(engine) -> int:
+    """
+    Repopulate latest_metrics from daily_metrics (e.g. for databases written
+    before the snapshot existed). Returns the number of tickers.
+    """
+    with engine.begin() as conn:
+        names = [c.name for c in LatestMetricsTable.__table__.columns]
+        names += indicator_columns(conn)
+        columns = ", ".join(names)
+        values = ", ".join(decoded_columns(daily_metrics_schema(conn), names))
+        conn.execute(text("DELETE FROM latest_metrics"))
+        conn.execute(
+            text(
+                f"INSERT INTO latest_metrics ({columns}) "
+                f"SELECT {values} FROM daily_metrics "
+                "JOIN (SELECT ticker, MAX(date) AS date FROM daily_metrics "
+                "GROUP BY ticker) USING (ticker, date)"
+            )
+        )
+        _fill_latest_fundamentals(conn)
+        return conn.execute(text("SELECT COUNT(*) FROM latest_metrics")).scalar()
+
+
+def _fill_latest_fundamentals(conn):
+    """
+    Set latest_metrics fundamental columns stored as NULL in daily_metrics
+    from the fundamentals table, as of each row's date.
+    """
+    missing = " AND ".join(f"{c} IS NULL" for c in FUNDAMENTAL_COLUMNS)
+    rows = conn.exec_driver_sql(
+        f"SELECT ticker, date, close FROM latest_metrics WHERE {missing}"
+    ).fetchall()
+    if not rows:
+        return
+    stored = _select_fundamentals(conn, [ticker for ticker, _, _ in rows])
+    updates = []
+    for ticker, day, close in rows:
+        if ticker not in stored:
+            continue
+        joined = fundamental_metrics(
+            np.array([day], dtype="datetime64[D]"),
+            np.array([float(close)]),
+            stored[ticker][1],
+        )
+        updates.append(
+            tuple(
+                None
+                if np.isnan(joined[c][0])
+                else round(float(joined[c][0]), ROUND_DECIMALS)
+                for c in FUNDAMENTAL_COLUMNS
+            )
+            + (ticker,)
+        )
+    assignments = ", ".join(f"{c} = ?" for c in FUNDAMENTAL_COLUMNS)
+    if updates:
+        conn.exec_driver_sql(
+            f"UPDATE latest_metrics SET {assignments} WHERE ticker = ?", updates
+        )
+
+
+def metrics_frame(
+    metrics: Union[pd.DataFrame, List[ProcessedDailyMetrics]],
+) -> pd.DataFrame:
+    if isinstance(metrics, pd.DataFrame):
+        return metrics
+    return pd.DataFrame([m.model_dump() for m in metrics])
+
+
+def events_frame(events: Union[pd.DataFrame, List[SignalEvent]]) -> pd.DataFrame:
+    if isinstance(events, pd.DataFrame):
+        return events
+    return pd.DataFrame(
+        [e.model_dump() for e in events], columns=list(SignalEvent.model_fields)
     )
 
 
-def upsert_metrics(table, conn, keys, data_iter):
-    data = [dict(zip(keys, row)) for row in data_iter]
-    stmt = insert(table.table).values(data)
-    stmt = stmt.on_conflict_do_nothing(index_elements=["ticker", "date"])
-    conn.execute(stmt)
+def save_ticker_results(
+    engine,
+    metrics: Union[pd.DataFrame, List[ProcessedDailyMetrics]],
+    events: Union[pd.DataFrame, List[SignalEvent]],
+    on_conflict: str = "ignore",
+    state=None,
+    fundamentals: Optional[List[RawFundamentalData]] = None,
+    fundamental_columns: bool = True,
+    fingerprints: Optional[Dict[str, Dict[str, str]]] = None,
+    replace_from: Optional[date] = None,
+) -> WriteStats:
+    """
+    Write one ticker's metrics and signal events in a single transaction
+    (see write_ticker_results).
+    """
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        rows = write_ticker_results(
+            conn,
+            metrics,
+            events,
+            on_conflict,
+            state,
+            fundamentals,
+            fundamental_columns,
+            fingerprints,
+            replace_from,
+        )
+    stats = WriteStats(rows, time.perf_counter() - started)
+    logger.debug(f"Wrote {stats.rows} rows ({stats.rows_per_sec:,.0f} rows/sec)")
+    return stats
 
 
-def save_signal_events(engine, events: List[SignalEvent]):
-    df = pd.DataFrame([e.model_dump() for e in events])
-    df.to_sql(
-        "signal_events", engine, if_exists="append", index=False, method=upsert_signals
+def write_ticker_results(
+    conn,
+    metrics: Union[pd.DataFrame, List[ProcessedDailyMetrics]],
+    events: Union[pd.DataFrame, List[SignalEvent]],
+    on_conflict: str = "ignore",
+    state=None,
+    fundamentals: Optional[List[RawFundamentalData]] = None,
+    fundamental_columns: bool = True,
+    fingerprints: Optional[Dict[str, Dict[str, str]]] = None,
+    replace_from: Optional[date] = None,
+) -> int:
+    """
+    Write one ticker's metrics and signal events on `conn`, inside the
+    caller's transaction, and return the rows written.
+    An online IndicatorState is saved in the same transaction, so the stored
+    state always matches the stored rows, and so are freshly fetched
+    `fundamentals` records and the input `fingerprints`. With
+    fundamental_columns=False the daily_metrics FUNDAMENTAL_COLUMNS are stored
+    as NULL (load_metrics joins them back); latest_metrics always gets the
+    values so screens can filter on them. With `replace_from` the ticker's
+    stored rows and events from that date on are deleted first, for inputs
+    that changed from that date (e.g. a split-adjusted history). Columns for
+    configured indicators are added to the tables the first time they appear.
+    """
+    metrics = metrics_frame(metrics)
+    events = events_frame(events)
+    daily = metrics
+    if not fundamental_columns and not metrics.empty:
+        daily = metrics.assign(**dict.fromkeys(FUNDAMENTAL_COLUMNS, np.nan))
+    indicators = [c for c in metrics.columns if c not in DailyMetricsTable.__table__.c]
+    if indicators:
+        add_indicator_columns(conn, indicators)
+    compact = daily_metrics_schema(conn) == "compact"
+    if replace_from is not None and not metrics.empty:
+        delete_from(conn, metrics["ticker"].iloc[0], replace_from, compact)
+    rows = bulk_upsert(
+        conn,
+        "daily_metrics",
+        daily,
+        ["ticker", "date"],
+        on_conflict,
+        compact_rows if compact else frame_rows,
     )
+    update_latest_snapshot(conn, metrics)
+    rows += bulk_upsert(
+        conn,
+        "signal_events",
+        events,
+        ["ticker", "date", "signal_type"],
+        on_conflict,
+    )
+    if state is not None:
+        save_indicator_state(conn, state)
+    if fundamentals and not metrics.empty:
+        save_fundamentals(conn, metrics["ticker"].iloc[0], fundamentals)
+    if fingerprints and not metrics.empty:
+        save_fingerprints(conn, metrics["ticker"].iloc[0], fingerprints)
+    tickers = [*metrics.get("ticker", []), *events.get("ticker", [])]
+    bump_versions(conn, dict.fromkeys(tickers))
+    return rows
+
+
+def delete_from(conn, ticker: str, since: date, compact: bool = False):
+    """
+    Delete a ticker's daily_metrics rows, signal events and (if it is among
+    them) latest_metrics row dated on or after `since`.
+    """
+    day = (since - EPOCH).days if compact else since.isoformat()
+    conn.exec_driver_sql(
+        "DELETE FROM daily_metrics WHERE ticker = ? AND date >= ?", (ticker, day)
+    )
+    for table in ("signal_events", "latest_metrics"):
+        conn.exec_driver_sql(
+            f"DELETE FROM {table} WHERE ticker = ? AND date >= ?",
+            (ticker, since.isoformat()),
+        )
+
+
+def bump_versions(conn, tickers: Iterable[str]):
+    """
+    Give each ticker the next data version, on an open connection.
+    """
+    rows = [(ticker,) for ticker in tickers]
+    if rows:
+        conn.exec_driver_sql(
+            "INSERT INTO ticker_versions (ticker, version) "
+            "SELECT ?, COALESCE(MAX(version), 0) + 1 FROM ticker_versions "
+            "WHERE true ON CONFLICT (ticker) DO UPDATE SET version = excluded.version",
+            rows,
+        )
+
+
+def load_versions(conn, tickers: Iterable[str]) -> Dict[str, int]:
+    """
+    Data version per ticker; 0 for tickers not written since versions were
+    added.
+    """
+    tickers = list(tickers)
+    versions = dict.fromkeys(tickers, 0)
+    for i in range(0, len(tickers), SQLITE_MAX_VARIABLES):
+        chunk = tickers[i : i + SQLITE_MAX_VARIABLES]
+        versions.update(
+            conn.exec_driver_sql(
+                "SELECT ticker, version FROM ticker_versions "
+                f"WHERE ticker IN ({', '.join('?' for _ in chunk)})",
+                tuple(chunk),
+            ).fetchall()
+        )
+    return versions
+
+
+def database_version(conn) -> int:
+    """
+    The newest data version of any ticker (0 for a database never written).
+    """
+    return conn.exec_driver_sql(
+        "SELECT COALESCE(MAX(version), 0) FROM ticker_versions"
+    ).scalar()
+
+
+def save_fingerprints(conn, ticker: str, fingerprints: Dict[str, Dict[str, str]]):
+    """
+    Upsert one ticker's fingerprints on an open connection.
+    """
+    sql = upsert_sql(
+        "fingerprints", ["ticker", "kind", "digests"], ["ticker", "kind"], "update"
+    )
+    conn.exec_driver_sql(
+        sql,
+        [
+            (ticker, kind, json.dumps(digests, sort_keys=True))
+            for kind, digests in fingerprints.items()
+        ],
+    )
+
+
+def load_fingerprints(
+    engine, tickers: Iterable[str]
+) -> Dict[str, Dict[str, Dict[str, str]]]:
+    """
+    Stored fingerprints per ticker ({kind: {date key: digest}}); tickers
+    without any are omitted.
+    """
+    table = FingerprintsTable.__table__
+    tickers = list(tickers)
+    stored: Dict[str, Dict[str, Dict[str, str]]] = {}
+    with engine.connect() as conn:
+        for i in range(0, len(tickers), SQLITE_MAX_VARIABLES):
+            stmt = select(table).where(
+                table.c.ticker.in_(tickers[i : i + SQLITE_MAX_VARIABLES])
+            )
+            for ticker, kind, digests in conn.execute(stmt):
+                stored.setdefault(ticker, {})[kind] = json.loads(digests)
+    return stored
+
+
+def save_indicator_state(conn, state):
+    """
+    Upsert one IndicatorState on an open connection.
+    """
+    sql = upsert_sql(
+        "indicator_state", ["ticker", "last_date", "state"], ["ticker"], "update"
+    )
+    last_date = state.last_date.isoformat() if state.last_date else None
+    conn.exec_driver_sql(sql, (state.ticker, last_date, json.dumps(state.to_dict())))
+
+
+def save_fundamentals(
+    conn,
+    ticker: str,
+    records: List[RawFundamentalData],
+    fetched_on: Optional[date] = None,
+) -> int:
+    """
+    Upsert one ticker's fundamentals records on an open connection. Reports
+    seen before are overwritten (restatements); older ones are kept.
+    """
+    fetched_on = fetched_on or date.today()
+    columns = ["ticker", "report_date", "source", *FUNDAMENTAL_FIELD_COLUMNS.values()]
+    sql = upsert_sql(
+        "fundamentals",
+        columns + ["fetched_on"],
+        ["ticker", "report_date", "source"],
+        "update",
+    )
+    rows = [
+        (
+            ticker,
+            record.Date.isoformat(),
+            getattr(record, "Source", None) or "unknown",
+            *(
+                _sql_value(getattr(record, field, None))
+                for field in FUNDAMENTAL_FIELD_COLUMNS
+            ),
+            fetched_on.isoformat(),
+        )
+        for record in records
+    ]
+    conn.exec_driver_sql(sql, rows)
+    return len(rows)
+
+
+def _sql_value(value):
+    return float(value) if value is not None and not isinstance(value, int) else value
+
+
+def load_fundamentals(
+    engine, tickers: Iterable[str]
+) -> Dict[str, Tuple[date, List[RawFundamentalData]]]:
+    """
+    Stored fundamentals per ticker as (last fetch date, records in report
+    date order); tickers without records are omitted.
+    """
+    with engine.connect() as conn:
+        return _select_fundamentals(conn, list(tickers))
+
+
+def _select_fundamentals(
+    conn, tickers: List[str]
+) -> Dict[str, Tuple[date, List[RawFundamentalData]]]:
+    table = FundamentalsTable.__table__
+    fields = list(FUNDAMENTAL_FIELD_COLUMNS)
+    cols = [table.c[name] for name in FUNDAMENTAL_FIELD_COLUMNS.values()]
+    stored: Dict[str, Tuple[date, List[RawFundamentalData]]] = {}
+    for i in range(0, len(tickers), SQLITE_MAX_VARIABLES):
+        stmt = (
+            select(
+                table.c.ticker,
+                table.c.report_date,
+                table.c.source,
+                *cols,
+                table.c.fetched_on,
+            )
+            .where(table.c.ticker.in_(tickers[i : i + SQLITE_MAX_VARIABLES]))
+            .order_by(table.c.ticker, table.c.report_date)
+        )
+        for ticker, report_date, source, *values, fetched_on in conn.execute(stmt):
+            last, records = stored.get(ticker, (fetched_on, []))
+            records.append(
+                RawFundamentalData(
+                    Date=report_date, Source=source, **dict(zip(fields, values))
+                )
+            )
+            stored[ticker] = (max(last, fetched_on), records)
+    return stored
+
+
+def load_indicator_states(
+    engine, tickers: Iterable[str], indicators: Iterable = ()
+) -> Dict[str, Any]:
+    """
+    Stored IndicatorState per ticker; tickers without state, or whose state
+    was saved for other configured `indicators`, are omitted.
+    """
+    from .online import IndicatorState
+
+    table = IndicatorStateTable.__table__
+    tickers = list(tickers)
+    indicators = list(indicators)
+    states = {}
+    with engine.connect() as conn:
+        for i in range(0, len(tickers), SQLITE_MAX_VARIABLES):
+            stmt = select(table).where(
+                table.c.ticker.in_(tickers[i : i + SQLITE_MAX_VARIABLES])
+            )
+            for ticker, last_date, payload in conn.execute(stmt):
+                data = json.loads(payload)
+                if IndicatorState.stored_for(data, indicators):
+                    states[ticker] = IndicatorState.from_dict(
+                        ticker, last_date, data, indicators
+                    )
+    return states
+
+
+def save_daily_metrics(
+    engine,
+    metrics: Union[pd.DataFrame, List[ProcessedDailyMetrics]],
+    on_conflict: str = "ignore",
+) -> WriteStats:
+    return save_ticker_results(engine, metrics, [], on_conflict)
 
 
-def upsert_signals(table, conn, keys, data_iter):
-    data = [dict(zip(keys, row)) for row in data_iter]
-    stmt = insert(table.table).values(data)
-    stmt = stmt.on_conflict_do_nothing(index_elements=["ticker", "date"])
-    conn.execute(stmt)
+def save_signal_events(
+    engine, events: List[SignalEvent], on_conflict: str = "ignore"
+) -> WriteStats:
+    return save_ticker_results(engine, pd.DataFrame(), events, on_conflict)
@@ -0,0 +1,169 @@
+# src/fingerprint.py
+import hashlib
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from .models import PriceSeries
+
+# Data kinds fingerprinted per ticker. Each fingerprint maps an ISO date key
+# (the first date its content covers) to a digest of that content.
+FINGERPRINT_KINDS = ("prices", "balance_sheet", "info", "rules")
+
+# Key for content that applies to the whole history (the signal rules)
+WHOLE_HISTORY = date.min.isoformat()
+
+Fingerprints = Dict[str, Dict[str, str]]
+
+# Trailing months of bars that also get one digest per bar: enough to cover
+# the previous run's last month when the next run starts a new one
+BAR_MONTHS = 2
+
+
+def _digest(*parts: bytes) -> str:
+    h = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        h.update(part)
+    return h.hexdigest()
+
+
+def price_fingerprint(series: PriceSeries) -> Dict[str, str]:
+    """
+    One digest per calendar month of bars, keyed by the month's first day, so
+    a rewritten history (e.g. a split adjustment) is located to the month it
+    starts in. Bars in the last BAR_MONTHS months also get a digest each
+    ("<date>/bar"), so new bars are located to their own dates, and the first
+    bar is keyed "<date>/first" to mark where the fetched window starts.
+    """
+    if not len(series):
+        return {}
+    months = series.dates.astype("datetime64[M]")
+    starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+    ends = np.r_[starts[1:], len(series)]
+    columns = [series.dates.astype(np.int64)] + [
+        np.ascontiguousarray(getattr(series, name)) for name in PriceSeries.FIELDS
+    ]
+
+    def digest(start: int, end: int) -> str:
+        return _digest(*(column[start:end].tobytes() for column in columns))
+
+    prints = {
+        str(months[start].astype("datetime64[D]")): digest(start, end)
+        for start, end in zip(starts, ends)
+    }
+    prints[f"{series.dates[0]}/first"] = digest(0, 1)
+    for i in range(starts[-BAR_MONTHS:][0], len(series)):
+        prints[f"{series.dates[i]}/bar"] = digest(i, i + 1)
+    return prints
+
+
+def _record_digest(record) -> str:
+    values = [
+        getattr(record, name, None)
+        for name in (
+            "TotalAssets",
+            "TotalLiab",
+            "ShareholderEquity",
+            "SharesOutstanding",
+            "MarketCap",
+            "EnterpriseValue",
+        )
+    ]
+    # float() so a value read back from the database hashes like the fetched one
+    return _digest(repr([None if v is None else float(v) for v in values]).encode())
+
+
+def fundamentals_fingerprints(records: Iterable) -> Fingerprints:
+    """
+    Balance sheet and info digests, one per record keyed by its report date
+    (and source, as quarterly and annual reports can share a date).
+    """
+    prints: Fingerprints = {"balance_sheet": {}, "info": {}}
+    for record in records or []:
+        source = getattr(record, "Source", None) or "unknown"
+        kind = "info" if source == "info" else "balance_sheet"
+        prints[kind][f"{record.Date.isoformat()}/{source}"] = _record_digest(record)
+    return prints
+
+
+def rules_fingerprint(rules: List[Any]) -> Dict[str, str]:
+    return {WHOLE_HISTORY: _digest(repr(list(rules)).encode())}
+
+
+def fingerprint_raw(raw: Dict[str, Any], rules: List[Any]) -> Fingerprints:
+    """
+    Fingerprints of every FINGERPRINT_KINDS input for one ticker's raw data.
+    """
+    series = raw["price_data"]
+    if not isinstance(series, PriceSeries):
+        series = PriceSeries.from_records(series)
+    return {
+        "prices": price_fingerprint(series),
+        **fundamentals_fingerprints(raw["fundamental_data"]),
+        "rules": rules_fingerprint(rules),
+    }
+
+
+def first_changed(old: Fingerprints, new: Fingerprints) -> Optional[date]:
+    """
+    The earliest date whose inputs differ between two fingerprints (keys
+    added, removed or with a different digest), or None when they match.
+    date.min means everything changed (or nothing was stored). Prices are
+    compared only where both fetched windows overlap (see _price_changes).
+    """
+    changed = [
+        key
+        for kind in FINGERPRINT_KINDS
+        if kind != "prices"
+        for key in old.get(kind, {}).keys() | new.get(kind, {}).keys()
+        if old.get(kind, {}).get(key) != new.get(kind, {}).get(key)
+    ]
+    changed += _price_changes(old.get("prices", {}), new.get("prices", {}))
+    if not old:
+        return date.min
+    if not changed:
+        return None
+    return min(date.fromisoformat(key[:10]) for key in changed)
+
+
+def _first_bar(prints: Dict[str, str]) -> str:
+    # Fingerprints stored before "/first" keys existed start at their first month
+    firsts = [key[:10] for key in prints if key.endswith("/first")]
+    return firsts[0] if firsts else min(key for key in prints if "/" not in key)
+
+
+def _price_changes(old: Dict[str, str], new: Dict[str, str]) -> List[str]:
+    """
+    Keys of the price months (or, where both sides have per-bar digests, the
+    bars) that differ within the range both fingerprints cover. A rolling
+    fetch window drops its oldest bars, so months before the later first bar
+    are ignored, and so is that bar's month unless both windows start there:
+    it is the partial edge of the window, not a restatement.
+    """
+    if not old or not new:
+        return [key for key in old.keys() | new.keys() if "/" not in key]
+    edge = max(_first_bar(old), _first_bar(new))
+    same_start = _first_bar(old) == _first_bar(new)
+    changed = []
+    for month in {k for k in old.keys() | new.keys() if "/" not in k}:
+        if month[:7] < edge[:7] or (month[:7] == edge[:7] and not same_start):
+            continue
+        if old.get(month) == new.get(month):
+            continue
+        bars = [
+            {
+                k: v
+                for k, v in prints.items()
+                if k.endswith("/bar") and k[:7] == month[:7]
+            }
+            for prints in (old, new)
+        ]
+        if all(bars) or month not in old or month not in new:
+            # Per-bar digests locate the differing (or added) bars
+            changed += [
+                key
+                for key in bars[0].keys() | bars[1].keys()
+                if bars[0].get(key) != bars[1].get(key)
+            ] or [month]
+        else:
+            changed.append(month)
+    return changed
@@ -0,0 +1,405 @@
+# src/indicators.py
+"""
+Indicator registry and the engine that computes daily_metrics indicator
+columns.
+
+The built-in columns (sma_50, sma_200, week52_high) and the ones declared
+under `indicators` in config.yaml are computed together in one pass over a
+bars x tickers price panel (one column for a single ticker). Indicators share
+intermediate results: every rolling mean of a source comes from one
+cumulative sum, the two Bollinger bands of a window share its mean and
+standard deviation, and ATR and RSI share the previous close.
+OnlineIndicator applies the same definitions one bar at a time for online
+mode.
+"""
+
+import hashlib
+import logging
+import math
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .models import ProcessedDailyMetrics
+
+logger = logging.getLogger(__name__)
+
+# Bars of history the longest rolling indicator (52-week high) needs; the
+# longest window an indicator may use
+WARMUP_BARS = 252
+
+# Weight the starting value of a recursive indicator (EMA, RSI, ATR) may
+# still carry after its warmup (see warmup_bars)
+SEED_WEIGHT = 1e-9
+
+SOURCES = ("open", "high", "low", "close", "volume")
+TYPES = ("sma", "ema", "max", "rsi", "atr", "bollinger_upper", "bollinger_lower")
+
+_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    """
+    An indicator column declared in config.yaml under `indicators`.
+
+    type "sma":  mean of `source` over the last `window` bars
+    type "ema":  exponential moving average of `source` with span `window`
+    type "max":  highest `source` over the last `window` bars
+    type "rsi":  Wilder's relative strength index of close (0-100)
+    type "atr":  Wilder's average true range
+    type "bollinger_upper" / "bollinger_lower":  `window`-bar mean of close
+                 plus / minus `k` population standard deviations
+
+    Windows use the bars available until they fill (like the built-in SMAs).
+    `store: false` keeps the column out of daily_metrics and the output files;
+    such an indicator is only computed when a signal rule uses it.
+    """
+
+    name: str
+    type: str
+    window: int
+    source: str = "close"
+    k: float = 2.0
+    store: bool = True
+
+    def sources(self) -> Tuple[str, ...]:
+        if self.type == "atr":
+            return ("high", "low", "close")
+        if self.type in ("rsi", "bollinger_upper", "bollinger_lower"):
+            return ("close",)
+        return (self.source,)
+
+
+BUILTIN_INDICATORS = [
+    IndicatorSpec("sma_50", "sma", 50),
+    IndicatorSpec("sma_200", "sma", 200),
+    IndicatorSpec("week52_high", "max", WARMUP_BARS),
+]
+
+# Names an indicator cannot take: the daily_metrics model columns
+RESERVED_NAMES = set(ProcessedDailyMetrics.model_fields)
+
+
+def load_indicators(
+    config: Dict[str, Any], rules: Optional[Iterable] = None
+) -> List[IndicatorSpec]:
+    """
+    The indicators declared under `indicators` in config that something
+    consumes: stored ones (output files, screens) and those the signal
+    `rules` refer to. Raises ValueError for an invalid declaration.
+    """
+    used = {column for rule in rules or [] for column in rule.columns()}
+    specs, seen = [], set()
+    for entry in config.get("indicators") or []:
+        try:
+            spec = IndicatorSpec(**entry)
+        except TypeError as e:
+            raise ValueError(f"Indicator {entry.get('name')}: {e}")
+        if not _NAME.match(spec.name) or spec.name in RESERVED_NAMES:
+            raise ValueError(f"Indicator {spec.name!r}: invalid or reserved name")
+        if spec.name in seen:
+            raise ValueError(f"Indicator {spec.name}: declared twice")
+        if spec.type not in TYPES:
+            raise ValueError(f"Indicator {spec.name}: unknown type {spec.type}")
+        if spec.source not in SOURCES:
+            raise ValueError(f"Indicator {spec.name}: unknown source {spec.source}")
+        if not 1 <= spec.window <= WARMUP_BARS:
+            raise ValueError(
+                f"Indicator {spec.name}: window must be 1 to {WARMUP_BARS} bars"
+            )
+        seen.add(spec.name)
+        if not spec.store and spec.name not in used:
+            logger.info(
+                f"Indicator {spec.name} is not stored or used by a rule; skipped"
+            )
+            continue
+        specs.append(spec)
+    return specs
+
+
+def warmup_bars(specs: Iterable[IndicatorSpec]) -> int:
+    """
+    Stored bars to replay before new ones in incremental and online runs.
+    Windowed indicators need WARMUP_BARS; a recursive one never forgets its
+    starting value, so it replays until that value's weight falls below
+    SEED_WEIGHT and continues where a full recompute of the stored history
+    would be.
+    """
+    bars = WARMUP_BARS
+    for spec in specs:
+        if spec.type not in ("ema", "rsi", "atr"):
+            continue
+        alpha = 2 / (spec.window + 1) if spec.type == "ema" else 1 / spec.window
+        if alpha < 1:
+            bars = max(bars, math.ceil(math.log(SEED_WEIGHT) / math.log(1 - alpha)))
+    return bars
+
+
+def indicators_key(specs: Iterable[IndicatorSpec]) -> Optional[str]:
+    """
+    A digest of the indicator set (None for none), stored with online states
+    so a state built for other indicators is rebuilt.
+    """
+    specs = list(specs)
+    if not specs:
+        return None
+    return hashlib.blake2b(repr(specs).encode(), digest_size=8).hexdigest()
+
+
+def stack_closes(closes: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stack per-ticker close arrays into a bars x tickers panel.
+    Histories are left-aligned on their first bar, so every column is indexed by
+    bar number rather than calendar date; shorter histories (recent IPOs) are
+    padded with NaN at the end. Returns (panel, lengths).
+    """
+    lengths = np.array([len(c) for c in closes], dtype=np.int64)
+    panel = np.full((int(lengths.max(initial=0)), len(closes)), np.nan)
+    for j, close in enumerate(closes):
+        panel[: len(close), j] = close
+    return panel, lengths
+
+
+def rolling_mean(panel: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing mean over `window` bars per column (min_periods=1), from cumulative sums.
+    """
+    return IndicatorPass({"close": panel}).mean("close", window)
+
+
+def rolling_max(panel: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing max over `window` bars per column (min_periods=1) using the
+    van Herk/Gil-Werman block kernel: O(1) work per element for any window.
+    """
+    n, k = panel.shape
+    if n == 0:
+        return panel.copy()
+    values = np.where(np.isnan(panel), -np.inf, panel)
+    blocks = -(-(n + window - 1) // window)
+    padded = np.full((blocks * window, k), -np.inf)
+    padded[window - 1 : window - 1 + n] = values
+    padded = padded.reshape(blocks, window, k)
+    prefix = np.maximum.accumulate(padded, axis=1).reshape(-1, k)
+    suffix = np.maximum.accumulate(padded[:, ::-1], axis=1)[:, ::-1].reshape(-1, k)
+    # Window ending at padded row i + window - 1 starts at row i
+    out = np.maximum(suffix[:n], prefix[window - 1 : window - 1 + n])
+    return np.where(np.isnan(panel), np.nan, out)
+
+
+def _wilder(values: np.ndarray, alpha: float) -> np.ndarray:
+    # Recursive average y = y' + alpha * (x - y'), seeded with the first value
+    return pd.DataFrame(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+class IndicatorPass:
+    """
+    One pass over a price panel: `prices` maps each source an indicator needs
+    to a bars x tickers array (NaN after each ticker's last bar). Intermediate
+    results are computed once and shared by every indicator that needs them.
+    """
+
+    def __init__(self, prices: Dict[str, np.ndarray]):
+        self.prices = {k: np.asarray(v, dtype=np.float64) for k, v in prices.items()}
+        self._shared: Dict[tuple, Any] = {}
+
+    def _share(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        if key not in self._shared:
+            self._shared[key] = compute()
+        return self._shared[key]
+
+    def valid(self, source: str) -> np.ndarray:
+        return self._share(("valid", source), lambda: ~np.isnan(self.prices[source]))
+
+    def _cumsum(self, source: str) -> np.ndarray:
+        # Values are shifted by each column's first value to keep the sums small
+        def compute():
+            panel = self.prices[source]
+            base = panel[:1] if len(panel) else np.zeros((1, panel.shape[1]))
+            return np.cumsum(np.where(self.valid(source), panel - base, 0.0), axis=0)
+
+        return self._share(("cumsum", source), compute)
+
+    def mean(self, source: str, window: int) -> np.ndarray:
+        def compute():
+            panel, csum = self.prices[source], self._cumsum(source)
+            base = panel[:1] if len(panel) else np.zeros((1, panel.shape[1]))
+            total = csum.copy()
+            total[window:] -= csum[:-window]
+            count = np.minimum(np.arange(1, len(panel) + 1), window)[:, None]
+            return np.where(self.valid(source), total / count + base, np.nan)
+
+        return self._share(("mean", source, window), compute)
+
+    def std(self, source: str, window: int) -> np.ndarray:
+        # pandas' rolling variance stays exact for flat prices, where the
+        # difference of cumulative sums of squares would not
+        return self._share(
+            ("std", source, window),
+            lambda: (
+                pd.DataFrame(self.prices[source])
+                .rolling(window, min_periods=1)
+                .std(ddof=0)
+                .to_numpy()
+            ),
+        )
+
+    def previous_close(self) -> np.ndarray:
+        def compute():
+            close = self.prices["close"]
+            prev = np.full_like(close, np.nan)
+            prev[1:] = close[:-1]
+            return prev
+
+        return self._share(("previous_close",), compute)
+
+    def true_range(self) -> np.ndarray:
+        def compute():
+            high, low = self.prices["high"], self.prices["low"]
+            prev = self.previous_close()
+            # fmax ignores the missing previous close on the first bar
+            return np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+
+        return self._share(("true_range",), compute)
+
+    def compute(self, spec: IndicatorSpec) -> np.ndarray:
+        if spec.type == "sma":
+            out = self.mean(spec.source, spec.window)
+        elif spec.type == "max":
+            out = self._share(
+                ("max", spec.source, spec.window),
+                lambda: rolling_max(self.prices[spec.source], spec.window),
+            )
+        elif spec.type == "ema":
+            out = _wilder(self.prices[spec.source], 2.0 / (spec.window + 1))
+        elif spec.type == "rsi":
+            # No change on the first bar: the averages start on the second
+            change = self.prices["close"] - self.previous_close()
+            gain = _wilder(np.maximum(change, 0.0), 1.0 / spec.window)
+            loss = _wilder(np.maximum(-change, 0.0), 1.0 / spec.window)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out = 100 * gain / (gain + loss)
+        elif spec.type == "atr":
+            out = _wilder(self.true_range(), 1.0 / spec.window)
+        else:
+            mean = self.mean("close", spec.window)
+            width = spec.k * self.std("close", spec.window)
+            out = mean + width if spec.type == "bollinger_upper" else mean - width
+        return np.where(self.valid(spec.sources()[-1]), out, np.nan)
+
+
+def compute_indicators(
+    prices: Dict[str, np.ndarray], specs: Iterable[IndicatorSpec]
+) -> Dict[str, np.ndarray]:
+    """
+    The built-in indicators and `specs` for a price panel, in one pass.
+    """
+    engine = IndicatorPass(prices)
+    return {spec.name: engine.compute(spec) for spec in [*BUILTIN_INDICATORS, *specs]}
+
+
+def required_sources(specs: Iterable[IndicatorSpec]) -> List[str]:
+    needed = {"close"}
+    for spec in specs:
+        needed.update(spec.sources())
+    return [source for source in SOURCES if source in needed]
+
+
+class OnlineIndicator:
+    """
+    One configured indicator advanced a bar at a time in O(1), with the same
+    definitions as IndicatorPass: running sums over a buffer of the last
+    `window` values, a monotonic deque for maxima, and the last averages for
+    the recursive (EMA, RSI, ATR) indicators.
+    """
+
+    def __init__(self, spec: IndicatorSpec, state: Optional[Dict[str, Any]] = None):
+        self.spec = spec
+        state = state or {}
+        self.bars: int = state.get("bars", 0)
+        self.values: deque = deque(state.get("values", []), maxlen=spec.window)
+        self.sums: List[float] = state.get("sums", [0.0, 0.0])
+        self.maxima: deque = deque(tuple(e) for e in state.get("maxima", []))
+        self.average: Optional[float] = state.get("average")
+        self.gain: Optional[float] = state.get("gain")
+        self.loss: Optional[float] = state.get("loss")
+        self.previous: Optional[float] = state.get("previous")
+
+    def update(self, bar: Dict[str, float]) -> float:
+        spec = self.spec
+        if spec.type in ("sma", "bollinger_upper", "bollinger_lower"):
+            return self._window(bar[spec.source])
+        if spec.type == "max":
+            value = bar[spec.source]
+            while self.maxima and self.maxima[-1][1] <= value:
+                self.maxima.pop()
+            self.maxima.append((self.bars, value))
+            while self.maxima[0][0] <= self.bars - spec.window:
+                self.maxima.popleft()
+            self.bars += 1
+            return self.maxima[0][1]
+        if spec.type == "ema":
+            self.average = _recurse(
+                self.average, bar[spec.source], spec.window / 2 + 0.5
+            )
+            return self.average
+        if spec.type == "rsi":
+            close, previous = bar["close"], self.previous
+            self.previous = close
+            if previous is None:
+                return math.nan
+            change = close - previous
+            self.gain = _recurse(self.gain, max(change, 0.0), spec.window)
+            self.loss = _recurse(self.loss, max(-change, 0.0), spec.window)
+            total = self.gain + self.loss
+            return 100 * self.gain / total if total else math.nan
+        # atr
+        high, low, previous = bar["high"], bar["low"], self.previous
+        self.previous = bar["close"]
+        true_range = high - low
+        if previous is not None:
+            true_range = max(true_range, abs(high - previous), abs(low - previous))
+        self.average = _recurse(self.average, true_range, spec.window)
+        return self.average
+
+    def _window(self, value: float) -> float:
+        window = self.spec.window
+        if len(self.values) == window:
+            old = self.values[0]
+            self.sums[0] -= old
+            self.sums[1] -= old * old
+        self.values.append(value)
+        self.sums[0] += value
+        self.sums[1] += value * value
+        self.bars += 1
+        if self.bars % window == 0:
+            # Re-sum from the buffer now and then so rounding error cannot build up
+            self.sums = [math.fsum(self.values), math.fsum(v * v for v in self.values)]
+        count = len(self.values)
+        mean = self.sums[0] / count
+        if self.spec.type == "sma":
+            return mean
+        width = self.spec.k * math.sqrt(max(self.sums[1] / count - mean * mean, 0.0))
+        return mean + width if self.spec.type == "bollinger_upper" else mean - width
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bars": self.bars,
+            "values": list(self.values),
+            "sums": self.sums,
+            "maxima": [list(entry) for entry in self.maxima],
+            "average": self.average,
+            "gain": self.gain,
+            "loss": self.loss,
+            "previous": self.previous,
+        }
+
+
+def _recurse(average: Optional[float], value: float, window: float) -> float:
+    # The recursive average _wilder computes, with alpha = 1 / window
+    if average is None:
+        return value
+    return average + (value - average) / window
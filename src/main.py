@@ -1,80 +1,405 @@
 # src/main.py
+"""
+Command-line entry point.
+
+Only the standard library and the config loader are imported at module load;
+each command imports what it needs when it runs, so `--help` and commands that
+only read the database do not pay for yfinance, the fetch stack or the
+indicator code (see tests/test_cli.py for the import-time budget).
+"""
+
 import argparse
 import logging
-import json
 from pathlib import Path
-from .config import load_config
-from .data_fetcher import fetch_stock_data
-from .processor import process_data
-from .signals import detect_golden_crossover, detect_death_cross
-from .database import init_db, save_daily_metrics, save_signal_events
-from .models import SignalEvent
+from typing import Any, Dict
+from .config import FORMATS, SCHEMAS, load_config
+from .metrics import PROFILE_MODES, STAGES
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
-        description="Run financial analysis pipeline for a given stock ticker."
+        description="Run financial analysis pipeline for one or more stock tickers."
     )
     parser.add_argument(
-        "--ticker", required=True, help="Stock ticker (e.g., NVDA or RELIANCE.NS)"
+        "--ticker",
+        action="append",
+        default=[],
+        help="Stock ticker (e.g., NVDA or RELIANCE.NS). Repeat for several tickers.",
+    )
+    parser.add_argument(
+        "--universe", help="File with one ticker per line to run in batch mode"
+    )
+    parser.add_argument(
+        "--output",
+        help="Output JSON file path (single ticker) or directory (batch mode)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="Output format (default: output.format in config, else json)",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="gzip JSON/NDJSON output, zstd for Parquet",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Worker processes for batch mode (default: pipeline.workers in config)",
+    )
+    parser.add_argument(
+        "--summary",
+        help="Summary report path (default: <output>/summary.json in batch mode)",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Validate every metrics row with pydantic before saving",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Fetch only bars after the last stored date and append new rows",
+    )
+    parser.add_argument(
+        "--on-conflict",
+        choices=["ignore", "update"],
+        help="Keep (ignore) or overwrite (update) existing rows; "
+        "default: database.on_conflict in config",
+    )
+    parser.add_argument(
+        "--async-fetch",
+        action="store_true",
+        help="Fetch tickers concurrently (fetch.* settings) before processing",
+    )
+    parser.add_argument(
+        "--panel",
+        action="store_true",
+        help="Compute indicators for each chunk of tickers in one NumPy pass "
+        "instead of per ticker",
+    )
+    parser.add_argument(
+        "--online",
+        action="store_true",
+        help="Keep per-ticker indicator state in the database and apply new bars "
+        "to it in constant time",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Serve market data only from the on-disk cache (no network)",
+    )
+    parser.add_argument(
+        "--refresh-fundamentals",
+        action="store_true",
+        help="Fetch fundamentals for every ticker even if the stored ones are "
+        "newer than fundamentals.refresh_days",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Process every ticker even if its input fingerprints are unchanged",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="Write stage timings and counters to this file, as Prometheus text "
+        "for .prom/.txt and JSON otherwise (default: metrics.path in config)",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=STAGES,
+        help="Profile one stage (runs fetch/process/signals in a single worker)",
+    )
+    parser.add_argument(
+        "--profile-mode",
+        choices=PROFILE_MODES,
+        default="cprofile",
+        help="cprofile (.prof, for pstats/snakeviz) or tracemalloc allocations",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default="profiles",
+        help="Directory for the profile output (default: profiles)",
     )
-    parser.add_argument("--output", required=True, help="Output JSON file path")
-    args = parser.parse_args()
 
-    config = load_config()
+    subparsers = parser.add_subparsers(dest="command")
+    screen_parser = subparsers.add_parser(
+        "screen", help="Screen the latest stored metrics with a filter expression"
+    )
+    screen_parser.add_argument(
+        "expression",
+        help='e.g. "pct_from_52w_high > -5 AND price_to_book < 1 '
+        'AND golden_crossover within 10d"',
+    )
+    screen_parser.add_argument("--sort", help="Column to sort results by")
+    screen_parser.add_argument(
+        "--desc", action="store_true", help="Sort in descending order"
+    )
+    screen_parser.add_argument("--limit", type=int, help="Maximum rows to return")
+    screen_parser.add_argument(
+        "--output", dest="screen_output", help="Write results to a CSV file"
+    )
+    migrate_parser = subparsers.add_parser(
+        "migrate", help="Convert daily_metrics to another storage schema"
+    )
+    migrate_parser.add_argument(
+        "--schema",
+        choices=SCHEMAS,
+        help="Target schema (default: database.schema in config)",
+    )
+    migrate_parser.add_argument(
+        "--no-vacuum",
+        action="store_true",
+        help="Skip the VACUUM that returns freed pages to the filesystem",
+    )
+    columns_parser = subparsers.add_parser(
+        "columns", help="Show, rebuild or compact the memory-mapped column store"
+    )
+    columns_action = columns_parser.add_mutually_exclusive_group()
+    columns_action.add_argument(
+        "--rebuild", action="store_true", help="Rewrite the store from daily_metrics"
+    )
+    columns_action.add_argument(
+        "--compact", action="store_true", help="Drop rows left by relocated tickers"
+    )
+    backtest_parser = subparsers.add_parser(
+        "backtest",
+        help="Forward returns, hit rates and drawdowns of stored signal events",
+    )
+    backtest_parser.add_argument(
+        "--signal",
+        action="append",
+        default=[],
+        help="Signal type to include (repeatable; default: all)",
+    )
+    backtest_parser.add_argument(
+        "--horizons",
+        type=int,
+        nargs="+",
+        help="Forward horizons in trading days (default: 5 20 60 252)",
+    )
+    backtest_parser.add_argument(
+        "--workers",
+        type=int,
+        dest="backtest_workers",
+        help="Worker processes (default: pipeline.workers in config)",
+    )
+    backtest_parser.add_argument(
+        "--output", dest="backtest_output", help="Write the summary to a CSV file"
+    )
+    backtest_parser.add_argument(
+        "--events-output", help="Write per-event returns to a CSV file"
+    )
+    daemon_parser = subparsers.add_parser(
+        "daemon",
+        help="Refresh --ticker/--universe after each exchange's close, "
+        "keeping connections and indicator state warm",
+    )
+    daemon_parser.add_argument(
+        "--status",
+        dest="status_path",
+        help="Status file (default: daemon.status_path in config)",
+    )
+    daemon_parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Exit after every ticker has been refreshed once",
+    )
+    serve_parser = subparsers.add_parser(
+        "serve", help="Serve stored metrics and signals over a read-only HTTP API"
+    )
+    serve_parser.add_argument("--host", help="Bind address (default: api.host)")
+    serve_parser.add_argument("--port", type=int, help="Port (default: api.port)")
+    return parser
+
+
+def setup(config: Dict[str, Any]):
+    from .database import init_db
+
     log_level = config.get("logging", {}).get("level", "INFO")
     logging.basicConfig(level=getattr(logging, log_level))
-    logger = logging.getLogger(__name__)
+    db_settings = config.get("database", {})
+    db_path = db_settings.get("path", "financial_data.db")
+    return init_db(
+        db_path, db_settings.get("pragmas"), db_settings.get("schema", "numeric")
+    )
+
+
+def screen_command(args, config: Dict[str, Any], engine):
+    from .screener import screen
+    from .signals import load_rules
+
+    results = screen(
+        engine,
+        args.expression,
+        sort_by=args.sort,
+        ascending=not args.desc,
+        limit=args.limit,
+        signal_types=[rule.name for rule in load_rules(config)],
+    )
+    if args.screen_output:
+        Path(args.screen_output).parent.mkdir(parents=True, exist_ok=True)
+        results.to_csv(args.screen_output, index=False)
+        print(f"✅ {len(results)} matches saved to {args.screen_output}")
+    else:
+        print(results.to_string(index=False) if len(results) else "No matches")
+
+
+def migrate_command(args, config: Dict[str, Any], engine):
+    from .database import daily_metrics_schema, migrate_daily_metrics
+
+    schema = args.schema or config.get("database", {}).get("schema", "numeric")
+    with engine.connect() as conn:
+        if daily_metrics_schema(conn) == schema:
+            print(f"daily_metrics already uses the {schema} schema")
+            return
+    db_path = Path(engine.url.database)
+    size_before = db_path.stat().st_size
+    rows = migrate_daily_metrics(engine, schema, vacuum=not args.no_vacuum)
+    engine.dispose()
+    size_after = db_path.stat().st_size
+    print(
+        f"✅ Migrated {rows:,} rows to the {schema} schema: "
+        f"{size_before / 1024:,.0f} KB -> {size_after / 1024:,.0f} KB"
+    )
 
-    db_path = config.get("database", {}).get("path", "financial_data.db")
-    engine = init_db(db_path)
 
+def columns_command(args, config: Dict[str, Any], engine):
+    from .column_store import ColumnStore, column_store_path, rebuild_column_store
+
+    path = column_store_path(config)
+    store = ColumnStore(path)
+    if args.rebuild:
+        store = rebuild_column_store(engine, path)
+    elif args.compact:
+        store.compact()
+    print(
+        f"{store.path}: {len(store):,} tickers, {store.rows - store.dead:,} rows "
+        f"({store.dead:,} dead)"
+    )
+
+
+def backtest_command(args, config: Dict[str, Any], engine):
+    from .backtest import HORIZONS, bearish_signals, run_backtest, summarize
+    from .column_store import open_column_store
+    from .signals import load_rules
+
+    rules = load_rules(config)
+    horizons = args.horizons or HORIZONS
+    workers = args.backtest_workers or config.get("pipeline", {}).get("workers", 1)
+    returns = run_backtest(
+        engine,
+        signal_types=args.signal,
+        horizons=horizons,
+        rules=rules,
+        workers=workers,
+        store=open_column_store(config),
+    )
+    summary = summarize(returns, horizons, bearish_signals(rules))
+    if args.events_output:
+        Path(args.events_output).parent.mkdir(parents=True, exist_ok=True)
+        returns.to_csv(args.events_output, index=False)
+    if args.backtest_output:
+        Path(args.backtest_output).parent.mkdir(parents=True, exist_ok=True)
+        summary.to_csv(args.backtest_output, index=False)
+        print(f"✅ {len(returns):,} events summarized to {args.backtest_output}")
+    else:
+        print(summary.to_string(index=False) if len(summary) else "No signal events")
+
+
+def daemon_command(args, parser, config: Dict[str, Any], engine):
+    import signal
+    from datetime import timedelta
+    from .column_store import open_column_store
+    from .daemon import Daemon, load_exchanges
+    from .data_fetcher import build_provider
+    from .indicators import load_indicators
+    from .pipeline import load_universe
+    from .signals import load_rules
+
+    tickers = list(args.ticker)
+    if args.universe:
+        tickers.extend(load_universe(args.universe))
+    if not tickers:
+        parser.error("one of --ticker or --universe is required")
+    if args.offline:
+        config.setdefault("cache", {}).update({"enabled": True, "offline": True})
+    settings = config.get("daemon", {})
+    fundamentals = config.get("fundamentals", {})
+    rules = load_rules(config)
+    daemon = Daemon(
+        engine,
+        tickers,
+        build_provider(config),
+        load_exchanges(config),
+        rules=rules,
+        indicators=load_indicators(config, rules),
+        status_path=args.status_path or settings.get("status_path"),
+        store=open_column_store(config),
+        period=config.get("data_settings", {}).get("historical_period", "5y"),
+        on_conflict=args.on_conflict
+        or config.get("database", {}).get("on_conflict", "ignore"),
+        refresh_fundamentals=timedelta(days=fundamentals.get("refresh_days", 30)),
+        daily_fundamentals=fundamentals.get("daily_columns", False),
+    )
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: daemon.stop())
+    logging.getLogger(__name__).info(
+        f"Daemon started for {len(daemon.slots)} ticker(s)"
+    )
+    daemon.run(max_refreshes=len(daemon.slots) if args.once else None)
+    print(
+        f"Daemon stopped: {daemon.counters['refreshed']} refreshed, "
+        f"{daemon.counters['failed']} failed"
+    )
+
+
+def serve_command(args, config: Dict[str, Any], engine):
+    from .api import ResponseCache, make_server
+
+    settings = config.get("api", {})
+    cache = ResponseCache(
+        max_entries=settings.get("cache_entries", 1024),
+        max_bytes=int(settings.get("cache_mb", 64) * 1024 * 1024),
+    )
+    server = make_server(
+        engine,
+        args.host or settings.get("host", "127.0.0.1"),
+        args.port or settings.get("port", 8000),
+        cache,
+    )
+    host, port = server.server_address[:2]
+    print(f"Serving {engine.url.database} on http://{host}:{port} (Ctrl-C to stop)")
     try:
-        logger.info(f"Fetching data for {args.ticker}")
-        raw = fetch_stock_data(args.ticker)
-
-        logger.info("Processing data")
-        processed = process_data(raw)
-
-        import pandas as pd
-
-        df_signals = pd.DataFrame([p.model_dump() for p in processed])
-
-        logger.info("Detecting signals")
-        golden_dates = detect_golden_crossover(df_signals)
-        death_dates = detect_death_cross(df_signals)
-
-        signal_events = []
-        for d in golden_dates:
-            signal_events.append(
-                SignalEvent(ticker=args.ticker, signal_type="golden_crossover", date=d)
-            )
-        for d in death_dates:
-            signal_events.append(
-                SignalEvent(ticker=args.ticker, signal_type="death_cross", date=d)
-            )
-
-        logger.info("Saving to database")
-        save_daily_metrics(engine, processed)
-        save_signal_events(engine, signal_events)
-
-        output_data = {
-            "ticker": args.ticker,
-            "daily_metrics": [m.model_dump() for m in processed],
-            "signals": [s.model_dump() for s in signal_events],
-        }
-
-        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
-        with open(args.output, "w") as f:
-            json.dump(output_data, f, indent=2, default=str)
-
-        print(f"✅ Analysis complete. Results saved to {args.output}")
-        print(f"📈 Golden Crossovers: {len(golden_dates)}")
-        print(f"📉 Death Crosses: {len(death_dates)}")
-
-    except Exception as e:
-        logger.error(f"Pipeline failed for {args.ticker}: {e}", exc_info=True)
-        exit(1)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    config = load_config()
+    engine = setup(config)
+    if args.command == "screen":
+        return screen_command(args, config, engine)
+    if args.command == "migrate":
+        return migrate_command(args, config, engine)
+    if args.command == "columns":
+        return columns_command(args, config, engine)
+    if args.command == "daemon":
+        return daemon_command(args, parser, config, engine)
+    if args.command == "serve":
+        return serve_command(args, config, engine)
+    if args.command == "backtest":
+        return backtest_command(args, config, engine)
+
+    from .pipeline import run_pipeline
+
+    return run_pipeline(args, parser, config, engine)
 
 
 if __name__ == "__main__":
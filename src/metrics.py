@@ -0,0 +1,205 @@
+# src/metrics.py
+import cProfile
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+# Stages timed by the pipeline, in execution order
+STAGES = ("fetch", "process", "signals", "db_write", "output")
+
+
+@dataclass
+class Span:
+    calls: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+    bytes: int = 0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class Metrics:
+    """
+    Run instrumentation: timing spans per stage (calls, seconds, rows, bytes)
+    and plain counters (cache hits, retries, ...). Worker processes build their
+    own Metrics and the parent merges them with `merge(other.to_dict())`.
+    """
+
+    def __init__(self):
+        self.spans: Dict[str, Span] = {}
+        self.counters: Dict[str, float] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Span]:
+        """
+        Time the block under `name`; add rows/bytes to the yielded Span inside it.
+        """
+        stat = self.spans.setdefault(name, Span())
+        started = time.perf_counter()
+        try:
+            with _profiled(name):
+                yield stat
+        finally:
+            stat.calls += 1
+            stat.seconds += time.perf_counter() - started
+
+    def record(self, name: str, seconds: float, rows: int = 0, bytes: int = 0):
+        stat = self.spans.setdefault(name, Span())
+        stat.calls += 1
+        stat.seconds += seconds
+        stat.rows += rows
+        stat.bytes += bytes
+
+    def incr(self, name: str, value: float = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, data: Dict[str, Any]):
+        for name, span in data.get("spans", {}).items():
+            stat = self.spans.setdefault(name, Span())
+            stat.calls += span["calls"]
+            stat.seconds += span["seconds"]
+            stat.rows += span["rows"]
+            stat.bytes += span["bytes"]
+        for name, value in data.get("counters", {}).items():
+            self.incr(name, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "spans": {
+                name: {
+                    **asdict(span),
+                    "seconds": round(span.seconds, 6),
+                    "rows_per_sec": round(span.rows_per_sec, 1),
+                }
+                for name, span in self.spans.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def to_prometheus(self, prefix: str = "pipeline") -> str:
+        """
+        Prometheus text exposition format (for node_exporter's textfile collector).
+        """
+        lines = []
+        series = [
+            ("stage_calls_total", "counter", "Times each stage ran", "calls"),
+            ("stage_seconds_total", "counter", "Wall time per stage", "seconds"),
+            ("stage_rows_total", "counter", "Rows handled per stage", "rows"),
+            ("stage_bytes_total", "counter", "Bytes written per stage", "bytes"),
+            ("stage_rows_per_second", "gauge", "Stage throughput", "rows_per_sec"),
+        ]
+        for metric, kind, help_text, attr in series:
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for name, span in self.spans.items():
+                lines.append(
+                    f'{prefix}_{metric}{{stage="{name}"}} {getattr(span, attr):g}'
+                )
+        for name, value in self.counters.items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """
+        Write JSON, or Prometheus text when the path ends in .prom or .txt.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix in (".prom", ".txt"):
+            path.write_text(self.to_prometheus())
+        else:
+            with open(path, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+
+    def log_summary(self):
+        for name, span in self.spans.items():
+            extra = f", {span.bytes:,} bytes" if span.bytes else ""
+            logger.info(
+                f"{name}: {span.seconds:.2f}s over {span.calls} call(s), "
+                f"{span.rows:,} rows ({span.rows_per_sec:,.0f} rows/sec){extra}"
+            )
+        for name, value in self.counters.items():
+            logger.info(f"{name}: {value:g}")
+
+
+# Profiling of one chosen stage, process-wide
+_profile: Dict[str, Any] = {"stage": None}
+
+
+def enable_profiling(stage: str, mode: str = "cprofile"):
+    """
+    Profile every span named `stage` in this process with cProfile or tracemalloc.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(
+            f"Unknown profile mode: {mode} (expected one of {PROFILE_MODES})"
+        )
+    _profile.clear()
+    _profile.update({"stage": stage, "mode": mode})
+    if mode == "cprofile":
+        _profile["profiler"] = cProfile.Profile()
+
+
+@contextmanager
+def _profiled(name: str):
+    if name != _profile.get("stage"):
+        yield
+        return
+    if _profile["mode"] == "cprofile":
+        _profile["ran"] = True
+        _profile["profiler"].enable()
+        try:
+            yield
+        finally:
+            _profile["profiler"].disable()
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(25)
+    before = tracemalloc.take_snapshot()
+    try:
+        yield
+    finally:
+        after = tracemalloc.take_snapshot()
+        _profile["snapshot"] = after
+        _profile["diff"] = after.compare_to(before, "lineno")
+        _profile["peak"] = max(
+            _profile.get("peak", 0), tracemalloc.get_traced_memory()[1]
+        )
+
+
+def dump_profile(directory: str) -> Optional[Path]:
+    """
+    Write the collected profile to `directory`: <stage>.prof (pstats) for cProfile,
+    or <stage>.tracemalloc (snapshot) plus a text summary of the allocations the
+    last call left behind. Returns the profile path, or None if nothing ran.
+    """
+    stage = _profile.get("stage")
+    if stage is None or not (_profile.get("ran") or "snapshot" in _profile):
+        return None
+    out = Path(directory)
+    out.mkdir(parents=True, exist_ok=True)
+    if _profile["mode"] == "cprofile":
+        path = out / f"{stage}.prof"
+        _profile["profiler"].dump_stats(path)
+        return path
+
+    path = out / f"{stage}.tracemalloc"
+    _profile["snapshot"].dump(str(path))
+    lines = [f"Peak traced memory: {_profile['peak'] / 2**20:.1f} MiB", ""]
+    lines += [str(stat) for stat in _profile["diff"][:25]]
+    (out / f"{stage}.tracemalloc.txt").write_text("\n".join(lines) + "\n")
+    tracemalloc.stop()
+    return path
@@ -1,7 +1,10 @@
 from pydantic import BaseModel
+from dataclasses import dataclass
 from decimal import Decimal
 from datetime import date
-from typing import Optional
+from typing import Iterable, Optional
+import numpy as np
+import pandas as pd
 
 
 class RawPriceData(BaseModel):
@@ -21,6 +24,130 @@ class RawPriceData(BaseModel):
         return self
 
 
+@dataclass
+class PriceSeries:
+    """
+    Array-backed OHLCV history for one ticker.
+    Replaces a list of RawPriceData: NaN filling and the High >= Low rule
+    run once over whole columns instead of once per bar.
+    """
+
+    dates: np.ndarray  # datetime64[D]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray  # int64
+
+    FIELDS = ("open", "high", "low", "close", "volume")
+
+    def __post_init__(self):
+        n = len(self.dates)
+        for name in self.FIELDS:
+            if len(getattr(self, name)) != n:
+                raise ValueError(f"PriceSeries column {name} has length != {n}")
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "PriceSeries":
+        """
+        Build from a frame with Date, Open, High, Low, Close, Volume columns.
+        Missing prices and volumes are filled with 0.
+        """
+        prices = df[["Open", "High", "Low", "Close"]].to_numpy(
+            dtype=np.float64, copy=True
+        )
+        np.nan_to_num(prices, copy=False, nan=0.0)
+        # Keep the exchange-local calendar date (yfinance index is tz-aware)
+        dates = pd.to_datetime(df["Date"])
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        return cls(
+            dates=dates.to_numpy().astype("datetime64[D]"),
+            open=prices[:, 0].copy(),
+            high=prices[:, 1].copy(),
+            low=prices[:, 2].copy(),
+            close=prices[:, 3].copy(),
+            volume=df["Volume"].fillna(0).to_numpy(dtype=np.int64),
+        )
+
+    @classmethod
+    def from_records(cls, records: Iterable) -> "PriceSeries":
+        """
+        Build from RawPriceData-like objects (attributes Date, Open, ..., Volume).
+        """
+        records = list(records)
+        return cls.from_frame(
+            pd.DataFrame(
+                {
+                    "Date": [r.Date for r in records],
+                    "Open": [float(r.Open) for r in records],
+                    "High": [float(r.High) for r in records],
+                    "Low": [float(r.Low) for r in records],
+                    "Close": [float(r.Close) for r in records],
+                    "Volume": [r.Volume for r in records],
+                }
+            )
+        )
+
+    @classmethod
+    def empty(cls) -> "PriceSeries":
+        return cls(
+            dates=np.empty(0, dtype="datetime64[D]"),
+            open=np.empty(0),
+            high=np.empty(0),
+            low=np.empty(0),
+            close=np.empty(0),
+            volume=np.empty(0, dtype=np.int64),
+        )
+
+    @classmethod
+    def concat(cls, parts: Iterable["PriceSeries"]) -> "PriceSeries":
+        parts = list(parts)
+        return cls(
+            dates=np.concatenate([p.dates for p in parts]),
+            **{
+                name: np.concatenate([getattr(p, name) for p in parts])
+                for name in cls.FIELDS
+            },
+        )
+
+    def check_high_ge_low(self) -> np.ndarray:
+        """
+        Return the row indices where High < Low (same rule as RawPriceData).
+        """
+        return np.flatnonzero(self.high < self.low)
+
+    def take(self, index: np.ndarray) -> "PriceSeries":
+        return PriceSeries(
+            dates=self.dates[index],
+            **{name: getattr(self, name)[index] for name in self.FIELDS},
+        )
+
+    def drop(self, rows: np.ndarray) -> "PriceSeries":
+        keep = np.ones(len(self), dtype=bool)
+        keep[rows] = False
+        return self.take(keep)
+
+    @property
+    def last_date(self) -> date:
+        return self.dates[-1].astype(object)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "Date": self.dates.astype("datetime64[ns]"),
+                "Open": self.open,
+                "High": self.high,
+                "Low": self.low,
+                "Close": self.close,
+                "Volume": self.volume,
+            }
+        )
+
+
 class RawFundamentalData(BaseModel):
     Date: date
     TotalAssets: Optional[Decimal] = None
@@ -29,6 +156,8 @@ class RawFundamentalData(BaseModel):
     SharesOutstanding: Optional[int] = None
     MarketCap: Optional[Decimal] = None
     EnterpriseValue: Optional[Decimal] = None
+    # "quarterly"/"annual" balance sheet, or "info" for the point-in-time snapshot
+    Source: Optional[str] = None
 
 
 class ProcessedDailyMetrics(BaseModel):
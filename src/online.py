@@ -0,0 +1,286 @@
+# src/online.py
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .indicators import (
+    WARMUP_BARS,
+    IndicatorSpec,
+    OnlineIndicator,
+    indicators_key,
+    warmup_bars,
+)
+from .models import PriceSeries
+from .processor import METRIC_COLUMNS, ROUND_DECIMALS
+from .signals import EVENT_COLUMNS, SignalRule, load_rules, rule_fires
+
+SMA_WINDOWS = (50, 200)
+
+# Metric columns the signal rules can refer to
+VALUE_COLUMNS = [c for c in METRIC_COLUMNS if c not in ("ticker", "date")]
+
+
+def _round(value: float) -> float:
+    if value is None or not math.isfinite(value):
+        return math.nan
+    # np.round matches the rounding the batch path applies to whole columns
+    return float(np.round(value, ROUND_DECIMALS))
+
+
+@dataclass
+class IndicatorState:
+    """
+    Per-ticker indicator state, advanced one bar at a time in O(1):
+    running sums for the SMAs over a buffer of the last WARMUP_BARS closes,
+    a monotonic deque of (bar number, close) for the 52-week high, the
+    latest known value of each fundamental field and the previous bar's metric
+    values that the signal rules compare against. Configured `indicators` are
+    advanced by their own OnlineIndicator.
+    """
+
+    ticker: str
+    last_date: Optional[date] = None
+    bars: int = 0
+    closes: Deque[float] = field(default_factory=lambda: deque(maxlen=WARMUP_BARS))
+    sums: Dict[int, float] = field(
+        default_factory=lambda: dict.fromkeys(SMA_WINDOWS, 0.0)
+    )
+    high_window: Deque[Tuple[int, float]] = field(default_factory=deque)
+    shareholder_equity: Optional[float] = None
+    shares_outstanding: Optional[float] = None
+    enterprise_value: Optional[float] = None
+    last_values: Dict[str, Optional[float]] = field(default_factory=dict)
+    indicators: Tuple[IndicatorSpec, ...] = ()
+    extras: Dict[str, OnlineIndicator] = field(default_factory=dict)
+
+    def __post_init__(self):
+        for spec in self.indicators:
+            self.extras.setdefault(spec.name, OnlineIndicator(spec))
+
+    @property
+    def value_columns(self) -> List[str]:
+        return VALUE_COLUMNS + [spec.name for spec in self.indicators]
+
+    def update(
+        self,
+        bar_date: date,
+        open_price: float,
+        high_price: float,
+        low_price: float,
+        close: float,
+        volume: int,
+    ) -> Dict[str, Any]:
+        """
+        Add one bar and return its metrics row (ProcessedDailyMetrics columns).
+        """
+        for window in SMA_WINDOWS:
+            if len(self.closes) >= window:
+                self.sums[window] -= self.closes[-window]
+            self.sums[window] += close
+        self.closes.append(close)
+
+        while self.high_window and self.high_window[-1][1] <= close:
+            self.high_window.pop()
+        self.high_window.append((self.bars, close))
+        while self.high_window[0][0] <= self.bars - WARMUP_BARS:
+            self.high_window.popleft()
+
+        self.bars += 1
+        self.last_date = bar_date
+        if self.bars % WARMUP_BARS == 0:
+            # Re-sum from the buffer now and then so rounding error cannot build up
+            buffer = list(self.closes)
+            for window in SMA_WINDOWS:
+                self.sums[window] = math.fsum(buffer[-window:])
+
+        week52_high = self.high_window[0][1]
+        bvps = self.book_value_per_share
+        row = {
+            "ticker": self.ticker,
+            "date": bar_date,
+            "open": _round(open_price),
+            "high": _round(high_price),
+            "low": _round(low_price),
+            "close": _round(close),
+            "volume": int(volume),
+            "sma_50": _round(self.sums[50] / min(self.bars, 50)),
+            "sma_200": _round(self.sums[200] / min(self.bars, 200)),
+            "week52_high": _round(week52_high),
+            "pct_from_52w_high": _round(
+                (close - week52_high) / week52_high * 100 if week52_high else math.nan
+            ),
+            "book_value_per_share": _round(bvps),
+            "price_to_book": _round(close / bvps)
+            if bvps is not None and bvps > 0 and close != 0
+            else math.nan,
+            "enterprise_value": _round(self.enterprise_value),
+        }
+        if self.extras:
+            # Plain floats, so the indicator states serialize to JSON
+            bar = {
+                "open": float(open_price),
+                "high": float(high_price),
+                "low": float(low_price),
+                "close": float(close),
+                "volume": float(volume),
+            }
+            for name, indicator in self.extras.items():
+                row[name] = _round(indicator.update(bar))
+        return row
+
+    @property
+    def book_value_per_share(self) -> Optional[float]:
+        if self.shareholder_equity is None or not self.shares_outstanding:
+            return None
+        return self.shareholder_equity / self.shares_outstanding
+
+    def apply_fundamentals(self, record) -> None:
+        """
+        Take the fields a fundamentals record reports; the others keep their
+        earlier values, as in the batch path's as-of join.
+        """
+        for name, attr in (
+            ("shareholder_equity", "ShareholderEquity"),
+            ("shares_outstanding", "SharesOutstanding"),
+            ("enterprise_value", "EnterpriseValue"),
+        ):
+            value = getattr(record, attr, None)
+            if value is not None:
+                setattr(self, name, float(value))
+
+    def advance(
+        self, raw: Dict[str, Any], rules: Optional[List[SignalRule]] = None
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Apply every bar in raw["price_data"] newer than `last_date`.
+        Returns the new metrics rows and the signal events they fire.
+        """
+        if rules is None:
+            rules = load_rules({})
+        series = raw["price_data"]
+        if self.last_date is not None:
+            series = series.take(series.dates > np.datetime64(self.last_date))
+        fundamentals = sorted(raw.get("fundamental_data") or [], key=lambda r: r.Date)
+
+        rows, events = [], []
+        pending = 0
+        for i in range(len(series)):
+            bar_date = series.dates[i].astype(object)
+            while (
+                pending < len(fundamentals) and fundamentals[pending].Date <= bar_date
+            ):
+                self.apply_fundamentals(fundamentals[pending])
+                pending += 1
+            row = self.update(
+                bar_date,
+                series.open[i],
+                series.high[i],
+                series.low[i],
+                series.close[i],
+                series.volume[i],
+            )
+            for rule in rules:
+                if rule_fires(rule, self.last_values, row):
+                    events.append((self.ticker, rule.name, bar_date))
+            self.last_values = {k: row[k] for k in self.value_columns}
+            rows.append(row)
+
+        columns = METRIC_COLUMNS + [spec.name for spec in self.indicators]
+        metrics = pd.DataFrame(rows, columns=columns)
+        metrics["volume"] = metrics["volume"].astype("int64")
+        return metrics, pd.DataFrame(events, columns=EVENT_COLUMNS)
+
+    @classmethod
+    def from_history(
+        cls,
+        ticker: str,
+        series: PriceSeries,
+        last_row: Optional[Dict[str, Any]] = None,
+        fundamentals: Optional[List] = None,
+        indicators: Iterable[IndicatorSpec] = (),
+    ) -> "IndicatorState":
+        """
+        Build the state by replaying the last warmup_bars(indicators) bars,
+        which is exact for every windowed indicator because none looks further
+        back, and long enough for the recursive ones (EMA, RSI, ATR) to match
+        a replay of the whole series. `fundamentals` (records of any date) supply the
+        values known at the last bar; `last_row` (the final metrics row)
+        supplies the values rules compare to.
+        """
+        state = cls(ticker, indicators=tuple(indicators))
+        start = max(0, len(series) - warmup_bars(state.indicators))
+        state.advance(
+            {
+                "price_data": series.take(np.arange(start, len(series))),
+                "fundamental_data": fundamentals,
+            },
+            [],
+        )
+        if last_row is not None:
+            state.last_values = {
+                k: None if pd.isna(last_row.get(k)) else float(last_row[k])
+                for k in state.value_columns
+            }
+        return state
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "bars": self.bars,
+            "closes": list(self.closes),
+            "sums": {str(w): s for w, s in self.sums.items()},
+            "high_window": [list(entry) for entry in self.high_window],
+            "shareholder_equity": self.shareholder_equity,
+            "shares_outstanding": self.shares_outstanding,
+            "enterprise_value": self.enterprise_value,
+            "last_values": {
+                k: None if v is None or math.isnan(v) else v
+                for k, v in self.last_values.items()
+            },
+        }
+        if self.indicators:
+            data["indicator_key"] = indicators_key(self.indicators)
+            data["extras"] = {k: v.to_dict() for k, v in self.extras.items()}
+        return data
+
+    @classmethod
+    def from_dict(
+        cls,
+        ticker: str,
+        last_date: Optional[date],
+        data: Dict[str, Any],
+        indicators: Iterable[IndicatorSpec] = (),
+    ) -> "IndicatorState":
+        """
+        A stored state; it must have been saved for the same `indicators`
+        (see stored_for).
+        """
+        extras = data.get("extras", {})
+        return cls(
+            ticker=ticker,
+            last_date=last_date,
+            bars=data["bars"],
+            closes=deque(data["closes"], maxlen=WARMUP_BARS),
+            sums={int(w): s for w, s in data["sums"].items()},
+            high_window=deque(tuple(entry) for entry in data["high_window"]),
+            # States saved before fundamentals were carried per field have
+            # neither; the next run's records fill them in
+            shareholder_equity=data.get("shareholder_equity"),
+            shares_outstanding=data.get("shares_outstanding"),
+            enterprise_value=data.get("enterprise_value"),
+            last_values=data["last_values"],
+            indicators=tuple(indicators),
+            extras={
+                spec.name: OnlineIndicator(spec, extras[spec.name])
+                for spec in indicators
+            },
+        )
+
+    @staticmethod
+    def stored_for(data: Dict[str, Any], indicators: Iterable[IndicatorSpec]) -> bool:
+        """
+        Whether stored state `data` was saved for these `indicators`.
+        """
+        return data.get("indicator_key") == indicators_key(indicators)
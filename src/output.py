@@ -0,0 +1,165 @@
+# src/output.py
+import gzip
+import json
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import IO, Any, Dict, List, Union
+import pandas as pd
+from .config import FORMATS
+from .models import SignalEvent
+
+# Rows serialized per to_json call when streaming NDJSON
+NDJSON_CHUNK_ROWS = 10_000
+
+
+def metrics_records(metrics: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Convert a metrics frame to JSON-ready dicts (NaN becomes null).
+    """
+    records = metrics.astype(object)
+    return records.where(records.notna(), None).to_dict(orient="records")
+
+
+def _iso_dates(df: pd.DataFrame) -> pd.DataFrame:
+    if "date" in df.columns:
+        df = df.assign(date=pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d"))
+    return df
+
+
+def _events_frame(events: Union[pd.DataFrame, List[SignalEvent]]) -> pd.DataFrame:
+    if isinstance(events, pd.DataFrame):
+        return events
+    return pd.DataFrame(
+        [e.model_dump() for e in events], columns=list(SignalEvent.model_fields)
+    )
+
+
+def _file_stem(ticker: str) -> str:
+    return f"{ticker.lower().replace('.', '_')}_analysis"
+
+
+class OutputWriter(ABC):
+    """
+    Writes one ticker's results per `write` call and returns the bytes written.
+    In batch mode `output` is a directory, otherwise a file path (or a
+    directory for Parquet).
+    """
+
+    def __init__(self, output: str, batch: bool, compress: bool = False):
+        self.output = Path(output)
+        self.batch = batch
+        self.compress = compress
+
+    def path_for(self, ticker: str, suffix: str) -> Path:
+        if self.compress:
+            suffix += ".gz"
+        if self.batch:
+            return self.output / f"{_file_stem(ticker)}{suffix}"
+        if self.compress and not str(self.output).endswith(".gz"):
+            return Path(f"{self.output}.gz")
+        return self.output
+
+    def _open(self, path: Path) -> IO[str]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if str(path).endswith(".gz"):
+            return gzip.open(path, "wt", encoding="utf-8")
+        return open(path, "w", encoding="utf-8")
+
+    @abstractmethod
+    def write(
+        self,
+        ticker: str,
+        metrics: pd.DataFrame,
+        events: Union[pd.DataFrame, List[SignalEvent]],
+    ) -> int: ...
+
+
+class JsonWriter(OutputWriter):
+    """
+    The original document format: {"ticker", "daily_metrics", "signals"},
+    with numbers written as JSON numbers.
+    """
+
+    def write(self, ticker, metrics, events):
+        path = self.path_for(ticker, ".json")
+        output_data = {
+            "ticker": ticker,
+            "daily_metrics": metrics_records(metrics),
+            "signals": _events_frame(events).to_dict(orient="records"),
+        }
+        with self._open(path) as f:
+            json.dump(output_data, f, indent=2, default=str)
+        return os.path.getsize(path)
+
+
+class NdjsonWriter(OutputWriter):
+    """
+    One JSON object per line, streamed in chunks: metrics rows go to the main
+    file and signal events to a sibling `.signals.ndjson` file.
+    """
+
+    def _stream(self, path: Path, df: pd.DataFrame) -> int:
+        df = _iso_dates(df)
+        with self._open(path) as f:
+            for start in range(0, len(df), NDJSON_CHUNK_ROWS):
+                chunk = df.iloc[start : start + NDJSON_CHUNK_ROWS]
+                f.write(
+                    chunk.to_json(orient="records", lines=True, double_precision=15)
+                )
+        return os.path.getsize(path)
+
+    def write(self, ticker, metrics, events):
+        path = self.path_for(ticker, ".ndjson")
+        name = path.name
+        if ".ndjson" in name:
+            name = name.replace(".ndjson", ".signals.ndjson", 1)
+        else:
+            name = f"{name}.signals"
+        written = self._stream(path, metrics)
+        written += self._stream(path.with_name(name), _events_frame(events))
+        return written
+
+
+class ParquetWriter(OutputWriter):
+    """
+    Parquet datasets partitioned by ticker (requires pyarrow):
+    <output>/daily_metrics/ticker=<T>/part-0.parquet and
+    <output>/signal_events/ticker=<T>/part-0.parquet.
+    """
+
+    def __init__(self, output, batch, compress=False, compression="snappy"):
+        super().__init__(output, batch, compress)
+        self.compression = "zstd" if compress else compression
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+
+    def _write_partition(self, dataset: str, ticker: str, df: pd.DataFrame) -> int:
+        path = self.output / dataset / f"ticker={ticker}" / "part-0.parquet"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df = df.drop(columns=["ticker"]).assign(date=pd.to_datetime(df["date"]))
+        df.to_parquet(path, index=False, compression=self.compression)
+        return os.path.getsize(path)
+
+    def write(self, ticker, metrics, events):
+        written = self._write_partition("daily_metrics", ticker, metrics)
+        written += self._write_partition("signal_events", ticker, _events_frame(events))
+        return written
+
+
+def get_writer(
+    fmt: str,
+    output: str,
+    batch: bool,
+    compress: bool = False,
+    parquet_compression: str = "snappy",
+) -> OutputWriter:
+    if fmt == "json":
+        return JsonWriter(output, batch, compress)
+    if fmt == "ndjson":
+        return NdjsonWriter(output, batch, compress)
+    if fmt == "parquet":
+        return ParquetWriter(output, batch, compress, parquet_compression)
+    raise ValueError(f"Unknown output format: {fmt} (expected one of {FORMATS})")
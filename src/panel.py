@@ -0,0 +1,50 @@
+# src/panel.py
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from .indicators import (
+    IndicatorSpec,
+    compute_indicators,
+    required_sources,
+    stack_closes,
+)
+from .processor import build_metrics, price_frame
+
+
+def panel_indicators(
+    prices: Dict[str, List[np.ndarray]],
+    indicators: Optional[List[IndicatorSpec]] = None,
+) -> List[Dict[str, np.ndarray]]:
+    """
+    The built-in and configured indicators for many tickers in one pass:
+    `prices` holds each source's per-ticker arrays, stacked into panels.
+    """
+    panels = {source: stack_closes(arrays)[0] for source, arrays in prices.items()}
+    lengths = [len(close) for close in prices["close"]]
+    values = compute_indicators(panels, indicators or [])
+    return [
+        {name: column[:n, j] for name, column in values.items()}
+        for j, n in enumerate(lengths)
+    ]
+
+
+def process_panel(
+    raws: Dict[str, dict], indicators: Optional[List[IndicatorSpec]] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Panel equivalent of calling `process_data` on every raw data dict: rolling
+    indicators for all tickers are computed together, then each ticker's
+    metrics frame is assembled with its fundamentals.
+    """
+    indicators = indicators or []
+    tickers = list(raws)
+    price_dfs = [price_frame(raws[t]) for t in tickers]
+    prices = {
+        source: [df[source.capitalize()].to_numpy(dtype=np.float64) for df in price_dfs]
+        for source in required_sources(indicators)
+    }
+    computed = panel_indicators(prices, indicators)
+    return {
+        ticker: build_metrics(raws[ticker], price_df, ind, indicators)
+        for ticker, price_df, ind in zip(tickers, price_dfs, computed)
+    }
@@ -0,0 +1,894 @@
+# src/pipeline.py
+import argparse
+import logging
+import json
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .async_fetch import AsyncFetcher, build_async_fetcher, fetch_universe
+from .data_fetcher import build_provider, fetch_stock_data
+import numpy as np
+import pandas as pd
+from .processor import process_data, validate_metrics
+from .signals import SignalRule, evaluate_rules, load_rules
+from .indicators import WARMUP_BARS, IndicatorSpec, load_indicators, warmup_bars
+from .database import (
+    save_ticker_results,
+    WriteStats,
+    get_last_dates,
+    load_fingerprints,
+    load_fundamentals,
+    load_indicator_states,
+    load_price_history,
+)
+from .column_store import ColumnStore, open_column_store
+from .fingerprint import Fingerprints, fingerprint_raw, first_changed
+from .metrics import Metrics, dump_profile, enable_profiling
+from .models import PriceSeries, RawFundamentalData
+from .online import IndicatorState
+from .output import get_writer
+from .providers import MarketDataProvider
+from .write_queue import WriteQueue, log_stats
+
+logger = logging.getLogger(__name__)
+
+# Tasks submitted ahead per process-pool worker
+INFLIGHT_PER_WORKER = 2
+
+
+def load_universe(path: str) -> List[str]:
+    """
+    Read a universe file: one ticker per line, blank lines and '#' comments ignored.
+    """
+    tickers = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                tickers.append(line)
+    return tickers
+
+
+def start_date(since: Optional[date]) -> Optional[date]:
+    return since + timedelta(days=1) if since is not None else None
+
+
+def cache_counts(provider: Optional[MarketDataProvider]) -> Tuple[int, int]:
+    """
+    (hits, misses) of the provider's response cache, or zeros without one.
+    """
+    cache = getattr(provider, "cache", None)
+    if cache is None:
+        return 0, 0
+    return cache.hits, cache.misses
+
+
+def count_cache(metrics: Metrics, provider, before: Tuple[int, int]):
+    hits, misses = cache_counts(provider)
+    metrics.incr("cache_hits", hits - before[0])
+    metrics.incr("cache_misses", misses - before[1])
+
+
+def prepare_raw(
+    ticker: str,
+    since: Optional[date] = None,
+    warmup: Optional[PriceSeries] = None,
+    provider: Optional[MarketDataProvider] = None,
+    period: str = "5y",
+    raw: Optional[Dict[str, Any]] = None,
+    fetch_fundamentals: bool = True,
+) -> Optional[Dict[str, Any]]:
+    """
+    Fetch raw data (unless `raw` is given) and, in incremental mode, prepend the
+    warmup bars. Returns None when there are no bars after `since`.
+    """
+    if raw is None:
+        raw = fetch_stock_data(
+            ticker,
+            start=start_date(since),
+            provider=provider,
+            period=period,
+            fundamentals=fetch_fundamentals,
+        )
+
+    if since is not None:
+        new_bars = raw["price_data"]
+        new_bars = new_bars.take(new_bars.dates > np.datetime64(since))
+        if not len(new_bars):
+            return None
+        parts = [warmup, new_bars] if warmup is not None else [new_bars]
+        raw["price_data"] = PriceSeries.concat(parts)
+    return raw
+
+
+def use_stored_fundamentals(
+    raw: Dict[str, Any], stored: Optional[List[RawFundamentalData]]
+) -> List[RawFundamentalData]:
+    """
+    Merge `stored` fundamentals records into raw["fundamental_data"]; a fetched
+    record replaces a stored one with the same report date and source.
+    Returns the freshly fetched records, which are the ones to save.
+    """
+    fetched = raw["fundamental_data"]
+    if stored:
+        merged = {(r.Date, r.Source): r for r in stored}
+        merged.update({(r.Date, getattr(r, "Source", None)): r for r in fetched})
+        raw["fundamental_data"] = sorted(merged.values(), key=lambda r: r.Date)
+    return fetched
+
+
+def check_inputs(
+    raw: Dict[str, Any],
+    stored: Fingerprints,
+    rules: Optional[List[SignalRule]] = None,
+    indicators: Optional[List[IndicatorSpec]] = None,
+) -> Tuple[Fingerprints, Optional[date]]:
+    """
+    Fingerprint a ticker's fetched inputs and compare them with the `stored`
+    fingerprints. Returns the new fingerprints and the first date whose
+    inputs changed (None when nothing did, date.min for all of them).
+    The rules and configured indicators apply to the whole history.
+    """
+    prints = fingerprint_raw(raw, [*(rules or load_rules({})), *(indicators or [])])
+    return prints, first_changed(stored, prints)
+
+
+def restate(
+    result: Dict[str, Any],
+    prints: Fingerprints,
+    changed: date,
+    stored: Fingerprints,
+) -> Dict[str, Any]:
+    """
+    Attach the new fingerprints; when the ticker had stored ones, its rows
+    from the first changed date are replaced on save.
+    """
+    result["fingerprints"] = prints
+    result["replace_from"] = changed if stored else None
+    return result
+
+
+def changed_since(changed: Optional[date]) -> Optional[date]:
+    """
+    The `since` that keeps rows from the first changed date on (None: all rows).
+    """
+    if changed is None or changed == date.min:
+        return None
+    return changed - timedelta(days=1)
+
+
+def finish_ticker(
+    ticker: str,
+    processed: pd.DataFrame,
+    strict: bool = False,
+    since: Optional[date] = None,
+    rules: Optional[List[SignalRule]] = None,
+    signal_events: Optional[pd.DataFrame] = None,
+    metrics: Optional[Metrics] = None,
+    indicators: Optional[List[IndicatorSpec]] = None,
+) -> Dict[str, Any]:
+    """
+    Detect signals on processed metrics (unless `signal_events` are given) and
+    build the per-ticker result. Indicators computed only for the rules
+    (store: false) are dropped afterwards.
+    """
+    if signal_events is None:
+        metrics = metrics or Metrics()
+        with metrics.span("signals") as span:
+            signal_events = evaluate_rules(processed, rules or load_rules({}), ticker)
+            span.rows += len(processed)
+    unstored = [spec.name for spec in indicators or [] if not spec.store]
+    if unstored:
+        processed = processed.drop(columns=unstored)
+
+    if since is not None:
+        processed = processed[processed["date"] > since].reset_index(drop=True)
+        signal_events = signal_events[signal_events["date"] > since]
+        signal_events = signal_events.reset_index(drop=True)
+
+    if strict:
+        validate_metrics(processed)
+
+    signal_counts = signal_events["signal_type"].value_counts().to_dict()
+    return {
+        "ticker": ticker,
+        "status": "updated",
+        "processed": processed,
+        "signal_events": signal_events,
+        "signal_counts": signal_counts,
+        "golden_crossovers": signal_counts.get("golden_crossover", 0),
+        "death_crosses": signal_counts.get("death_cross", 0),
+    }
+
+
+def run_ticker(
+    ticker: str,
+    strict: bool = False,
+    since: Optional[date] = None,
+    warmup: Optional[PriceSeries] = None,
+    provider: Optional[MarketDataProvider] = None,
+    period: str = "5y",
+    raw: Optional[Dict[str, Any]] = None,
+    rules: Optional[List[SignalRule]] = None,
+    online: bool = False,
+    state: Optional[IndicatorState] = None,
+    fundamentals: Optional[List[RawFundamentalData]] = None,
+    fetch_fundamentals: bool = True,
+    fingerprints: Optional[Fingerprints] = None,
+    indicators: Optional[List[IndicatorSpec]] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch, process and detect signals for one ticker.
+    Does not touch the database so it can run inside a worker process.
+    With strict=True every metrics row is validated through ProcessedDailyMetrics.
+    With `since` (incremental mode) only bars after that date are fetched; `warmup`
+    holds the stored bars the rolling indicators need, and only rows and signals
+    after `since` are returned.
+    `raw` skips the fetch when the data was already fetched (async fetch stage).
+    `rules` are the signal rules to evaluate (default: golden and death crosses)
+    and `indicators` the configured indicator columns to compute.
+    With a stored online `state`, new bars are applied to it one at a time instead
+    of recomputing the windows; with `online` and no state, a state is built from
+    the processed history. Either way the result carries the updated "state".
+    `fundamentals` are the stored records; with fetch_fundamentals=False only
+    prices are fetched and they are used as they are. Freshly fetched records
+    are returned under "fundamentals" for the parent to save.
+    With stored `fingerprints` (full fetches only), a ticker whose inputs are
+    unchanged is returned as "unchanged" without processing; otherwise only
+    rows from the first changed date are returned, with "replace_from".
+    Stage timings and counters are returned under "metrics" (Metrics.to_dict()).
+    """
+    metrics = Metrics()
+    if raw is None:
+        before = cache_counts(provider)
+        with metrics.span("fetch") as span:
+            raw = prepare_raw(
+                ticker, since, warmup, provider, period, None, fetch_fundamentals
+            )
+            span.rows += len(raw["price_data"]) if raw is not None else 0
+        count_cache(metrics, provider, before)
+    else:
+        raw = prepare_raw(ticker, since, warmup, raw=raw)
+    if raw is None:
+        return {"ticker": ticker, "status": "up_to_date", "metrics": metrics.to_dict()}
+    fetched = use_stored_fundamentals(raw, fundamentals)
+    if fingerprints is not None:
+        prints, changed = check_inputs(raw, fingerprints, rules, indicators)
+        if changed is None:
+            return {
+                "ticker": ticker,
+                "status": "unchanged",
+                "fundamentals": fetched,
+                "metrics": metrics.to_dict(),
+            }
+        since = changed_since(changed)
+
+    if state is not None:
+        # Online updates detect signals bar by bar as part of processing
+        with metrics.span("process") as span:
+            processed, signal_events = state.advance(raw, rules)
+            span.rows += len(processed)
+        result = finish_ticker(
+            ticker, processed, strict, since, rules, signal_events, metrics, indicators
+        )
+        result["state"] = state
+        result["fundamentals"] = fetched
+        result["metrics"] = metrics.to_dict()
+        return result
+
+    with metrics.span("process") as span:
+        processed = process_data(raw, indicators)
+        span.rows += len(processed)
+    result = finish_ticker(
+        ticker, processed, strict, since, rules, metrics=metrics, indicators=indicators
+    )
+    if online:
+        last_row = processed.iloc[-1].to_dict() if len(processed) else None
+        result["state"] = IndicatorState.from_history(
+            ticker, raw["price_data"], last_row, raw["fundamental_data"], indicators
+        )
+    result["fundamentals"] = fetched
+    result["metrics"] = metrics.to_dict()
+    if fingerprints is not None:
+        restate(result, prints, changed, fingerprints)
+    return result
+
+
+def run_universe(
+    tickers: List[str],
+    workers: int = 1,
+    strict: bool = False,
+    jobs: Optional[Dict[str, Dict[str, Any]]] = None,
+    provider: Optional[MarketDataProvider] = None,
+    period: str = "5y",
+    rules: Optional[List[SignalRule]] = None,
+    indicators: Optional[List[IndicatorSpec]] = None,
+) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[Exception]]]:
+    """
+    Run `run_ticker` for every ticker, yielding (ticker, result, error) as each
+    finishes. With workers > 1 the tickers are spread over a process pool, with
+    at most INFLIGHT_PER_WORKER tasks per worker submitted ahead, so a slow
+    consumer holds back the workers instead of collecting finished results in
+    memory.
+    `jobs` holds extra per-ticker `run_ticker` arguments (since/warmup/raw/...).
+    """
+    jobs = jobs or {}
+    runner = partial(
+        run_ticker,
+        strict=strict,
+        provider=provider,
+        period=period,
+        rules=rules,
+        indicators=indicators,
+    )
+
+    def job(ticker):
+        return jobs.get(ticker, {})
+
+    if workers <= 1 or len(tickers) <= 1:
+        for ticker in tickers:
+            try:
+                yield ticker, runner(ticker, **job(ticker)), None
+            except Exception as e:
+                yield ticker, None, e
+        return
+
+    pending = iter(tickers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for ticker in pending:
+            futures[pool.submit(runner, ticker, **job(ticker))] = ticker
+            if len(futures) >= workers * INFLIGHT_PER_WORKER:
+                break
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                ticker = futures.pop(future)
+                try:
+                    yield ticker, future.result(), None
+                except Exception as e:
+                    yield ticker, None, e
+                for ticker in pending:
+                    futures[pool.submit(runner, ticker, **job(ticker))] = ticker
+                    break
+
+
+def run_universe_async(
+    tickers: List[str],
+    fetcher: AsyncFetcher,
+    workers: int = 1,
+    strict: bool = False,
+    jobs: Optional[Dict[str, Dict[str, Any]]] = None,
+    period: str = "5y",
+    chunk_size: int = 500,
+    rules: Optional[List[SignalRule]] = None,
+    metrics: Optional[Metrics] = None,
+    indicators: Optional[List[IndicatorSpec]] = None,
+) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[Exception]]]:
+    """
+    Like `run_universe`, but each chunk of tickers is first fetched concurrently by
+    `fetcher` and then processed in the worker pool. The fetch stage is recorded
+    in `metrics`.
+    """
+    jobs = jobs or {}
+    metrics = metrics if metrics is not None else Metrics()
+    for i in range(0, len(tickers), chunk_size):
+        chunk = tickers[i : i + chunk_size]
+        fetched = fetch_chunk(fetcher, chunk, jobs, period, metrics)
+
+        ready, chunk_jobs = [], {}
+        for ticker in chunk:
+            raw = fetched[ticker]
+            if isinstance(raw, Exception):
+                yield ticker, None, raw
+                continue
+            ready.append(ticker)
+            chunk_jobs[ticker] = {**jobs.get(ticker, {}), "raw": raw}
+        yield from run_universe(
+            ready,
+            workers,
+            strict,
+            chunk_jobs,
+            period=period,
+            rules=rules,
+            indicators=indicators,
+        )
+
+
+def stored_history(
+    engine,
+    store: Optional[ColumnStore],
+    ticker: str,
+    last: date,
+    bars: int = WARMUP_BARS,
+) -> PriceSeries:
+    """
+    The last `bars` stored bars (see warmup_bars), as memmap views from the
+    column store when it is in sync with the database for this ticker, else
+    from SQLite.
+    """
+    if store is not None and store.last_date(ticker) == np.datetime64(last, "D"):
+        return store.price_series(ticker, limit=bars)
+    return load_price_history(engine, ticker, limit=bars)
+
+
+def fetch_chunk(
+    fetcher: AsyncFetcher,
+    chunk: List[str],
+    jobs: Dict[str, Dict[str, Any]],
+    period: str,
+    metrics: Metrics,
+) -> Dict[str, Any]:
+    """
+    Fetch a chunk concurrently, recording the fetch span, cache hits and the
+    fetcher's request and retry counts.
+    """
+    starts = {t: start_date(jobs.get(t, {}).get("since")) for t in chunk}
+    skip = [t for t in chunk if not jobs.get(t, {}).get("fetch_fundamentals", True)]
+    before = cache_counts(fetcher.provider)
+    requests, retries = fetcher.requests, fetcher.retries
+    with metrics.span("fetch") as span:
+        fetched = fetch_universe(fetcher, chunk, starts, period, skip)
+        span.rows += sum(
+            len(raw["price_data"])
+            for raw in fetched.values()
+            if not isinstance(raw, Exception)
+        )
+    count_cache(metrics, fetcher.provider, before)
+    metrics.incr("fetch_requests", fetcher.requests - requests)
+    metrics.incr("fetch_retries", fetcher.retries - retries)
+    return fetched
+
+
+def run_universe_panel(
+    tickers: List[str],
+    strict: bool = False,
+    jobs: Optional[Dict[str, Dict[str, Any]]] = None,
+    provider: Optional[MarketDataProvider] = None,
+    period: str = "5y",
+    rules: Optional[List[SignalRule]] = None,
+    fetcher: Optional[AsyncFetcher] = None,
+    chunk_size: int = 500,
+    metrics: Optional[Metrics] = None,
+    indicators: Optional[List[IndicatorSpec]] = None,
+) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[Exception]]]:
+    """
+    Panel mode: fetch a chunk of tickers (concurrently when `fetcher` is given),
+    then compute the rolling indicators for the whole chunk in one NumPy pass.
+    Stages are recorded in `metrics`.
+    """
+    from .panel import process_panel
+
+    jobs = jobs or {}
+    metrics = metrics if metrics is not None else Metrics()
+    for i in range(0, len(tickers), chunk_size):
+        chunk = tickers[i : i + chunk_size]
+        if fetcher is not None:
+            fetched = fetch_chunk(fetcher, chunk, jobs, period, metrics)
+        else:
+            fetched = {}
+            before = cache_counts(provider)
+            with metrics.span("fetch") as span:
+                for ticker in chunk:
+                    job = jobs.get(ticker, {})
+                    try:
+                        fetched[ticker] = fetch_stock_data(
+                            ticker,
+                            start=start_date(job.get("since")),
+                            provider=provider,
+                            period=period,
+                            fundamentals=job.get("fetch_fundamentals", True),
+                        )
+                        span.rows += len(fetched[ticker]["price_data"])
+                    except Exception as e:
+                        fetched[ticker] = e
+            count_cache(metrics, provider, before)
+
+        raws, fresh, checks = {}, {}, {}
+        for ticker in chunk:
+            job = jobs.get(ticker, {})
+            if isinstance(fetched[ticker], Exception):
+                yield ticker, None, fetched[ticker]
+                continue
+            try:
+                raw = prepare_raw(
+                    ticker, job.get("since"), job.get("warmup"), raw=fetched[ticker]
+                )
+            except Exception as e:
+                yield ticker, None, e
+                continue
+            if raw is None:
+                yield ticker, {"ticker": ticker, "status": "up_to_date"}, None
+                continue
+            fresh[ticker] = use_stored_fundamentals(raw, job.get("fundamentals"))
+            if job.get("fingerprints") is not None:
+                checks[ticker] = check_inputs(
+                    raw, job["fingerprints"], rules, indicators
+                )
+                if checks[ticker][1] is None:
+                    result = {"ticker": ticker, "status": "unchanged"}
+                    result["fundamentals"] = fresh[ticker]
+                    yield ticker, result, None
+                    continue
+            raws[ticker] = raw
+
+        with metrics.span("process") as span:
+            panel = process_panel(raws, indicators)
+            span.rows += sum(len(df) for df in panel.values())
+        for ticker, processed in panel.items():
+            try:
+                job = jobs.get(ticker, {})
+                since = job.get("since")
+                if ticker in checks:
+                    since = changed_since(checks[ticker][1])
+                result = finish_ticker(
+                    ticker,
+                    processed,
+                    strict,
+                    since,
+                    rules,
+                    metrics=metrics,
+                    indicators=indicators,
+                )
+                result["fundamentals"] = fresh[ticker]
+                if ticker in checks:
+                    restate(result, *checks[ticker], job["fingerprints"])
+                yield ticker, result, None
+            except Exception as e:
+                yield ticker, None, e
+
+
+def load_online_states(
+    engine,
+    store: Optional[ColumnStore],
+    tickers: List[str],
+    stored_fundamentals: Dict[str, Tuple[date, List[RawFundamentalData]]],
+    indicators: Optional[List[IndicatorSpec]] = None,
+) -> Dict[str, IndicatorState]:
+    """
+    Stored online indicator states; tickers stored before online mode (or
+    with states saved for other `indicators`) get theirs from the stored
+    bars. Tickers without stored rows are left out.
+    """
+    indicators = indicators or []
+    states = load_indicator_states(engine, tickers, indicators)
+    missing = [t for t in tickers if t not in states]
+    for ticker, last in get_last_dates(engine, missing).items():
+        history = stored_history(engine, store, ticker, last, warmup_bars(indicators))
+        records = stored_fundamentals.get(ticker, (None, None))[1]
+        states[ticker] = IndicatorState.from_history(
+            ticker, history, fundamentals=records, indicators=indicators
+        )
+    return states
+
+
+def save_result(
+    engine,
+    result: Dict[str, Any],
+    on_conflict: str = "ignore",
+    daily_fundamentals: bool = False,
+    store: Optional[ColumnStore] = None,
+) -> WriteStats:
+    """
+    Save one `run_ticker` result: rows, events, online state, fetched
+    fundamentals and fingerprints in one transaction, then the column store
+    copy (not flushed).
+    """
+    stats = save_ticker_results(
+        engine,
+        result["processed"],
+        result["signal_events"],
+        on_conflict,
+        result.get("state"),
+        result.get("fundamentals"),
+        daily_fundamentals,
+        result.get("fingerprints"),
+        result.get("replace_from"),
+    )
+    if store is not None:
+        store.write(
+            result["processed"],
+            "update" if result.get("replace_from") else on_conflict,
+            result.get("replace_from"),
+        )
+    return stats
+
+
+def run_pipeline(args, parser: argparse.ArgumentParser, config: Dict[str, Any], engine):
+    """
+    The default command: fetch, process, save and export the requested tickers.
+    """
+    if not args.output:
+        parser.error("--output is required")
+    tickers = list(args.ticker)
+    if args.universe:
+        tickers.extend(load_universe(args.universe))
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        parser.error("one of --ticker or --universe is required")
+    batch = len(tickers) > 1 or args.universe is not None
+
+    db_settings = config.get("database", {})
+    on_conflict = args.on_conflict or db_settings.get("on_conflict", "ignore")
+
+    output_settings = config.get("output", {})
+    writer = get_writer(
+        args.format or output_settings.get("format", "json"),
+        args.output,
+        batch,
+        compress=args.compress or output_settings.get("compress", False),
+        parquet_compression=output_settings.get("parquet_compression", "snappy"),
+    )
+    bytes_written = 0
+
+    workers = args.workers or config.get("pipeline", {}).get("workers", 1)
+    if args.offline:
+        config.setdefault("cache", {}).update({"enabled": True, "offline": True})
+    provider = build_provider(config)
+    period = config.get("data_settings", {}).get("historical_period", "5y")
+    rules = load_rules(config)
+    indicators = load_indicators(config, rules)
+
+    metrics = Metrics()
+    if args.profile:
+        enable_profiling(args.profile, args.profile_mode)
+        if args.profile in ("fetch", "process", "signals") and workers > 1:
+            logger.info(f"Profiling {args.profile}: running with 1 worker")
+            workers = 1
+
+    pipeline_settings = config.get("pipeline", {})
+    panel = args.panel or pipeline_settings.get("panel", False)
+    online = args.online or pipeline_settings.get("online", False)
+    if panel and online:
+        parser.error("--panel and --online cannot be combined")
+
+    store = open_column_store(config)
+    fundamentals_settings = config.get("fundamentals", {})
+    refresh_after = timedelta(days=fundamentals_settings.get("refresh_days", 30))
+    daily_fundamentals = fundamentals_settings.get("daily_columns", False)
+    stored_fundamentals = load_fundamentals(engine, tickers)
+    jobs = {}
+    if online:
+        states = load_online_states(
+            engine, store, tickers, stored_fundamentals, indicators
+        )
+        for ticker in tickers:
+            state = states.get(ticker)
+            if state is None:
+                jobs[ticker] = {"online": True}
+            else:
+                jobs[ticker] = {"since": state.last_date, "state": state}
+        logger.info(
+            f"Online mode: {len(states)} ticker(s) with indicator state, "
+            f"{len(tickers) - len(states)} fetched in full"
+        )
+    elif args.incremental:
+        last_dates = get_last_dates(engine, tickers)
+        for ticker, last in last_dates.items():
+            jobs[ticker] = {
+                "since": last,
+                "warmup": stored_history(
+                    engine, store, ticker, last, warmup_bars(indicators)
+                ),
+            }
+        logger.info(
+            f"Incremental mode: {len(jobs)} ticker(s) with stored history, "
+            f"{len(tickers) - len(jobs)} fetched in full"
+        )
+
+    # Fundamentals have their own cadence: reuse stored records until they are
+    # refresh_days old, fetching prices only
+    reused = 0
+    for ticker, (fetched_on, records) in stored_fundamentals.items():
+        job = jobs.setdefault(ticker, {})
+        job["fundamentals"] = records
+        if not args.refresh_fundamentals and date.today() - fetched_on < refresh_after:
+            job["fetch_fundamentals"] = False
+            reused += 1
+    logger.info(
+        f"Fundamentals: {reused} ticker(s) reuse stored records, "
+        f"{len(tickers) - reused} fetched"
+    )
+
+    # Full fetches compare input fingerprints and skip tickers with unchanged
+    # inputs; incremental and online runs already fetch only new bars
+    skip_unchanged = pipeline_settings.get("skip_unchanged", True) and not args.force
+    if skip_unchanged and not online and not args.incremental:
+        stored_prints = load_fingerprints(engine, tickers)
+        for ticker in tickers:
+            jobs.setdefault(ticker, {})["fingerprints"] = stored_prints.get(ticker, {})
+
+    summary: Dict[str, Any] = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "tickers_total": len(tickers),
+        "succeeded": [],
+        "up_to_date": [],
+        "unchanged": [],
+        "failed": {},
+        "golden_crossovers": 0,
+        "death_crosses": 0,
+        "signals": {rule.name: 0 for rule in rules},
+        "fundamentals_fetched": 0,
+        "fundamentals_reused": 0,
+    }
+
+    logger.info(
+        f"Running pipeline for {len(tickers)} ticker(s) with {workers} worker(s)"
+    )
+    fetch_settings = config.get("fetch", {})
+    use_async = args.async_fetch or fetch_settings.get("async", False)
+    if panel:
+        results = run_universe_panel(
+            tickers,
+            args.strict,
+            jobs,
+            provider,
+            period,
+            rules,
+            fetcher=build_async_fetcher(provider, config) if use_async else None,
+            chunk_size=fetch_settings.get("chunk_size", 500),
+            metrics=metrics,
+            indicators=indicators,
+        )
+    elif use_async:
+        fetcher = build_async_fetcher(provider, config)
+        results = run_universe_async(
+            tickers,
+            fetcher,
+            workers,
+            args.strict,
+            jobs,
+            period,
+            chunk_size=fetch_settings.get("chunk_size", 500),
+            rules=rules,
+            metrics=metrics,
+            indicators=indicators,
+        )
+    else:
+        results = run_universe(
+            tickers, workers, args.strict, jobs, provider, period, rules, indicators
+        )
+
+    # summary and metrics are updated from both the main and the writer thread
+    lock = threading.Lock()
+
+    def saved(result: Dict[str, Any], rows: int):
+        # Called on the writer thread once the result is committed, so a ticker
+        # whose transaction fails leaves no output file behind
+        nonlocal bytes_written
+        if result["status"] == "unchanged":
+            return
+        ticker, processed = result["ticker"], result["processed"]
+        with lock:
+            try:
+                with metrics.span("output") as span:
+                    written = writer.write(ticker, processed, result["signal_events"])
+                    span.rows += len(processed)
+                    span.bytes += written
+            except Exception as e:
+                logger.error(f"Writing output failed for {ticker}: {e}", exc_info=True)
+                summary["failed"][ticker] = f"{type(e).__name__}: {e}"
+                return
+            bytes_written += written
+            summary["succeeded"].append(ticker)
+            summary["golden_crossovers"] += result["golden_crossovers"]
+            summary["death_crosses"] += result["death_crosses"]
+            for name, count in result["signal_counts"].items():
+                summary["signals"][name] = summary["signals"].get(name, 0) + count
+        if not batch:
+            print(f"✅ Analysis complete. Results saved to {args.output}")
+
+    def failed(result: Dict[str, Any], error: Exception):
+        with lock:
+            summary["failed"][result["ticker"]] = f"{type(error).__name__}: {error}"
+
+    # All database writes happen on the write queue's single writer thread
+    writer_settings = config.get("writer", {})
+    write_queue = WriteQueue(
+        engine,
+        on_conflict,
+        daily_fundamentals,
+        store,
+        max_pending=writer_settings.get("max_pending", 64),
+        batch_rows=writer_settings.get("batch_rows", 50_000),
+        on_saved=saved,
+        on_failed=failed,
+    )
+    with write_queue:
+        for ticker, result, error in results:
+            # submit() may block on the writer, so it runs outside the lock
+            with lock:
+                if result is not None:
+                    metrics.merge(result.get("metrics", {}))
+                if error is not None:
+                    logger.error(
+                        f"Pipeline failed for {ticker}: {error}", exc_info=error
+                    )
+                    summary["failed"][ticker] = f"{type(error).__name__}: {error}"
+                    continue
+
+                if result["status"] == "up_to_date":
+                    logger.info(f"{ticker} is up to date")
+                    summary["up_to_date"].append(ticker)
+                    continue
+                if result.get("fundamentals"):
+                    summary["fundamentals_fetched"] += 1
+                elif not jobs.get(ticker, {}).get("fetch_fundamentals", True):
+                    summary["fundamentals_reused"] += 1
+                unchanged = result["status"] == "unchanged"
+                if unchanged:
+                    logger.info(f"{ticker} inputs unchanged since the last run")
+                    summary["unchanged"].append(ticker)
+                    metrics.incr("tickers_unchanged")
+
+            if unchanged:
+                if result.get("fundamentals"):
+                    # Record the fetch so the refresh cadence restarts
+                    write_queue.submit(result)
+                if not batch:
+                    print(f"⏭️  {ticker} unchanged since last run; nothing written")
+                continue
+            logger.info(f"Saving {ticker} to database")
+            write_queue.submit(result)
+
+    writer_stats = write_queue.stats
+    write_stats = write_queue.write_stats()
+    metrics.record("db_write", write_stats.seconds, rows=write_stats.rows)
+    metrics.incr("writer_batches", writer_stats.batches)
+    metrics.incr("writer_wait_seconds", writer_stats.producer_wait_seconds)
+    log_stats(writer_stats)
+    if store is not None:
+        with metrics.span("db_write"):
+            store.close()
+
+    summary["finished_at"] = datetime.now().isoformat(timespec="seconds")
+    summary["output_bytes"] = bytes_written
+    summary["rows_written"] = write_stats.rows
+    summary["write_rows_per_sec"] = round(write_stats.rows_per_sec)
+    summary["writer"] = writer_stats.to_dict()
+    summary["metrics"] = metrics.to_dict()
+    logger.info(
+        f"Wrote {write_stats.rows} rows in {write_stats.seconds:.2f}s "
+        f"({write_stats.rows_per_sec:,.0f} rows/sec)"
+    )
+    metrics.log_summary()
+
+    metrics_path = args.metrics or config.get("metrics", {}).get("path")
+    if metrics_path:
+        metrics.write(metrics_path)
+        logger.info(f"Metrics written to {metrics_path}")
+    if args.profile:
+        profile_path = dump_profile(args.profile_dir)
+        if profile_path:
+            print(f"🔬 Profile of {args.profile} written to {profile_path}")
+
+    summary_path = args.summary or (
+        str(Path(args.output) / "summary.json") if batch else None
+    )
+    if summary_path:
+        Path(summary_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(summary_path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if batch:
+        succeeded = len(summary["succeeded"])
+        print(f"✅ Batch complete: {succeeded}/{len(tickers)} tickers succeeded")
+        if summary["up_to_date"]:
+            print(f"⏭️  Already up to date: {len(summary['up_to_date'])} tickers")
+        if summary["unchanged"]:
+            unchanged = len(summary["unchanged"])
+            print(f"⏭️  Unchanged inputs, skipped: {unchanged} tickers")
+        for ticker, error in summary["failed"].items():
+            print(f"❌ {ticker}: {error}")
+    print(f"📈 Golden Crossovers: {summary['golden_crossovers']}")
+    print(f"📉 Death Crosses: {summary['death_crosses']}")
+    for name, count in summary["signals"].items():
+        if name not in ("golden_crossover", "death_cross"):
+            print(f"🔔 {name}: {count}")
+
+    # Only a run where nothing succeeded is treated as a failed run
+    if not (summary["succeeded"] or summary["up_to_date"] or summary["unchanged"]):
+        exit(1)
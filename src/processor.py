@@ -1,128 +1,171 @@
 # src/processor.py
+import numpy as np
 import pandas as pd
 from decimal import Decimal
-from typing import List
-from .models import ProcessedDailyMetrics
+from typing import Any, Dict, Iterable, List, Optional
+from .indicators import (
+    IndicatorSpec,
+    compute_indicators,
+    required_sources,
+)
+from .models import PriceSeries, ProcessedDailyMetrics
 
+# Decimal places kept for every float column in the metrics frame
+ROUND_DECIMALS = 6
 
-def process_data(raw_data: dict) -> List[ProcessedDailyMetrics]:
+METRIC_COLUMNS = list(ProcessedDailyMetrics.model_fields)
+
+# Fundamental record fields the daily metrics are derived from
+FUNDAMENTAL_FIELDS = ("ShareholderEquity", "SharesOutstanding", "EnterpriseValue")
+
+
+def process_data(
+    raw_data: dict, indicators: Optional[List[IndicatorSpec]] = None
+) -> pd.DataFrame:
+    """
+    Compute daily metrics for one ticker as a columnar frame.
+    Columns match ProcessedDailyMetrics, followed by one per configured
+    indicator (see src/indicators.py); missing values are NaN.
+    Use `validate_metrics` to get pydantic models when strict validation is needed.
+    """
+    price_df = price_frame(raw_data)
+    indicators = indicators or []
+
+    # Every indicator in one pass over the prices (using float)
+    prices = {
+        source: price_df[source.capitalize()].to_numpy(dtype=np.float64)[:, None]
+        for source in required_sources(indicators)
+    }
+    values = compute_indicators(prices, indicators)
+    return build_metrics(
+        raw_data,
+        price_df,
+        {name: column[:, 0] for name, column in values.items()},
+        indicators,
+    )
+
+
+def price_frame(raw_data: dict) -> pd.DataFrame:
+    """
+    The raw data's prices as an OHLCV frame with a Date column.
+    """
+    # Price data arrives as a PriceSeries; plain record lists are converted once
+    price_series = raw_data["price_data"]
+    if not isinstance(price_series, PriceSeries):
+        price_series = PriceSeries.from_records(price_series)
+    return price_series.to_frame()
+
+
+def build_metrics(
+    raw_data: dict,
+    price_df: pd.DataFrame,
+    indicators: Dict[str, Any],
+    specs: Iterable[IndicatorSpec] = (),
+) -> pd.DataFrame:
+    """
+    Assemble the metrics frame from prices, precomputed `indicators`
+    (sma_50, sma_200, week52_high and one column per spec in `specs`,
+    aligned with `price_df`) and the fundamentals as of each date.
+    """
+    extra = [spec.name for spec in specs]
     ticker = raw_data["ticker"]
+    df = price_df
 
-    # Convert price data to DataFrame
-    price_records = raw_data["price_data"]
-    price_df = pd.DataFrame(
-        [
-            {
-                "Date": r.Date,
-                "Open": float(r.Open),
-                "High": float(r.High),
-                "Low": float(r.Low),
-                "Close": float(r.Close),
-                "Volume": r.Volume,
-            }
-            for r in price_records
-        ]
+    close = df["Close"]
+    week52_high = pd.Series(indicators["week52_high"], index=df.index)
+    pct_from_52w_high = (close - week52_high) / week52_high * 100
+    fundamentals = fundamental_metrics(
+        df["Date"].to_numpy(), close.to_numpy(), raw_data["fundamental_data"]
     )
-    price_df["Date"] = pd.to_datetime(price_df["Date"])
-
-    # Handle fundamentals
-    fund_records = raw_data["fundamental_data"]
-    if fund_records:
-        fund_df = pd.DataFrame(
-            [
-                {
-                    "Date": r.Date,
-                    "ShareholderEquity": float(r.ShareholderEquity)
-                    if r.ShareholderEquity is not None
-                    else None,
-                    "SharesOutstanding": r.SharesOutstanding,
-                    "EnterpriseValue": float(r.EnterpriseValue)
-                    if r.EnterpriseValue is not None
-                    else None,
-                }
-                for r in fund_records
-            ]
+
+    out = pd.DataFrame(
+        {
+            "ticker": ticker,
+            "date": df["Date"].dt.date,
+            "open": df["Open"].fillna(0.0),
+            "high": df["High"].fillna(0.0),
+            "low": df["Low"].fillna(0.0),
+            "close": close.fillna(0.0),
+            "volume": df["Volume"].fillna(0).astype("int64"),
+            "sma_50": pd.Series(indicators["sma_50"], index=df.index),
+            "sma_200": pd.Series(indicators["sma_200"], index=df.index),
+            "week52_high": week52_high,
+            "pct_from_52w_high": pct_from_52w_high,
+            **{
+                name: pd.Series(values, index=df.index)
+                for name, values in fundamentals.items()
+            },
+            **{name: pd.Series(indicators[name], index=df.index) for name in extra},
+        },
+        columns=METRIC_COLUMNS + extra,
+    )
+    float_cols = out.select_dtypes("float").columns
+    out[float_cols] = out[float_cols].replace([np.inf, -np.inf], np.nan)
+    out[float_cols] = out[float_cols].round(ROUND_DECIMALS)
+    return out
+
+
+def asof_fundamentals(dates: np.ndarray, records: Iterable) -> Dict[str, np.ndarray]:
+    """
+    Point-in-time fundamentals for each price date: every field takes its value
+    from the latest record dated on or before that date that reports it (a
+    vectorized as-of join; records need not be sorted). Missing values are NaN.
+    """
+    records = list(records or [])
+    dates = np.asarray(dates).astype("datetime64[D]")
+    report_dates = np.array([r.Date for r in records], dtype="datetime64[D]")
+    order = np.argsort(report_dates, kind="stable")
+    out = {}
+    for field in FUNDAMENTAL_FIELDS:
+        values = [getattr(records[i], field, None) for i in order]
+        known = [i for i, v in enumerate(values) if v is not None]
+        # NaN sentinel at the front for dates before the first report
+        known_values = np.array(
+            [np.nan] + [float(values[i]) for i in known], dtype=np.float64
+        )
+        pos = np.searchsorted(report_dates[order][known], dates, side="right")
+        out[field] = known_values[pos]
+    return out
+
+
+def fundamental_metrics(
+    dates: np.ndarray, close: np.ndarray, records: Iterable
+) -> Dict[str, np.ndarray]:
+    """
+    book_value_per_share, price_to_book and enterprise_value per price date,
+    from fundamentals as of that date (unrounded).
+    """
+    fund = asof_fundamentals(dates, records)
+    shares = fund["SharesOutstanding"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        book_value_per_share = fund["ShareholderEquity"] / np.where(
+            shares == 0, np.nan, shares
         )
-        fund_df["Date"] = pd.to_datetime(fund_df["Date"])
-        fund_df = fund_df.sort_values("Date").set_index("Date")
-        daily_fund = (
-            fund_df.reindex(price_df["Date"], method="ffill")
-            .infer_objects()
-            .reset_index()
+        price_to_book = np.where(
+            (book_value_per_share > 0) & (close != 0),
+            close / book_value_per_share,
+            np.nan,
         )
-    else:
-        daily_fund = pd.DataFrame({"Date": price_df["Date"]})
-
-    # Merge
-    df = pd.merge(price_df, daily_fund, on="Date", how="left")
-
-    # Compute technical indicators (using float)
-    df["sma_50"] = df["Close"].rolling(window=50, min_periods=1).mean()
-    df["sma_200"] = df["Close"].rolling(window=200, min_periods=1).mean()
-    df["week52_high"] = df["Close"].rolling(window=252, min_periods=1).max()
-    df["pct_from_52w_high"] = (
-        (df["Close"] - df["week52_high"]) / df["week52_high"] * 100
-    )
+    return {
+        "book_value_per_share": book_value_per_share,
+        "price_to_book": price_to_book,
+        "enterprise_value": fund["EnterpriseValue"],
+    }
+
 
-    # Build final records with Decimal
-    results = []
-    for _, row in df.iterrows():
-        try:
-            # Reconstruct Decimals from float (safe for JSON/DB)
-            close = Decimal(str(row["Close"])) if pd.notna(row["Close"]) else None
-            week52_high = (
-                Decimal(str(row["week52_high"]))
-                if pd.notna(row["week52_high"])
-                else None
-            )
-            pct = (
-                Decimal(str(row["pct_from_52w_high"]))
-                if pd.notna(row["pct_from_52w_high"])
-                else None
-            )
-
-            # Fundamental ratios
-            book_value_per_share = None
-            price_to_book = None
-            if (
-                pd.notna(row.get("ShareholderEquity"))
-                and pd.notna(row.get("SharesOutstanding"))
-                and row["SharesOutstanding"]
-            ):
-                try:
-                    bvps = row["ShareholderEquity"] / row["SharesOutstanding"]
-                    book_value_per_share = Decimal(str(bvps))
-                    if book_value_per_share and book_value_per_share > 0 and close:
-                        price_to_book = close / book_value_per_share
-                except (ZeroDivisionError, TypeError):
-                    pass
-
-            item = ProcessedDailyMetrics(
-                ticker=ticker,
-                date=row["Date"].date(),
-                open=Decimal(str(row["Open"]))
-                if pd.notna(row["Open"])
-                else Decimal("0"),
-                high=Decimal(str(row["High"]))
-                if pd.notna(row["High"])
-                else Decimal("0"),
-                low=Decimal(str(row["Low"])) if pd.notna(row["Low"]) else Decimal("0"),
-                close=close or Decimal("0"),
-                volume=int(row["Volume"]) if pd.notna(row["Volume"]) else 0,
-                sma_50=Decimal(str(row["sma_50"])) if pd.notna(row["sma_50"]) else None,
-                sma_200=Decimal(str(row["sma_200"]))
-                if pd.notna(row["sma_200"])
-                else None,
-                week52_high=week52_high,
-                pct_from_52w_high=pct,
-                book_value_per_share=book_value_per_share,
-                price_to_book=price_to_book,
-                enterprise_value=Decimal(str(row["EnterpriseValue"]))
-                if pd.notna(row.get("EnterpriseValue"))
-                else None,
-            )
-            results.append(item)
-        except Exception:
-            continue  # skip bad rows
-
-    return results
+def validate_metrics(metrics: pd.DataFrame) -> List[ProcessedDailyMetrics]:
+    """
+    Build ProcessedDailyMetrics models from a metrics frame.
+    Raises pydantic.ValidationError on the first invalid row.
+    """
+    records = metrics[METRIC_COLUMNS].astype(object)
+    records = records.where(records.notna(), None).to_dict(orient="records")
+    return [
+        ProcessedDailyMetrics(
+            **{
+                k: Decimal(str(v)) if isinstance(v, float) else v
+                for k, v in rec.items()
+            }
+        )
+        for rec in records
+    ]
@@ -0,0 +1,196 @@
+# src/providers.py
+import json
+import logging
+import re
+from abc import ABC, abstractmethod
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Optional
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class MarketDataProvider(ABC):
+    """
+    Source of raw market data for `fetch_stock_data`.
+    Return shapes follow yfinance: `history` has a DatetimeIndex and OHLCV columns,
+    balance sheets have line items as rows and report dates as columns.
+    Missing data is returned as an empty frame / dict rather than raised.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def history(
+        self, ticker: str, period: str = "5y", start: Optional[date] = None
+    ) -> pd.DataFrame: ...
+
+    @abstractmethod
+    def info(self, ticker: str) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    def quarterly_balance_sheet(self, ticker: str) -> pd.DataFrame: ...
+
+    @abstractmethod
+    def balance_sheet(self, ticker: str) -> pd.DataFrame: ...
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def __init__(self):
+        self._tickers: Dict[str, Any] = {}
+
+    def __getstate__(self):
+        # yf.Ticker objects hold HTTP sessions; worker processes build their own
+        return {"_tickers": {}}
+
+    def _ticker(self, ticker: str):
+        if ticker not in self._tickers:
+            import yfinance as yf
+
+            self._tickers[ticker] = yf.Ticker(ticker)
+        return self._tickers[ticker]
+
+    def history(self, ticker, period="5y", start=None):
+        if start is not None:
+            return self._ticker(ticker).history(start=start.isoformat())
+        return self._ticker(ticker).history(period=period)
+
+    def info(self, ticker):
+        return self._ticker(ticker).info
+
+    def quarterly_balance_sheet(self, ticker):
+        return self._ticker(ticker).quarterly_balance_sheet
+
+    def balance_sheet(self, ticker):
+        return self._ticker(ticker).balance_sheet
+
+
+class LocalFileProvider(MarketDataProvider):
+    """
+    Replays recorded data from a directory, one sub-directory per ticker:
+
+        <root>/<TICKER>/history.parquet|csv        Date, Open, High, Low, Close, Volume
+        <root>/<TICKER>/info.json                  yfinance `info` dict
+        <root>/<TICKER>/quarterly_balance_sheet.parquet|csv   Date + one column per item
+        <root>/<TICKER>/balance_sheet.parquet|csv
+
+    Parquet is used when present (requires pyarrow), otherwise CSV.
+    `period` is applied relative to the last recorded bar so replays are stable.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _read_table(self, ticker: str, stem: str) -> pd.DataFrame:
+        base = self.root / ticker
+        parquet, csv = base / f"{stem}.parquet", base / f"{stem}.csv"
+        if parquet.exists():
+            df = pd.read_parquet(parquet)
+        elif csv.exists():
+            df = pd.read_csv(csv)
+        else:
+            return pd.DataFrame()
+        if "Date" in df.columns:
+            df["Date"] = pd.to_datetime(df["Date"])
+            df = df.set_index("Date").sort_index()
+        return df
+
+    def history(self, ticker, period="5y", start=None):
+        df = self._read_table(ticker, "history")
+        if df.empty:
+            return df
+        if start is not None:
+            return df[df.index >= pd.Timestamp(start)]
+        offset = period_offset(period)
+        if offset is not None:
+            df = df[df.index > df.index[-1] - offset]
+        return df
+
+    def info(self, ticker):
+        path = self.root / ticker / "info.json"
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def quarterly_balance_sheet(self, ticker):
+        return self._read_table(ticker, "quarterly_balance_sheet").T
+
+    def balance_sheet(self, ticker):
+        return self._read_table(ticker, "balance_sheet").T
+
+
+def period_offset(period: str) -> Optional[pd.DateOffset]:
+    """
+    Translate a yfinance period string ("5y", "6mo", "30d", "max") to an offset.
+    """
+    if period == "max":
+        return None
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    n, unit = int(match.group(1)), match.group(2)
+    return {
+        "d": pd.DateOffset(days=n),
+        "wk": pd.DateOffset(weeks=n),
+        "mo": pd.DateOffset(months=n),
+        "y": pd.DateOffset(years=n),
+    }[unit]
+
+
+def record_ticker(
+    source: MarketDataProvider,
+    root: str,
+    ticker: str,
+    period: str = "5y",
+    fmt: str = "csv",
+):
+    """
+    Save one ticker's data from `source` in the LocalFileProvider layout.
+    """
+    base = Path(root) / ticker
+    base.mkdir(parents=True, exist_ok=True)
+
+    def write(df: pd.DataFrame, stem: str):
+        if df is None or df.empty:
+            return
+        df = df.copy()
+        df.index = pd.to_datetime(df.index)
+        if df.index.tz is not None:
+            df.index = df.index.tz_localize(None)
+        df.index.name = "Date"
+        df = df.reset_index()
+        if fmt == "parquet":
+            df.to_parquet(base / f"{stem}.parquet", index=False)
+        else:
+            df.to_csv(base / f"{stem}.csv", index=False)
+
+    write(source.history(ticker, period=period)[PRICE_COLUMNS], "history")
+    write(source.quarterly_balance_sheet(ticker).T, "quarterly_balance_sheet")
+    write(source.balance_sheet(ticker).T, "balance_sheet")
+    with open(base / "info.json", "w") as f:
+        json.dump(source.info(ticker), f, default=str)
+
+
+def get_provider(config: Dict[str, Any]) -> MarketDataProvider:
+    """
+    Build the provider selected by `data_source.provider` in config.yaml.
+    """
+    settings = config.get("data_source", {})
+    name = settings.get("provider", "yfinance")
+    if name == "yfinance":
+        return YFinanceProvider()
+    if name == "local":
+        return LocalFileProvider(settings.get("local_path", "data/market"))
+    if name == "synthetic":
+        from .synthetic import SyntheticProvider
+
+        return SyntheticProvider(seed=settings.get("seed", 0))
+    raise ValueError(f"Unknown data_source.provider: {name}")
@@ -0,0 +1,188 @@
+# src/screener.py
+import re
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Iterable, List, Optional, Union
+import pandas as pd
+from sqlalchemy import (
+    Column,
+    MetaData,
+    Numeric,
+    Table,
+    and_,
+    exists,
+    func,
+    select,
+    text,
+)
+from .database import (
+    LatestMetricsTable,
+    SignalEventsTable,
+    indicator_columns,
+    rebuild_latest_snapshot,
+)
+
+METRIC_FIELDS = [
+    c.name
+    for c in LatestMetricsTable.__table__.columns
+    if c.name not in ("ticker", "date")
+]
+
+OPERATORS = {
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    "=": lambda a, b: a == b,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+}
+
+_COMPARISON = re.compile(r"^(\w+)\s*(>=|<=|==|!=|>|<|=)\s*(\S+)$")
+_WITHIN = re.compile(r"^(\w+)\s+within\s+(\d+)\s*d$", re.IGNORECASE)
+_AND = re.compile(r"\s+and\s+", re.IGNORECASE)
+
+
+@dataclass
+class Comparison:
+    column: str
+    op: str
+    value: Union[float, str]  # a number or another metric column
+
+
+@dataclass
+class SignalWithin:
+    signal_type: str
+    days: int
+
+
+def parse_expression(
+    expression: str,
+    fields: Optional[List[str]] = None,
+    signal_types: Optional[Iterable[str]] = None,
+) -> List[Union[Comparison, SignalWithin]]:
+    """
+    Parse e.g.
+    "pct_from_52w_high > -5 AND price_to_book < 1 AND golden_crossover within 10d".
+    Comparisons take a metric column on the left and a number or column on the
+    right; `fields` are the metric columns (default: METRIC_FIELDS). With
+    `signal_types`, "within" clauses must name one of them.
+    """
+    fields = fields or METRIC_FIELDS
+    clauses = []
+    for part in _AND.split(expression.strip()):
+        part = part.strip()
+        match = _WITHIN.match(part)
+        if match:
+            signal_type = match.group(1)
+            if signal_types is not None and signal_type not in signal_types:
+                raise ValueError(f"Unknown signal: {signal_type}")
+            clauses.append(SignalWithin(signal_type, int(match.group(2))))
+            continue
+        match = _COMPARISON.match(part)
+        if not match:
+            raise ValueError(f"Cannot parse screen clause: {part!r}")
+        column, op, value = match.groups()
+        if column not in fields:
+            raise ValueError(f"Unknown metric column: {column}")
+        if value in fields:
+            clauses.append(Comparison(column, op, value))
+            continue
+        try:
+            clauses.append(Comparison(column, op, float(value)))
+        except ValueError:
+            raise ValueError(f"Expected a number or metric column, got {value!r}")
+    return clauses
+
+
+def latest_table(engine) -> Table:
+    """
+    latest_metrics with the configured indicator columns added so far.
+    """
+    with engine.connect() as conn:
+        extra = indicator_columns(conn, "latest_metrics")
+    if not extra:
+        return LatestMetricsTable.__table__
+    return Table(
+        "latest_metrics",
+        MetaData(),
+        *[Column(c.name, c.type) for c in LatestMetricsTable.__table__.columns],
+        *[Column(name, Numeric(asdecimal=False)) for name in extra],
+    )
+
+
+def ensure_latest_snapshot(engine):
+    """
+    Build latest_metrics once for databases written before it existed.
+    """
+    with engine.connect() as conn:
+        has_latest = conn.execute(text("SELECT 1 FROM latest_metrics LIMIT 1")).first()
+        has_daily = conn.execute(text("SELECT 1 FROM daily_metrics LIMIT 1")).first()
+    if has_daily and not has_latest:
+        rebuild_latest_snapshot(engine)
+
+
+def screen(
+    engine,
+    expression: str,
+    sort_by: Optional[str] = None,
+    ascending: bool = True,
+    limit: Optional[int] = None,
+    signal_types: Optional[Iterable[str]] = None,
+) -> pd.DataFrame:
+    """
+    Run a screen against the latest-snapshot table and return matching rows.
+    "<signal> within Nd" means the signal fired in the N calendar days up to the
+    newest date in the snapshot; the signal must be one of `signal_types` (the
+    configured rule names) or have been stored before.
+    """
+    ensure_latest_snapshot(engine)
+    latest = latest_table(engine)
+    signals = SignalEventsTable.__table__
+    fields = [c.name for c in latest.columns if c.name not in ("ticker", "date")]
+    with engine.connect() as conn:
+        known = set(conn.execute(select(signals.c.signal_type).distinct()).scalars())
+    known.update(signal_types or ())
+
+    conditions = []
+    as_of = None
+    for clause in parse_expression(expression, fields, known):
+        if isinstance(clause, Comparison):
+            right = (
+                latest.c[clause.value]
+                if isinstance(clause.value, str)
+                else clause.value
+            )
+            conditions.append(OPERATORS[clause.op](latest.c[clause.column], right))
+        else:
+            if as_of is None:
+                with engine.connect() as conn:
+                    as_of = conn.execute(select(func.max(latest.c.date))).scalar()
+                if as_of is None:
+                    return pd.DataFrame(columns=[c.name for c in latest.columns])
+            since = as_of - timedelta(days=clause.days)
+            conditions.append(
+                exists().where(
+                    signals.c.signal_type == clause.signal_type,
+                    signals.c.date >= since,
+                    signals.c.ticker == latest.c.ticker,
+                )
+            )
+
+    stmt = select(latest).where(and_(*conditions))
+    if sort_by is not None:
+        if sort_by not in latest.c:
+            raise ValueError(f"Unknown sort column: {sort_by}")
+        column = latest.c[sort_by]
+        stmt = stmt.order_by(column.asc() if ascending else column.desc())
+    else:
+        stmt = stmt.order_by(latest.c.ticker)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).fetchall()
+    df = pd.DataFrame(rows, columns=[c.name for c in latest.columns])
+    numeric = [c for c in fields if c != "volume"]
+    df[numeric] = df[numeric].astype("float64")
+    return df
@@ -1,25 +1,158 @@
-from typing import List
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
 from datetime import date
+import numpy as np
 import pandas as pd
 
+EVENT_COLUMNS = ["ticker", "signal_type", "date"]
 
-def detect_golden_crossover(df: pd.DataFrame) -> List[date]:
-    if "sma_50" not in df.columns or "sma_200" not in df.columns:
-        return []
-    df = df.copy()
-    df["prev_sma_50"] = df["sma_50"].shift(1)
-    df["prev_sma_200"] = df["sma_200"].shift(1)
-    crossover = (df["sma_50"] > df["sma_200"]) & (
-        df["prev_sma_50"] <= df["prev_sma_200"]
+
+@dataclass(frozen=True)
+class SignalRule:
+    """
+    A signal declared in config.yaml under `signals.rules`.
+
+    type "crossover":  `fast` crosses `slow` (direction "above" or "below")
+    type "threshold":  `column` crosses `level` (direction "above" or "below")
+    type "new_high":   `column` reaches a new high, i.e. meets a rising `high` column
+    """
+
+    name: str
+    type: str
+    fast: Optional[str] = None
+    slow: Optional[str] = None
+    column: Optional[str] = None
+    level: Optional[float] = None
+    high: Optional[str] = None
+    direction: str = "above"
+
+    def columns(self) -> List[str]:
+        if self.type == "crossover":
+            return [self.fast, self.slow]
+        if self.type == "threshold":
+            return [self.column]
+        if self.type == "new_high":
+            return [self.column, self.high]
+        raise ValueError(f"Unknown signal rule type: {self.type}")
+
+
+DEFAULT_RULES = [
+    SignalRule("golden_crossover", "crossover", fast="sma_50", slow="sma_200"),
+    SignalRule(
+        "death_cross", "crossover", fast="sma_50", slow="sma_200", direction="below"
+    ),
+]
+
+
+def load_rules(config: Dict[str, Any]) -> List[SignalRule]:
+    """
+    Rules from `signals.rules` in config, or the golden/death cross defaults.
+    """
+    rules_config = config.get("signals", {}).get("rules")
+    if not rules_config:
+        return list(DEFAULT_RULES)
+    rules = [SignalRule(**rule) for rule in rules_config]
+    for rule in rules:
+        rule.columns()  # validates the type
+        if rule.direction not in ("above", "below"):
+            raise ValueError(f"Signal rule {rule.name}: bad direction {rule.direction}")
+    return rules
+
+
+def _crosses(
+    curr: np.ndarray, prev: np.ndarray, curr_ref, prev_ref, direction: str
+) -> np.ndarray:
+    # Comparisons with NaN are False, so warm-up rows never fire
+    if direction == "above":
+        return (curr > curr_ref) & (prev <= prev_ref)
+    return (curr < curr_ref) & (prev >= prev_ref)
+
+
+def evaluate_rules(
+    df: pd.DataFrame, rules: List[SignalRule], ticker: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Evaluate every rule in one pass over the frame's columns and return an event
+    table with SignalEvent columns (ticker, signal_type, date), sorted by date.
+    Each column is converted to a NumPy array once and shared by all rules;
+    the previous bar is a view offset by one row, so nothing is copied.
+    Rules whose columns are missing are skipped.
+    """
+    if len(df) < 2:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+
+    arrays: Dict[str, np.ndarray] = {}
+    for rule in rules:
+        for col in rule.columns():
+            if col in df.columns and col not in arrays:
+                arrays[col] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    dates = df["date"].to_numpy()
+    hit_index, hit_type = [], []
+    for rule in rules:
+        if any(col not in arrays for col in rule.columns()):
+            continue
+        if rule.type == "crossover":
+            fast, slow = arrays[rule.fast], arrays[rule.slow]
+            hits = _crosses(fast[1:], fast[:-1], slow[1:], slow[:-1], rule.direction)
+        elif rule.type == "threshold":
+            values = arrays[rule.column]
+            hits = _crosses(
+                values[1:], values[:-1], rule.level, rule.level, rule.direction
+            )
+        else:
+            values, high = arrays[rule.column], arrays[rule.high]
+            hits = (values[1:] >= high[1:]) & (high[1:] > high[:-1])
+        index = np.flatnonzero(hits) + 1
+        hit_index.append(index)
+        hit_type.append(np.full(len(index), rule.name, dtype=object))
+
+    if not hit_index:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    index = np.concatenate(hit_index)
+    order = np.argsort(index, kind="stable")
+    if ticker is None:
+        ticker = df["ticker"].iloc[0] if "ticker" in df.columns else None
+    return pd.DataFrame(
+        {
+            "ticker": ticker,
+            "signal_type": np.concatenate(hit_type)[order],
+            "date": dates[index[order]],
+        },
+        columns=EVENT_COLUMNS,
     )
-    return df[crossover]["date"].dropna().tolist()
 
 
-def detect_death_cross(df: pd.DataFrame) -> List[date]:
-    if "sma_50" not in df.columns or "sma_200" not in df.columns:
+def rule_fires(rule: SignalRule, prev: Dict[str, Any], curr: Dict[str, Any]) -> bool:
+    """
+    Scalar form of `evaluate_rules` for a single bar, given the previous bar's
+    values. Missing columns and None values never fire.
+    """
+    values = []
+    for col in rule.columns():
+        if prev.get(col) is None or curr.get(col) is None:
+            return False
+        values.append((float(curr[col]), float(prev[col])))
+    if rule.type == "crossover":
+        (fast, prev_fast), (slow, prev_slow) = values
+        return bool(_crosses(fast, prev_fast, slow, prev_slow, rule.direction))
+    if rule.type == "threshold":
+        value, prev_value = values[0]
+        return bool(_crosses(value, prev_value, rule.level, rule.level, rule.direction))
+    (value, _), (high, prev_high) = values
+    return bool((value >= high) & (high > prev_high))
+
+
+def _rule_dates(df: pd.DataFrame, rule: SignalRule) -> List[date]:
+    if any(col not in df.columns for col in rule.columns()):
         return []
-    df = df.copy()
-    df["prev_sma_50"] = df["sma_50"].shift(1)
-    df["prev_sma_200"] = df["sma_200"].shift(1)
-    cross = (df["sma_50"] < df["sma_200"]) & (df["prev_sma_50"] >= df["prev_sma_200"])
-    return df[cross]["date"].dropna().tolist()
+    events = evaluate_rules(df, [rule])
+    return events["date"].dropna().tolist()
+
+
+def detect_golden_crossover(df: pd.DataFrame) -> List[date]:
+    return _rule_dates(df, DEFAULT_RULES[0])
+
+
+def detect_death_cross(df: pd.DataFrame) -> List[date]:
+    return _rule_dates(df, DEFAULT_RULES[1])
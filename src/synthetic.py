@@ -0,0 +1,168 @@
+# src/synthetic.py
+import zlib
+from datetime import date
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from .providers import MarketDataProvider, period_offset
+
+# Trading days per year, used to turn a yfinance period into a bar count
+BARS_PER_YEAR = 252
+
+SYNTHETIC_END = "2024-12-31"
+
+
+def ticker_seed(ticker: str, seed: int = 0) -> int:
+    """
+    Stable per-ticker seed (hash() is salted per process, crc32 is not).
+    """
+    return zlib.crc32(f"{seed}:{ticker}".encode())
+
+
+def business_days(end: str, bars: int) -> pd.DatetimeIndex:
+    """
+    The `bars` weekdays up to and including `end` (vectorized; much faster
+    than pd.bdate_range for many tickers).
+    """
+    last = np.busday_offset(np.datetime64(end, "D"), 0, roll="backward")
+    days = np.busday_offset(last, np.arange(1 - bars, 1))
+    return pd.DatetimeIndex(days.astype("datetime64[ns]"))
+
+
+def synthetic_history(
+    ticker: str, bars: int, end: str = SYNTHETIC_END, seed: int = 0
+) -> pd.DataFrame:
+    """
+    Deterministic yfinance-shaped OHLCV history: a geometric random walk on
+    business days ending at `end`, with High >= max(Open, Close) and
+    Low <= min(Open, Close).
+    """
+    rng = np.random.default_rng(ticker_seed(ticker, seed))
+    start_price = rng.uniform(5, 2000)
+    returns = rng.normal(0.0003, rng.uniform(0.01, 0.03), bars)
+    close = start_price * np.exp(np.cumsum(returns))
+    prev_close = np.concatenate([[start_price], close[:-1]])
+    open_ = prev_close * (1 + rng.normal(0, 0.003, bars))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.005, bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.005, bars)))
+    volume = rng.lognormal(13, 1, bars).astype(np.int64)
+    index = business_days(end, bars)
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=index,
+    )
+
+
+def synthetic_info(ticker: str, seed: int = 0) -> Dict[str, Any]:
+    rng = np.random.default_rng(ticker_seed(ticker, seed) + 1)
+    shares = int(rng.integers(10_000_000, 5_000_000_000))
+    market_cap = float(shares * rng.uniform(5, 500))
+    return {
+        "sharesOutstanding": shares,
+        "marketCap": market_cap,
+        "enterpriseValue": market_cap * float(rng.uniform(0.8, 1.4)),
+    }
+
+
+def synthetic_balance_sheet(
+    ticker: str,
+    start: date,
+    end: date,
+    freq: Optional[pd.DateOffset] = None,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    yfinance-shaped balance sheet (line items as rows, report dates as columns)
+    with one report per `freq` period (default: quarter ends) between `start`
+    and `end`, newest first.
+    """
+    report_dates = pd.date_range(start, end, freq=freq or pd.offsets.QuarterEnd())
+    if report_dates.empty:
+        return pd.DataFrame()
+    rng = np.random.default_rng(ticker_seed(ticker, seed) + 2)
+    n = len(report_dates)
+    assets = rng.uniform(1e8, 1e11) * np.exp(np.cumsum(rng.normal(0.01, 0.03, n)))
+    liabilities = assets * rng.uniform(0.3, 0.9, n)
+    sheet = pd.DataFrame(
+        {
+            "Total Assets": assets,
+            "Total Liab": liabilities,
+            "Total Stockholder Equity": assets - liabilities,
+        },
+        index=report_dates,
+    )
+    return sheet.iloc[::-1].T
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Generated market data for benchmarks and tests; no network or files.
+    Each ticker has `bars` bars of history (or its entry in `lengths`),
+    ending at `end`; the same ticker and seed always give the same data.
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        bars: Optional[int] = None,
+        lengths: Optional[Dict[str, int]] = None,
+        end: str = SYNTHETIC_END,
+        seed: int = 0,
+    ):
+        self.bars = bars
+        self.lengths = lengths or {}
+        self.end = end
+        self.seed = seed
+
+    def _bars(self, ticker: str, period: str) -> int:
+        if ticker in self.lengths:
+            return self.lengths[ticker]
+        if self.bars is not None:
+            return self.bars
+        offset = period_offset(period)
+        if offset is None:
+            return 20 * BARS_PER_YEAR
+        end = pd.Timestamp(self.end)
+        return len(pd.bdate_range(end - offset, end)) - 1
+
+    def history(self, ticker, period="5y", start=None):
+        hist = synthetic_history(
+            ticker, self._bars(ticker, period), self.end, self.seed
+        )
+        if start is not None:
+            hist = hist[hist.index >= pd.Timestamp(start)]
+        return hist
+
+    def info(self, ticker):
+        return synthetic_info(ticker, self.seed)
+
+    def _sheet(self, ticker: str, freq: pd.DateOffset) -> pd.DataFrame:
+        bars = self._bars(ticker, "5y")
+        end = pd.Timestamp(self.end)
+        start = business_days(self.end, bars)[0]
+        return synthetic_balance_sheet(ticker, start, end, freq, self.seed)
+
+    def quarterly_balance_sheet(self, ticker):
+        return self._sheet(ticker, pd.offsets.QuarterEnd())
+
+    def balance_sheet(self, ticker):
+        return self._sheet(ticker, pd.offsets.YearEnd())
+
+
+def synthetic_universe(n: int, prefix: str = "SYN") -> List[str]:
+    width = len(str(max(n - 1, 0)))
+    return [f"{prefix}{i:0{width}d}" for i in range(n)]
+
+
+def ipo_lengths(
+    tickers: List[str], low: int = 5, high: int = BARS_PER_YEAR, seed: int = 0
+) -> Dict[str, int]:
+    """
+    Short, ragged history lengths like recent IPOs, shorter than the
+    52-week window.
+    """
+    return {
+        t: int(np.random.default_rng(ticker_seed(t, seed) + 3).integers(low, high))
+        for t in tickers
+    }
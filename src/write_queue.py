@@ -0,0 +1,259 @@
+# src/write_queue.py
+"""
+Single database writer for parallel runs.
+
+SQLite allows one writer at a time, so compute workers never write: they hand
+`run_ticker` results to a WriteQueue, whose one writer thread owns every
+database (and column store) write. The queue is bounded, so producers block
+in `submit` once the writer falls behind instead of piling results up in
+memory. The writer takes everything waiting (up to `batch_rows` rows) and
+commits it as one transaction; a batch that fails is retried one result per
+transaction, so a bad ticker fails alone.
+
+Two numbers size worker counts against write throughput: producer wait (time
+blocked in `submit` because the queue was full; high means the writer is the
+bottleneck) and commit latency (time per batch transaction).
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from .column_store import ColumnStore
+from .database import WriteStats, bump_versions, save_fundamentals, write_ticker_results
+from .metrics import _profiled
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the submitted results
+_STOP = object()
+
+
+@dataclass
+class WriteQueueStats:
+    batches: int = 0
+    results: int = 0
+    rows: int = 0
+    failed: int = 0
+    producer_wait_seconds: float = 0.0  # submit() blocked on a full queue
+    queued_seconds: float = 0.0  # submit to pick-up, summed over results
+    max_queued_seconds: float = 0.0
+    max_depth: int = 0
+    commit_seconds: List[float] = field(default_factory=list)  # per batch
+
+    def to_dict(self) -> Dict[str, Any]:
+        commits = sorted(self.commit_seconds)
+        total = sum(commits)
+        p95 = commits[min(int(len(commits) * 0.95), len(commits) - 1)] if commits else 0
+        return {
+            "batches": self.batches,
+            "results": self.results,
+            "rows": self.rows,
+            "failed": self.failed,
+            "rows_per_batch": round(self.rows / self.batches) if self.batches else 0,
+            "commit_seconds": round(total, 4),
+            "commit_ms_avg": round(1000 * total / len(commits), 2) if commits else 0,
+            "commit_ms_p95": round(1000 * p95, 2),
+            "commit_ms_max": round(1000 * commits[-1], 2) if commits else 0,
+            "rows_per_sec": round(self.rows / total) if total else 0,
+            "producer_wait_seconds": round(self.producer_wait_seconds, 4),
+            "queue_ms_avg": (
+                round(1000 * self.queued_seconds / self.results, 2)
+                if self.results
+                else 0
+            ),
+            "queue_ms_max": round(1000 * self.max_queued_seconds, 2),
+            "max_depth": self.max_depth,
+        }
+
+
+class WriteQueue:
+    """
+    Bounded queue of `run_ticker` results drained by one writer thread.
+    `on_saved(result, rows)` and `on_failed(result, error)` are called on the
+    writer thread after each result's transaction commits or fails. Column
+    store rows are written inside the transaction, so a failed store write rolls
+    the ticker's database rows (and fingerprints) back with it; a retried
+    result's store rows are merged again, which is idempotent. Use as a context
+    manager, or call start() and close().
+    """
+
+    def __init__(
+        self,
+        engine,
+        on_conflict: str = "ignore",
+        daily_fundamentals: bool = False,
+        store: Optional[ColumnStore] = None,
+        max_pending: int = 64,
+        batch_rows: int = 50_000,
+        on_saved: Optional[Callable[[Dict[str, Any], int], None]] = None,
+        on_failed: Optional[Callable[[Dict[str, Any], Exception], None]] = None,
+    ):
+        self.engine = engine
+        self.on_conflict = on_conflict
+        self.daily_fundamentals = daily_fundamentals
+        self.store = store
+        self.batch_rows = batch_rows
+        self.on_saved = on_saved
+        self.on_failed = on_failed
+        self.stats = WriteQueueStats()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> WriteQueue:
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="write-queue", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, result: Dict[str, Any]):
+        """
+        Queue a result for writing, blocking while the queue is full.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            raise RuntimeError("WriteQueue is not running")
+        started = time.perf_counter()
+        self._queue.put((result, time.perf_counter()))
+        self.stats.producer_wait_seconds += time.perf_counter() - started
+        self.stats.max_depth = max(self.stats.max_depth, self._queue.qsize())
+
+    def close(self):
+        """
+        Write everything still queued, then stop the writer thread.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def write_stats(self) -> WriteStats:
+        return WriteStats(self.stats.rows, sum(self.stats.commit_seconds))
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            rows = _rows(item[0])
+            # Merge whatever else is waiting into the same transaction
+            while rows < self.batch_rows:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                rows += _rows(item[0])
+            picked = time.perf_counter()
+            for _, queued_at in batch:
+                waited = picked - queued_at
+                self.stats.queued_seconds += waited
+                self.stats.max_queued_seconds = max(
+                    self.stats.max_queued_seconds, waited
+                )
+            self._write_batch([result for result, _ in batch])
+
+    def _write_batch(self, results: List[Dict[str, Any]]):
+        try:
+            written = self._commit(results)
+        except Exception as e:
+            if len(results) == 1:
+                self._failed(results[0], e)
+                return
+            logger.warning(
+                f"Batch of {len(results)} results failed ({e}); "
+                "writing them one at a time"
+            )
+            for result in results:
+                self._write_batch([result])
+            return
+        for result, rows in zip(results, written):
+            self._saved(result, rows)
+
+    def _commit(self, results: List[Dict[str, Any]]) -> List[int]:
+        # One transaction for the whole batch; timed even when it fails. The
+        # db_write profile is taken here, as cProfile only sees its own thread
+        started = time.perf_counter()
+        try:
+            with _profiled("db_write"), self.engine.begin() as conn:
+                return [self._write(conn, result) for result in results]
+        finally:
+            self.stats.commit_seconds.append(time.perf_counter() - started)
+            self.stats.batches += 1
+
+    def _write(self, conn, result: Dict[str, Any]) -> int:
+        if result["status"] == "unchanged":
+            # Only freshly fetched fundamentals, so their refresh cadence restarts
+            if result.get("fundamentals"):
+                save_fundamentals(conn, result["ticker"], result["fundamentals"])
+                bump_versions(conn, [result["ticker"]])
+            return 0
+        rows = write_ticker_results(
+            conn,
+            result["processed"],
+            result["signal_events"],
+            self.on_conflict,
+            result.get("state"),
+            result.get("fundamentals"),
+            self.daily_fundamentals,
+            result.get("fingerprints"),
+            result.get("replace_from"),
+        )
+        if self.store is not None:
+            self.store.write(
+                result["processed"],
+                "update" if result.get("replace_from") else self.on_conflict,
+                result.get("replace_from"),
+            )
+        return rows
+
+    def _saved(self, result: Dict[str, Any], rows: int):
+        try:
+            self.stats.results += 1
+            self.stats.rows += rows
+            if self.on_saved is not None:
+                self.on_saved(result, rows)
+        except Exception as e:
+            self._failed(result, e)
+
+    def _failed(self, result: Dict[str, Any], error: Exception):
+        logger.error(
+            f"Saving results failed for {result['ticker']}: {error}", exc_info=error
+        )
+        self.stats.failed += 1
+        if self.on_failed is not None:
+            try:
+                self.on_failed(result, error)
+            except Exception:
+                logger.exception("on_failed callback raised")
+
+
+def _rows(result: Dict[str, Any]) -> int:
+    processed = result.get("processed")
+    return len(processed) if processed is not None else 0
+
+
+def log_stats(stats: WriteQueueStats):
+    data = stats.to_dict()
+    logger.info(
+        f"Writer: {data['results']} result(s) in {data['batches']} transaction(s), "
+        f"commit avg {data['commit_ms_avg']}ms p95 {data['commit_ms_p95']}ms, "
+        f"producers waited {data['producer_wait_seconds']}s, "
+        f"queue latency avg {data['queue_ms_avg']}ms"
+    )
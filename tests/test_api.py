@@ -0,0 +1,129 @@
+# tests/test_api.py
+import json
+import threading
+import urllib.error
+import urllib.request
+from datetime import date
+import pytest
+from src.api import ReadAPI, ResponseCache, CachedResponse, make_server
+from src.data_fetcher import fetch_stock_data
+from src.database import init_db, save_ticker_results
+from src.models import SignalEvent
+from src.processor import process_data
+from src.synthetic import SyntheticProvider
+
+
+def processed(ticker: str, bars: int = 300):
+    return process_data(fetch_stock_data(ticker, provider=SyntheticProvider(bars=bars)))
+
+
+def body(response) -> bytes:
+    return response.body if response.body is not None else b"".join(response.chunks)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = init_db(str(tmp_path / "test.db"))
+    for ticker in ("AAA", "BBB.NS"):
+        save_ticker_results(
+            engine,
+            processed(ticker),
+            [
+                SignalEvent(
+                    ticker=ticker, signal_type="golden_crossover", date=date(2024, 6, 3)
+                )
+            ],
+        )
+    return engine
+
+
+def test_routes_cache_and_invalidation_on_write(engine):
+    api = ReadAPI(engine)
+    metrics = api.handle("/metrics/AAA?start=2024-12-01&columns=close,sma_50")
+    rows = json.loads(body(metrics))
+    assert rows[0]["date"] == "2024-12-02" and rows[-1]["date"] == "2024-12-31"
+    assert set(rows[0]) == {"date", "close", "sma_50"}
+
+    # Served from the cache until AAA is written again
+    assert body(api.handle("/metrics/AAA?start=2024-12-01&columns=close,sma_50"))
+    assert api.cache.hits == 1
+    assert api.handle("/metrics/AAA", if_none_match=metrics.etag).status == 200
+    again = api.handle("/metrics/AAA?columns=close,sma_50&start=2024-12-01")
+    assert again.etag == metrics.etag and again.body is not None
+    assert (
+        api.handle(
+            "/metrics/AAA?start=2024-12-01&columns=close,sma_50", metrics.etag
+        ).status
+        == 304
+    )
+
+    bbb = api.handle("/latest/BBB.NS")
+    assert json.loads(body(bbb))["date"] == "2024-12-31"
+    save_ticker_results(engine, processed("AAA", 301).tail(1), [], on_conflict="update")
+    fresh = api.handle("/metrics/AAA?start=2024-12-01&columns=close,sma_50")
+    assert fresh.etag != metrics.etag and fresh.body is None
+    assert api.handle("/latest/BBB.NS", bbb.etag).status == 304
+
+    signals = json.loads(body(api.handle("/signals?type=golden_crossover")))
+    assert [s["ticker"] for s in signals] == ["AAA", "BBB.NS"]
+    assert json.loads(body(api.handle("/signals/AAA?start=2024-07-01"))) == []
+    tickers = json.loads(body(api.handle("/tickers")))
+    assert [t["ticker"] for t in tickers] == ["AAA", "BBB.NS"]
+
+    assert api.handle("/latest/NOPE").status == 404
+    assert api.handle("/metrics/AAA?columns=bogus").status == 400
+    assert api.handle("/metrics/AAA?start=yesterday").status == 400
+    assert api.handle("/nothing").status == 404
+
+
+def test_cache_is_bounded_lru():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.put("a", CachedResponse(1, '"a"', b"aaaa"))
+    cache.put("b", CachedResponse(1, '"b"', b"bbbb"))
+    assert cache.get("a", 1) is not None  # b is now least recently used
+    cache.put("c", CachedResponse(1, '"c"', b"cccc"))
+    assert cache.get("b", 1) is None and len(cache) == 2
+    cache.put("d", CachedResponse(1, '"d"', b"dddddddd"))  # over max_bytes
+    assert list(cache._entries) == ["d"] and cache.bytes == 8
+    assert cache.get("d", 2) is None  # stale version
+
+
+def test_http_server_etags_and_streaming(engine, monkeypatch):
+    monkeypatch.setattr("src.api.STREAM_THRESHOLD", 1024)
+    server = make_server(engine, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/metrics/AAA") as response:
+            etag = response.headers["ETag"]
+            assert response.headers["Transfer-Encoding"] == "chunked"
+            assert len(json.loads(response.read())) == 300
+        with urllib.request.urlopen(f"{base}/latest/AAA") as response:
+            assert response.headers["Content-Length"]
+            assert json.loads(response.read())["ticker"] == "AAA"
+
+        request = urllib.request.Request(
+            f"{base}/metrics/AAA", headers={"If-None-Match": etag}
+        )
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request)
+        assert error.value.code == 304
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    urllib.request.urlopen(f"{base}/metrics/BBB.NS").status
+                )
+            )
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == [200] * 8
+    finally:
+        server.shutdown()
+        server.server_close()
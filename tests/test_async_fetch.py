@@ -0,0 +1,154 @@
+# tests/test_async_fetch.py
+import asyncio
+import threading
+import time
+import pandas as pd
+import pytest
+from src.async_fetch import AsyncFetcher, NegativeCache, TokenBucket, fetch_universe
+from src.data_fetcher import CacheMissError, SymbolNotFoundError, fetch_stock_data
+from src.providers import MarketDataProvider
+
+
+class FakeProvider(MarketDataProvider):
+    """
+    In-memory provider with per-call latency, a number of transient failures
+    per ticker, and a set of unknown (delisted) symbols.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency=0.0, failures=None, unknown=()):
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.unknown = set(unknown)
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def _enter(self, ticker):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.latency)
+            with self._lock:
+                if self.failures.get(ticker, 0) > 0:
+                    self.failures[ticker] -= 1
+                    raise ConnectionError(f"throttled: {ticker}")
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def history(self, ticker, period="5y", start=None):
+        self._enter(ticker)
+        if ticker in self.unknown:
+            return pd.DataFrame()
+        index = pd.date_range("2024-01-01", periods=5, name="Date")
+        return pd.DataFrame(
+            {"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 100},
+            index=index,
+        )
+
+    def info(self, ticker):
+        self._enter(ticker)
+        return {"sharesOutstanding": 1000}
+
+    def quarterly_balance_sheet(self, ticker):
+        self._enter(ticker)
+        return pd.DataFrame()
+
+    def balance_sheet(self, ticker):
+        self._enter(ticker)
+        return pd.DataFrame()
+
+
+async def no_sleep(_):
+    await asyncio.sleep(0)
+
+
+def test_fetch_many_respects_concurrency_cap():
+    provider = FakeProvider(latency=0.02)
+    fetcher = AsyncFetcher(provider, concurrency=3, rate_per_sec=1000)
+    tickers = [f"T{i}" for i in range(10)]
+
+    results = fetch_universe(fetcher, tickers)
+
+    assert all(len(results[t]["price_data"]) == 5 for t in tickers)
+    assert results["T0"]["fundamental_source"] == "info"
+    assert 1 < provider.max_active <= 3
+
+
+def test_transient_errors_are_retried():
+    provider = FakeProvider(failures={"FLAKY": 2})
+    fetcher = AsyncFetcher(provider, rate_per_sec=1000, max_retries=3, sleep=no_sleep)
+
+    results = fetch_universe(fetcher, ["FLAKY"])
+
+    assert len(results["FLAKY"]["price_data"]) == 5
+    assert fetcher.retries == 2
+
+
+def test_retries_exhausted_and_negative_cache(tmp_path):
+    provider = FakeProvider(failures={"DOWN": 10}, unknown={"GONE"})
+    negative = NegativeCache(str(tmp_path / "negative.json"))
+    fetcher = AsyncFetcher(
+        provider,
+        rate_per_sec=1000,
+        max_retries=1,
+        negative_cache=negative,
+        sleep=no_sleep,
+    )
+
+    results = fetch_universe(fetcher, ["DOWN", "GONE"])
+    assert isinstance(results["DOWN"], ConnectionError)
+    assert isinstance(results["GONE"], SymbolNotFoundError)
+
+    calls = provider.calls
+    again = fetch_universe(
+        AsyncFetcher(provider, negative_cache=NegativeCache(negative.path)), ["GONE"]
+    )
+    assert isinstance(again["GONE"], SymbolNotFoundError)
+    assert provider.calls == calls  # served from the negative cache
+
+
+def test_token_bucket_limits_rate():
+    now = [0.0]
+    waits = []
+
+    async def fake_sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    async def run():
+        bucket = TokenBucket(rate=2, capacity=1, clock=lambda: now[0], sleep=fake_sleep)
+        for _ in range(3):
+            await bucket.acquire()
+
+    asyncio.run(run())
+    assert sum(waits) == pytest.approx(1.0)
+
+
+def test_fundamental_errors_match_the_sync_fetch():
+    class FailingProvider(FakeProvider):
+        def info(self, ticker):
+            if ticker == "NOINFO":
+                raise ValueError("bad info response")
+            return super().info(ticker)
+
+        def quarterly_balance_sheet(self, ticker):
+            if ticker == "MISS":
+                raise CacheMissError(f"{ticker} is not cached (offline mode)")
+            raise ConnectionError("balance sheet unavailable")
+
+    provider = FailingProvider()
+    fetcher = AsyncFetcher(provider, rate_per_sec=1000, max_retries=0)
+    results = fetch_universe(fetcher, ["OK", "NOINFO", "MISS"])
+
+    assert results["OK"]["fundamental_source"] == "info"
+    assert fetch_stock_data("OK", provider=provider)["fundamental_source"] == "info"
+    for ticker, error in (("NOINFO", ValueError), ("MISS", CacheMissError)):
+        assert isinstance(results[ticker], error)
+        with pytest.raises(error):
+            fetch_stock_data(ticker, provider=provider)
@@ -0,0 +1,85 @@
+# tests/test_backtest.py
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+from src.backtest import load_close_panel, run_backtest, summarize
+from src.column_store import rebuild_column_store
+from src.database import init_db, save_ticker_results
+from src.models import SignalEvent
+from src.processor import METRIC_COLUMNS
+
+CLOSES = [100.0, 110.0, 90.0, 120.0, 130.0, 80.0]
+
+
+def make_metrics(ticker: str, closes) -> pd.DataFrame:
+    df = pd.DataFrame(np.nan, index=range(len(closes)), columns=METRIC_COLUMNS)
+    df["ticker"] = ticker
+    df["date"] = [d.date() for d in pd.bdate_range("2024-01-01", periods=len(closes))]
+    df["close"] = closes
+    df["volume"] = 1000
+    return df
+
+
+def event(ticker: str, signal_type: str, day: int) -> SignalEvent:
+    return SignalEvent(ticker=ticker, signal_type=signal_type, date=date(2024, 1, day))
+
+
+@pytest.mark.parametrize("schema", ["numeric", "compact"])
+def test_forward_returns_hit_rates_and_drawdowns(tmp_path, schema):
+    engine = init_db(str(tmp_path / "test.db"), schema=schema)
+    save_ticker_results(
+        engine,
+        make_metrics("AAA", CLOSES),
+        [event("AAA", "golden_crossover", 1), event("AAA", "death_cross", 3)],
+    )
+    save_ticker_results(
+        engine,
+        make_metrics("BBB.NS", [50.0, 40.0, 60.0]),
+        [event("BBB.NS", "golden_crossover", 1)],
+    )
+
+    returns = run_backtest(engine, horizons=[2, 3]).set_index(["ticker", "signal_type"])
+    bull = returns.loc[("AAA", "golden_crossover")]
+    assert bull["ret_2"] == pytest.approx(-0.1)  # 100 -> 90
+    assert bull["dd_2"] == pytest.approx(-0.1)
+    assert bull["ret_3"] == pytest.approx(0.2)
+    # Bearish: entry 90, rises to 130 before falling to 80
+    bear = returns.loc[("AAA", "death_cross")]
+    assert bear["ret_2"] == pytest.approx(130 / 90 - 1)
+    assert bear["dd_2"] == pytest.approx(-(130 / 90 - 1))
+    assert bear["ret_3"] == pytest.approx(80 / 90 - 1)
+    # Only two bars follow BBB.NS's event
+    ns = returns.loc[("BBB.NS", "golden_crossover")]
+    assert ns["market"] == "NS" and ns["ret_2"] == pytest.approx(0.2)
+    assert np.isnan(ns["ret_3"]) and np.isnan(ns["dd_3"])
+
+    summary = summarize(returns.reset_index(), [2, 3], bearish=["death_cross"])
+    rows = summary.set_index(["signal_type", "market", "horizon"])
+    assert rows.loc[("golden_crossover", "US", 2), "hit_rate"] == 0.0
+    assert rows.loc[("golden_crossover", "NS", 2), "hit_rate"] == 1.0
+    assert rows.loc[("death_cross", "US", 2), "hit_rate"] == 0.0
+    assert rows.loc[("death_cross", "US", 3), "hit_rate"] == 1.0
+    assert ("golden_crossover", "NS", 3) not in rows.index
+
+
+def test_chunks_in_worker_processes_and_column_store_match(tmp_path):
+    engine = init_db(str(tmp_path / "test.db"))
+    rng = np.random.default_rng(0)
+    for i in range(6):
+        ticker = f"T{i}.NS" if i % 2 else f"T{i}"
+        closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 40)))
+        events = [event(ticker, "golden_crossover", day) for day in (2, 9, 16)]
+        save_ticker_results(engine, make_metrics(ticker, closes), events)
+
+    expected = run_backtest(engine, horizons=[5, 20])
+    assert len(expected) == 18
+    parallel = run_backtest(engine, horizons=[5, 20], workers=2, chunk_size=2)
+    pd.testing.assert_frame_equal(parallel, expected)
+
+    store = rebuild_column_store(engine, str(tmp_path / "store"))
+    pd.testing.assert_frame_equal(
+        run_backtest(engine, horizons=[5, 20], store=store), expected
+    )
+    panel = load_close_panel(engine, ["T0", "T1.NS", "MISSING"])
+    assert panel.tickers == ["T0", "T1.NS"] and list(panel.offsets) == [0, 40, 80]
@@ -0,0 +1,55 @@
+# tests/test_cli.py
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cold-start import budgets (cumulative import time of our own modules)
+HELP_BUDGET_MS = 150
+SCREEN_BUDGET_MS = 3000
+
+HEAVY = {"pandas", "numpy", "sqlalchemy", "pydantic", "yfinance"}
+FETCH_STACK = {"yfinance", "src.data_fetcher", "src.async_fetch", "src.pipeline"}
+
+
+def import_times(*args: str) -> Tuple[Dict[str, int], Set[str]]:
+    """
+    Run Python with -X importtime. Returns {module: cumulative microseconds} for
+    the top-level imports (nested ones are folded into their parent) and the
+    names of every module imported.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match:
+            times[match.group(3)] = (int(match.group(1)), len(match.group(2)))
+    return {name: us for name, (us, depth) in times.items() if depth == 0}, set(times)
+
+
+def own_import_ms(top_level: Dict[str, int]) -> float:
+    return (
+        sum(us for name, us in top_level.items() if name.split(".")[0] == "src") / 1000
+    )
+
+
+def test_help_skips_heavy_imports():
+    top_level, modules = import_times("-m", "src.main", "--help")
+    assert not modules & HEAVY
+    assert "src.pipeline" not in modules
+    assert own_import_ms(top_level) < HELP_BUDGET_MS
+
+
+def test_screen_imports_skip_the_fetch_stack():
+    top_level, modules = import_times("-c", "import src.main, src.screener")
+    assert not modules & FETCH_STACK
+    assert own_import_ms(top_level) < SCREEN_BUDGET_MS
@@ -0,0 +1,111 @@
+# tests/test_column_store.py
+import numpy as np
+import pandas as pd
+from src.column_store import ColumnStore, rebuild_column_store
+from src.database import init_db, load_price_history, save_ticker_results
+from src.processor import process_data
+from src.signals import DEFAULT_RULES, evaluate_rules
+from src.synthetic import SyntheticProvider
+from src.data_fetcher import fetch_stock_data
+
+
+def processed(ticker: str, bars: int = 400) -> pd.DataFrame:
+    return process_data(fetch_stock_data(ticker, provider=SyntheticProvider(bars=bars)))
+
+
+def test_views_are_zero_copy_and_feed_processor_and_signals(tmp_path):
+    metrics = {t: processed(t) for t in ("AAA", "BBB")}
+    store = ColumnStore(str(tmp_path / "store"))
+    for df in metrics.values():
+        store.write(df)
+    store.flush()
+
+    store = ColumnStore(str(tmp_path / "store"))
+    assert store.tickers() == ["AAA", "BBB"] and store.rows == 800
+    close = store.columns("BBB")["close"]
+    assert np.shares_memory(close, store.column("close"))
+    assert np.array_equal(close, metrics["BBB"]["close"].to_numpy())
+
+    series = store.price_series("AAA")
+    assert series.dates[-1] == np.datetime64("2024-12-31")
+    recomputed = process_data(
+        {"ticker": "AAA", "price_data": series, "fundamental_data": []}
+    )
+    pd.testing.assert_series_equal(recomputed["sma_200"], metrics["AAA"]["sma_200"])
+
+    events = evaluate_rules(store.frame("AAA"), DEFAULT_RULES, "AAA")
+    expected = evaluate_rules(metrics["AAA"], DEFAULT_RULES, "AAA")
+    assert list(events["date"].astype(str)) == list(expected["date"].astype(str))
+    assert len(store.price_series("AAA", limit=252)) == 252
+
+
+def test_appends_relocation_and_compaction(tmp_path):
+    full = processed("AAA")
+    store = ColumnStore(str(tmp_path / "store"))
+    store.write(full.iloc[:300])
+    store.write(full.iloc[300:350])  # segment is last: extended in place
+    assert store.index["AAA"] == (0, 350) and store.dead == 0
+
+    store.write(processed("BBB"))
+    store.write(full.iloc[340:])  # overlaps and is no longer last: relocated
+    assert store.index["AAA"] == (750, 400) and store.dead == 350
+    assert np.array_equal(store.columns("AAA")["close"], full["close"].to_numpy())
+
+    store.close()  # dead rows past the threshold: compacted
+    store = ColumnStore(str(tmp_path / "store"))
+    assert store.rows == 800 and store.dead == 0
+    assert store.index == {"AAA": (0, 400), "BBB": (400, 400)}
+    assert np.array_equal(store.columns("AAA")["close"], full["close"].to_numpy())
+
+
+def test_rewrites_stay_in_place_and_replace_from_truncates(tmp_path):
+    full = processed("AAA")
+    store = ColumnStore(str(tmp_path / "store"))
+    bbb = processed("BBB")
+    store.write(full.iloc[:390])
+    store.write(bbb.iloc[:395])
+
+    # A full re-run of the same dates fits the segment: overwritten in place
+    assert store.write(full.iloc[:390], "update") == 390
+    assert store.index["AAA"] == (0, 390) and store.rows == 785
+    assert store.dead == 0
+
+    # Restated from a date, with the history now ending earlier
+    restated = full.iloc[350:380].assign(close=1.0)
+    store.write(restated, "update", replace_from=restated["date"].iloc[0])
+    assert store.index["AAA"] == (0, 380) and store.dead == 10
+    close = store.columns("AAA")["close"]
+    assert np.array_equal(close[:350], full["close"].iloc[:350].to_numpy())
+    assert (close[350:] == 1.0).all()
+
+    # The last segment grows into appended rows instead of moving
+    store.write(bbb.iloc[390:], "update", replace_from=bbb["date"].iloc[390])
+    assert store.index["BBB"] == (390, 400) and store.rows == 790
+    assert np.array_equal(store.columns("BBB")["date"], bbb["date"].to_numpy())
+
+
+def test_unflushed_rows_are_discarded(tmp_path):
+    store = ColumnStore(str(tmp_path / "store"))
+    store.write(processed("AAA", 100))
+    store.flush()
+    store.write(processed("BBB", 100))  # never flushed
+
+    store = ColumnStore(str(tmp_path / "store"))
+    assert store.tickers() == ["AAA"]
+    store.write(processed("CCC", 100))
+    store.flush()
+    assert ColumnStore(str(tmp_path / "store")).index["CCC"] == (100, 100)
+    assert (tmp_path / "store" / "close.bin").stat().st_size == 200 * 8
+
+
+def test_rebuild_from_database(tmp_path):
+    engine = init_db(str(tmp_path / "test.db"), schema="compact")
+    for ticker in ("AAA", "BBB"):
+        save_ticker_results(engine, processed(ticker), [])
+
+    store = rebuild_column_store(engine, str(tmp_path / "store"))
+    assert store.tickers() == ["AAA", "BBB"]
+    from_db = load_price_history(engine, "BBB")
+    from_store = store.price_series("BBB")
+    assert np.array_equal(from_store.dates, from_db.dates)
+    assert np.array_equal(from_store.close, from_db.close)
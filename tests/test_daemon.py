@@ -0,0 +1,120 @@
+# tests/test_daemon.py
+import json
+from datetime import date, datetime, timedelta, timezone
+import pandas as pd
+from sqlalchemy import text
+from src.daemon import DEFAULT_EXCHANGES, Daemon, Exchange, SimulatedClock
+from src.database import init_db
+from src.synthetic import SyntheticProvider
+
+EXCHANGES = [Exchange.from_config(name, s) for name, s in DEFAULT_EXCHANGES.items()]
+US, NSE = EXCHANGES
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class ClockedProvider(SyntheticProvider):
+    """
+    Synthetic bars up to the simulated clock's date (a market that moves on).
+    """
+
+    def __init__(self, clock: SimulatedClock):
+        super().__init__(bars=600, end="2025-03-31")
+        self.clock = clock
+        self.starts = []
+
+    def history(self, ticker, period="5y", start=None):
+        self.starts.append((ticker, start))
+        hist = super().history(ticker, period, start)
+        return hist[hist.index.date <= self.clock.now().date()]
+
+
+def test_windows_follow_each_exchange_close():
+    # Monday 6 Jan 2025: NSE closes 10:00 UTC, New York 21:00 UTC (EST)
+    assert NSE.window_after(utc(2025, 1, 6)) == (
+        utc(2025, 1, 6, 10, 30),
+        utc(2025, 1, 6, 12, 30),
+    )
+    assert US.window_after(utc(2025, 1, 6)) == (
+        utc(2025, 1, 6, 21, 30),
+        utc(2025, 1, 6, 23, 30),
+    )
+    # Inside a window the rest of it is used; after Friday's comes Monday's
+    assert US.window_after(utc(2025, 1, 10, 22)) == (
+        utc(2025, 1, 10, 22),
+        utc(2025, 1, 10, 23, 30),
+    )
+    assert US.window_after(utc(2025, 1, 10, 23, 30))[0] == utc(2025, 1, 13, 21, 30)
+    # Daylight saving time: 16:30 in New York is 20:30 UTC in July
+    assert US.window_after(utc(2025, 7, 7))[0] == utc(2025, 7, 7, 20, 30)
+
+
+def test_refreshes_spread_over_windows_with_warm_state(tmp_path):
+    clock = SimulatedClock(utc(2025, 1, 6))
+    provider = ClockedProvider(clock)
+    engine = init_db(str(tmp_path / "test.db"))
+    status_path = tmp_path / "status.json"
+    tickers = ["AAA", "BBB", "CCC.NS", "DDD.NS"]
+    daemon = Daemon(
+        engine, tickers, provider, EXCHANGES, clock=clock, status_path=str(status_path)
+    )
+
+    assert daemon.run(until=utc(2025, 1, 7)) == 4
+    status = json.loads(status_path.read_text())
+    assert status["state"] == "stopped" and status["queue_depth"] == 0
+    assert status["refreshed"] == 4 and status["failed"] == 0
+    # Two tickers per exchange: at the start and the middle of each window
+    assert {t: s["last_success"] for t, s in status["tickers"].items()} == {
+        "CCC.NS": "2025-01-06T10:30:00+00:00",
+        "DDD.NS": "2025-01-06T11:30:00+00:00",
+        "AAA": "2025-01-06T21:30:00+00:00",
+        "BBB": "2025-01-06T22:30:00+00:00",
+    }
+    assert status["tickers"]["AAA"]["next_run"] == "2025-01-07T21:30:00+00:00"
+    assert max(clock.sleeps) <= 60
+
+    # The next day only the new bar is fetched and applied to the kept state
+    state = daemon.states["AAA"]
+    assert daemon.run(until=utc(2025, 1, 8)) == 4
+    assert daemon.states["AAA"] is state
+    assert str(state.last_date) == "2025-01-07"
+    assert provider.starts[-1] == ("BBB", date(2025, 1, 7))
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT COUNT(*), MAX(date) FROM daily_metrics WHERE ticker = 'AAA'")
+        ).one()
+    assert tuple(rows) == (
+        len(
+            SyntheticProvider(bars=600, end="2025-03-31").history("AAA")[:"2025-01-07"]
+        ),
+        "2025-01-07",
+    )
+
+    # A restarted daemon keeps the last-success times
+    clock.current += timedelta(hours=1)
+    restarted = Daemon(
+        engine, tickers, provider, EXCHANGES, clock=clock, status_path=str(status_path)
+    )
+    assert restarted.status["AAA"]["last_success"] == "2025-01-07T21:30:00+00:00"
+
+
+def test_failed_refresh_is_recorded_and_retried_next_window(tmp_path):
+    clock = SimulatedClock(utc(2025, 1, 6))
+    engine = init_db(str(tmp_path / "test.db"))
+    daemon = Daemon(
+        engine,
+        ["AAA", "NOPE"],
+        ClockedProvider(clock),
+        EXCHANGES,
+        clock=clock,
+        status_path=str(tmp_path / "status.json"),
+    )
+    daemon.provider.history = lambda ticker, *a, **k: pd.DataFrame()
+    assert daemon.run(max_refreshes=2) == 2
+    status = json.loads((tmp_path / "status.json").read_text())
+    assert status["failed"] == 2
+    assert status["tickers"]["NOPE"]["last_error"].startswith("SymbolNotFoundError")
+    assert status["tickers"]["NOPE"]["last_success"] is None
+    assert status["tickers"]["NOPE"]["next_run"].startswith("2025-01-07")
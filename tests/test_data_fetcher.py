@@ -0,0 +1,105 @@
+# tests/test_data_fetcher.py
+import os
+import time
+import pandas as pd
+import pytest
+from src.data_fetcher import (
+    CachedProvider,
+    CacheMissError,
+    ResponseCache,
+    fetch_stock_data,
+)
+from src.providers import MarketDataProvider
+
+
+class CountingProvider(MarketDataProvider):
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def history(self, ticker, period="5y", start=None):
+        self.calls += 1
+        return pd.DataFrame({"Close": [1.0, 2.0]})
+
+    def info(self, ticker):
+        self.calls += 1
+        return {"sharesOutstanding": 10}
+
+    def quarterly_balance_sheet(self, ticker):
+        return pd.DataFrame()
+
+    def balance_sheet(self, ticker):
+        return pd.DataFrame()
+
+
+def test_cache_serves_repeated_requests(tmp_path):
+    source = CountingProvider()
+    provider = CachedProvider(source, ResponseCache(str(tmp_path)))
+
+    provider.history("AAPL")
+    provider.history("AAPL")
+    provider.info("AAPL")
+    provider.info("AAPL")
+    assert source.calls == 2
+    assert provider.cache.hits == 2
+
+    provider.history("AAPL", period="1y")
+    assert source.calls == 3
+
+
+def test_cache_ttl_and_offline_mode(tmp_path):
+    source = CountingProvider()
+    cache = ResponseCache(str(tmp_path), prices_ttl_hours=0)
+    CachedProvider(source, cache).history("AAPL")
+    CachedProvider(source, cache).history("AAPL")
+    assert source.calls == 2  # expired immediately
+
+    offline = CachedProvider(
+        source, ResponseCache(str(tmp_path), prices_ttl_hours=0, offline=True)
+    )
+    assert list(offline.history("AAPL")["Close"]) == [1.0, 2.0]
+    with pytest.raises(CacheMissError):
+        offline.info("MSFT")
+    assert source.calls == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_size_mb=1)
+    payload = b"x" * 400_000
+    cache.put("A/history/", payload)
+    cache.put("B/history/", payload)
+    old = time.time() - 100
+    os.utime(cache._file("A/history/"), (old, old))
+    cache.get("A/history/", "history")  # touch A so B becomes the LRU entry
+    cache.put("C/history/", payload)
+
+    assert cache.get("A/history/", "history") == payload
+    assert cache.get("B/history/", "history") is None
+    assert cache.get("C/history/", "history") == payload
+
+
+def test_cache_size_counts_a_refreshed_entry_once(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("A/history/", b"x" * 1000)
+    cache.put("A/history/", b"x" * 1000)
+    assert cache._size == cache._file("A/history/").stat().st_size
+
+
+def test_offline_balance_sheet_miss_is_not_a_fallback(tmp_path):
+    class DatedProvider(CountingProvider):
+        def history(self, ticker, period="5y", start=None):
+            index = pd.date_range("2024-01-01", periods=2)
+            prices = {c: [1.0, 2.0] for c in ("Open", "High", "Low", "Close")}
+            return pd.DataFrame({**prices, "Volume": [10, 10]}, index=index)
+
+    cache = ResponseCache(str(tmp_path))
+    online = CachedProvider(DatedProvider(), cache)
+    online.history("AAPL")
+    online.info("AAPL")
+
+    offline = CachedProvider(
+        DatedProvider(), ResponseCache(str(tmp_path), offline=True)
+    )
+    with pytest.raises(CacheMissError):
+        fetch_stock_data("AAPL", provider=offline)
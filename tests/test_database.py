@@ -0,0 +1,214 @@
+# tests/test_database.py
+import sqlite3
+import numpy as np
+import pandas as pd
+from datetime import date
+from sqlalchemy import text
+from src import database
+from src.database import (
+    SQLITE_MAX_VARIABLES,
+    get_last_dates,
+    init_db,
+    load_fundamentals,
+    load_metrics,
+    load_price_history,
+    migrate_daily_metrics,
+    rebuild_latest_snapshot,
+    save_ticker_results,
+)
+from src.data_fetcher import fetch_stock_data
+from src.models import SignalEvent
+from src.processor import METRIC_COLUMNS, process_data
+from src.synthetic import SyntheticProvider
+
+
+def make_metrics(n: int, close: float = 100.0) -> pd.DataFrame:
+    df = pd.DataFrame(np.nan, index=range(n), columns=METRIC_COLUMNS)
+    df["ticker"] = "TEST"
+    df["date"] = [d.date() for d in pd.bdate_range("2000-01-03", periods=n)]
+    df["close"] = close
+    df["volume"] = 1000
+    return df
+
+
+def test_bulk_write_long_history_in_one_call(tmp_path):
+    engine = init_db(str(tmp_path / "test.db"))
+    events = [
+        SignalEvent(
+            ticker="TEST", signal_type="golden_crossover", date=date(2000, 3, 1)
+        )
+    ]
+
+    # 5,000 rows x 14 columns is far past the old single-statement variable limit
+    stats = save_ticker_results(engine, make_metrics(5000), events)
+
+    assert stats.rows == 5001
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM daily_metrics")).scalar() == 5000
+        assert conn.execute(text("SELECT COUNT(*) FROM signal_events")).scalar() == 1
+        assert (
+            conn.execute(text("SELECT sma_50 FROM daily_metrics LIMIT 1")).scalar()
+            is None
+        )
+
+
+def test_in_lists_are_chunked_under_the_sqlite_variable_limit(tmp_path, monkeypatch):
+    conn = sqlite3.connect(":memory:")
+    assert SQLITE_MAX_VARIABLES <= conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+
+    engine = init_db(str(tmp_path / "test.db"))
+    for i, ticker in enumerate(["AAA", "BBB", "CCC"]):
+        metrics = make_metrics(5 + i)
+        metrics["ticker"] = ticker
+        save_ticker_results(engine, metrics, [])
+    monkeypatch.setattr(database, "SQLITE_MAX_VARIABLES", 2)
+    last = get_last_dates(engine, ["AAA", "BBB", "CCC", "ZZZ"])
+    assert last == {
+        "AAA": date(2000, 1, 7),
+        "BBB": date(2000, 1, 10),
+        "CCC": date(2000, 1, 11),
+    }
+
+
+def test_on_conflict_ignore_and_update(tmp_path):
+    engine = init_db(str(tmp_path / "test.db"))
+    save_ticker_results(engine, make_metrics(10, close=100.0), [])
+
+    save_ticker_results(engine, make_metrics(10, close=50.0), [], on_conflict="ignore")
+    with engine.connect() as conn:
+        assert (
+            conn.execute(text("SELECT MAX(close) FROM daily_metrics")).scalar() == 100
+        )
+
+    save_ticker_results(engine, make_metrics(10, close=50.0), [], on_conflict="update")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT MAX(close) FROM daily_metrics")).scalar() == 50
+        assert conn.execute(text("SELECT COUNT(*) FROM daily_metrics")).scalar() == 10
+
+
+def test_pragmas_applied(tmp_path):
+    engine = init_db(
+        str(tmp_path / "test.db"), {"journal_mode": "WAL", "synchronous": "NORMAL"}
+    )
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+
+
+def test_legacy_signal_events_key_migrated(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    engine = init_db(db_path)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE signal_events"))
+        conn.execute(
+            text(
+                "CREATE TABLE signal_events (ticker VARCHAR, date DATE, "
+                "signal_type VARCHAR, PRIMARY KEY (ticker, date))"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO signal_events VALUES ('TEST', '2000-03-01', 'death_cross')"
+            )
+        )
+    engine.dispose()
+
+    engine = init_db(db_path)
+    events = [
+        SignalEvent(ticker="TEST", signal_type="new_52w_high", date=date(2000, 3, 1))
+    ]
+    save_ticker_results(engine, pd.DataFrame(), events, on_conflict="update")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM signal_events")).scalar() == 2
+
+
+def test_compact_schema_round_trip_and_migration(tmp_path):
+    metrics = make_metrics(300, close=123.456789)
+    metrics.loc[5, "close"] = np.nan
+    metrics["sma_50"] = 120.5
+    metrics["pct_from_52w_high"] = -1.25
+
+    numeric = init_db(str(tmp_path / "numeric.db"))
+    save_ticker_results(numeric, metrics, [])
+    compact = init_db(str(tmp_path / "compact.db"), schema="compact")
+    save_ticker_results(compact, metrics, [])
+
+    with compact.connect() as conn:
+        ddl = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE name = 'daily_metrics'")
+        ).scalar()
+        assert "WITHOUT ROWID" in ddl
+        row = conn.execute(
+            text(
+                "SELECT typeof(date), typeof(close), close, typeof(sma_200) "
+                "FROM daily_metrics LIMIT 1"
+            )
+        ).one()
+        assert row == ("integer", "integer", 123456789, "null")
+
+    for engine in (numeric, compact):
+        assert get_last_dates(engine, ["TEST"]) == {"TEST": metrics["date"].iloc[-1]}
+        history = load_price_history(engine, "TEST", limit=250)
+        assert len(history) == 250
+        assert history.dates[-1] == np.datetime64(metrics["date"].iloc[-1])
+        assert history.close[-1] == 123.456789
+    assert np.isnan(load_price_history(compact, "TEST").close[5])
+
+    assert migrate_daily_metrics(numeric, "compact") == 300
+    assert migrate_daily_metrics(numeric, "compact") == 0
+    assert rebuild_latest_snapshot(numeric) == 1
+    with numeric.connect() as conn:
+        latest = conn.execute(
+            text("SELECT date, close, sma_50, pct_from_52w_high FROM latest_metrics")
+        ).one()
+        assert latest == (
+            metrics["date"].iloc[-1].isoformat(),
+            123.456789,
+            120.5,
+            -1.25,
+        )
+
+    # Back to numeric: the same rows as a database that was never migrated
+    migrate_daily_metrics(numeric, "numeric")
+    fresh = init_db(str(tmp_path / "fresh.db"))
+    save_ticker_results(fresh, metrics, [])
+    query = text("SELECT * FROM daily_metrics ORDER BY date")
+    with numeric.connect() as conn, fresh.connect() as other:
+        assert conn.execute(query).fetchall() == other.execute(query).fetchall()
+
+
+def test_fundamentals_stored_per_report_and_joined_on_read(tmp_path):
+    raw = fetch_stock_data("FUND", provider=SyntheticProvider(bars=300))
+    metrics = process_data(raw)
+    engine = init_db(str(tmp_path / "test.db"))
+    save_ticker_results(
+        engine,
+        metrics,
+        [],
+        fundamentals=raw["fundamental_data"],
+        fundamental_columns=False,
+    )
+
+    fetched_on, records = load_fundamentals(engine, ["FUND", "OTHER"])["FUND"]
+    assert fetched_on == date.today()
+    assert len(records) == len(raw["fundamental_data"])
+    assert {r.Source for r in records} == {"quarterly", "info"}
+
+    with engine.connect() as conn:
+        stored = conn.execute(
+            text("SELECT COUNT(book_value_per_share) FROM daily_metrics")
+        ).scalar()
+        assert stored == 0
+    columns = ["book_value_per_share", "price_to_book", "enterprise_value"]
+    pd.testing.assert_frame_equal(
+        load_metrics(engine, "FUND")[columns], metrics[columns], atol=1e-6
+    )
+
+    # latest_metrics carries the values whether written directly or rebuilt
+    for _ in range(2):
+        with engine.connect() as conn:
+            latest = conn.execute(
+                text(f"SELECT {', '.join(columns)} FROM latest_metrics")
+            ).one()
+        assert np.allclose(latest, metrics[columns].iloc[-1].to_numpy())
+        rebuild_latest_snapshot(engine)
@@ -0,0 +1,56 @@
+# tests/test_fingerprint.py
+import numpy as np
+from datetime import date
+from src.data_fetcher import fetch_stock_data
+from src.fingerprint import fingerprint_raw, first_changed
+from src.models import RawFundamentalData
+from src.pipeline import run_ticker
+from src.signals import DEFAULT_RULES
+from src.synthetic import SyntheticProvider
+
+
+def test_first_changed_locates_the_earliest_difference():
+    raw = fetch_stock_data("FP", provider=SyntheticProvider(bars=300))
+    stored = fingerprint_raw(raw, DEFAULT_RULES)
+    assert first_changed(stored, fingerprint_raw(raw, DEFAULT_RULES)) is None
+    assert first_changed({}, stored) == date.min
+    assert first_changed(stored, fingerprint_raw(raw, DEFAULT_RULES[:1])) == date.min
+
+    # A restated bar changes its month only
+    series = raw["price_data"]
+    series.close[200] *= 0.5
+    month_start = series.dates[200].astype("datetime64[M]").astype(object)
+    assert first_changed(stored, fingerprint_raw(raw, DEFAULT_RULES)) == month_start
+
+    # A new report changes from its date
+    raw["fundamental_data"].append(
+        RawFundamentalData(
+            Date=date(2024, 12, 31), ShareholderEquity=1, Source="annual"
+        )
+    )
+    assert first_changed(stored, fingerprint_raw(raw, DEFAULT_RULES)) == month_start
+    series.close[200] *= 2
+    assert first_changed(stored, fingerprint_raw(raw, DEFAULT_RULES)) == date(
+        2024, 12, 31
+    )
+
+
+def test_rolling_window_only_changes_the_new_bars():
+    raw = fetch_stock_data("FP", provider=SyntheticProvider(bars=1261))
+    series = raw["price_data"]
+    old = {**raw, "price_data": series.take(np.arange(1260))}
+    new = {**raw, "price_data": series.take(np.arange(1, 1261))}
+    stored = fingerprint_raw(old, DEFAULT_RULES)
+
+    # The window moved forward a bar: the oldest bar dropped out, one was added
+    last = series.dates[-1].astype(object)
+    assert first_changed(stored, fingerprint_raw(new, DEFAULT_RULES)) == last
+    result = run_ticker("FP", raw=new, fingerprints=stored)
+    assert result["replace_from"] == last
+    assert list(result["processed"]["date"]) == [last]
+
+    # A restatement inside the overlap is still found
+    restated = new["price_data"]
+    restated.close[600] *= 0.5
+    month_start = restated.dates[600].astype("datetime64[M]").astype(object)
+    assert first_changed(stored, fingerprint_raw(new, DEFAULT_RULES)) == month_start
@@ -0,0 +1,219 @@
+# tests/test_indicators.py
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from src.data_fetcher import fetch_stock_data
+from src.database import (
+    init_db,
+    load_indicator_states,
+    load_metrics,
+    migrate_daily_metrics,
+    save_ticker_results,
+)
+from src.indicators import WARMUP_BARS, IndicatorSpec, load_indicators, warmup_bars
+from src.online import IndicatorState
+from src.panel import process_panel
+from src.pipeline import run_ticker, stored_history
+from src.processor import process_data
+from src.screener import screen
+from src.signals import SignalRule, load_rules
+from src.synthetic import SyntheticProvider
+
+CONFIG = {
+    "indicators": [
+        {"name": "ema_20", "type": "ema", "window": 20},
+        {"name": "rsi_14", "type": "rsi", "window": 14},
+        {"name": "atr_14", "type": "atr", "window": 14},
+        {"name": "bb_upper_20", "type": "bollinger_upper", "window": 20},
+        {"name": "bb_lower_20", "type": "bollinger_lower", "window": 20},
+        {"name": "volume_sma_20", "type": "sma", "window": 20, "source": "volume"},
+        {"name": "high_10", "type": "max", "window": 10, "source": "high"},
+    ]
+}
+SPECS = load_indicators(CONFIG)
+NAMES = [spec.name for spec in SPECS]
+
+
+def fetch(ticker: str, bars: int = 400) -> dict:
+    return fetch_stock_data(ticker, provider=SyntheticProvider(bars=bars))
+
+
+def test_indicators_match_their_definitions():
+    processed = process_data(fetch("AAA"), SPECS)
+    close, high, low = processed["close"], processed["high"], processed["low"]
+    assert list(processed.columns[-len(NAMES) :]) == NAMES
+
+    ema = close.ewm(span=20, adjust=False).mean()
+    np.testing.assert_allclose(processed["ema_20"], ema, atol=1e-6)
+    mean = close.rolling(20, min_periods=1).mean()
+    std = close.rolling(20, min_periods=1).std(ddof=0)
+    np.testing.assert_allclose(processed["bb_upper_20"], mean + 2 * std, atol=1e-6)
+    np.testing.assert_allclose(processed["bb_lower_20"], mean - 2 * std, atol=1e-6)
+    volume = processed["volume"].astype(float).rolling(20, min_periods=1).mean()
+    np.testing.assert_allclose(processed["volume_sma_20"], volume, atol=1e-6)
+    np.testing.assert_allclose(
+        processed["high_10"], high.rolling(10, min_periods=1).max(), rtol=0
+    )
+
+    change = close.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    rsi = processed["rsi_14"]
+    assert np.isnan(rsi.iloc[0])
+    np.testing.assert_allclose(rsi[1:], (100 * gain / (gain + loss))[1:], atol=1e-6)
+    assert rsi[1:].between(0, 100).all()
+
+    true_range = pd.concat(
+        [high - low, (high - close.shift()).abs(), (low - close.shift()).abs()],
+        axis=1,
+    ).max(axis=1)
+    atr = true_range.ewm(alpha=1 / 14, adjust=False).mean()
+    np.testing.assert_allclose(processed["atr_14"], atr, atol=1e-6)
+
+
+def test_panel_and_online_match_single_ticker_processing():
+    raws = {t: fetch(t, bars) for t, bars in (("AAA", 400), ("BBB", 150))}
+    panel = process_panel(raws, SPECS)
+    for ticker, raw in raws.items():
+        expected = process_data(raw, SPECS)
+        pd.testing.assert_frame_equal(panel[ticker], expected, atol=1e-6)
+
+    raw = raws["AAA"]
+    expected = process_data(raw, SPECS)
+    head = raw["price_data"].take(np.arange(300))
+    state = IndicatorState.from_history(
+        "AAA", head, expected.iloc[299].to_dict(), raw["fundamental_data"], SPECS
+    )
+    metrics, _ = state.advance(raw)
+    assert len(metrics) == 100
+    pd.testing.assert_frame_equal(
+        metrics, expected.iloc[300:].reset_index(drop=True), rtol=1e-7
+    )
+
+
+def test_validation_and_unconsumed_indicators_are_skipped():
+    config = {
+        "indicators": [
+            {"name": "rsi_14", "type": "rsi", "window": 14, "store": False},
+            {"name": "ema_5", "type": "ema", "window": 5, "store": False},
+        ],
+        "signals": {
+            "rules": [
+                {
+                    "name": "oversold",
+                    "type": "threshold",
+                    "column": "rsi_14",
+                    "level": 30,
+                    "direction": "below",
+                }
+            ]
+        },
+    }
+    specs = load_indicators(config, load_rules(config))
+    assert [spec.name for spec in specs] == ["rsi_14"]
+
+    for bad in (
+        {"name": "sma_50", "type": "sma", "window": 50},
+        {"name": "x", "type": "median", "window": 5},
+        {"name": "x", "type": "sma", "window": 500},
+        {"name": "x", "type": "sma", "window": 5, "source": "vwap"},
+        {"name": "x", "type": "sma", "window": 5, "alpha": 1},
+    ):
+        with pytest.raises(ValueError):
+            load_indicators({"indicators": [bad]})
+
+
+def test_rule_only_indicator_fires_signals_but_is_not_stored(tmp_path):
+    spec = IndicatorSpec("rsi_14", "rsi", 14, store=False)
+    rule = SignalRule(
+        "oversold", "threshold", column="rsi_14", level=40, direction="below"
+    )
+    result = run_ticker(
+        "AAA",
+        provider=SyntheticProvider(bars=400),
+        rules=[rule],
+        indicators=[spec],
+    )
+    assert "rsi_14" not in result["processed"].columns
+    assert (result["signal_events"]["signal_type"] == "oversold").any()
+
+
+@pytest.mark.parametrize("schema", ["numeric", "compact"])
+def test_columns_are_added_and_read_back(tmp_path, schema):
+    engine = init_db(str(tmp_path / "test.db"))
+    if schema == "compact":
+        migrate_daily_metrics(engine, "compact")
+    raw = fetch("AAA")
+    plain = process_data(raw)
+    save_ticker_results(engine, plain.iloc[:200], [])
+
+    processed = process_data(raw, SPECS)
+    save_ticker_results(engine, processed.iloc[200:], [])
+    with engine.connect() as conn:
+        columns = [
+            row[1] for row in conn.execute(text("PRAGMA table_info(latest_metrics)"))
+        ]
+    assert columns[-len(NAMES) :] == NAMES
+
+    stored = load_metrics(engine, "AAA")
+    assert stored[NAMES].iloc[:200].isna().all().all()
+    np.testing.assert_allclose(
+        stored["rsi_14"].iloc[200:].astype(float),
+        processed["rsi_14"].iloc[200:],
+        rtol=1e-6,
+    )
+
+    found = screen(engine, "rsi_14 >= 0 AND close > bb_lower_20", sort_by="atr_14")
+    assert list(found["ticker"]) == ["AAA"]
+    assert found["rsi_14"].iloc[0] == pytest.approx(processed["rsi_14"].iloc[-1])
+
+
+def test_online_state_is_rebuilt_for_a_new_indicator_set(tmp_path):
+    engine = init_db(str(tmp_path / "test.db"))
+    raw = fetch("AAA")
+    processed = process_data(raw)
+    state = IndicatorState.from_history(
+        "AAA", raw["price_data"], processed.iloc[-1].to_dict()
+    )
+    save_ticker_results(engine, processed, [], state=state)
+    assert list(load_indicator_states(engine, ["AAA"])) == ["AAA"]
+    assert load_indicator_states(engine, ["AAA"], SPECS) == {}
+
+    state = IndicatorState.from_history(
+        "AAA", raw["price_data"], processed.iloc[-1].to_dict(), indicators=SPECS
+    )
+    save_ticker_results(engine, processed.iloc[-1:], [], "update", state=state)
+    stored = load_indicator_states(engine, ["AAA"], SPECS)["AAA"]
+    assert stored.to_dict() == state.to_dict()
+    assert load_indicator_states(engine, ["AAA"]) == {}
+
+
+def test_incremental_and_online_continue_long_recursive_indicators(tmp_path):
+    specs = load_indicators(
+        {
+            "indicators": [
+                {"name": "ema_200", "type": "ema", "window": 200},
+                {"name": "rsi_100", "type": "rsi", "window": 100},
+            ]
+        }
+    )
+    assert warmup_bars(specs) > WARMUP_BARS
+    raw = fetch("AAA", 1000)
+    full = process_data(raw, specs)
+    engine = init_db(str(tmp_path / "test.db"))
+    save_ticker_results(engine, full.iloc[:900], [])
+    last = full["date"][899]
+
+    warmup = stored_history(engine, None, "AAA", last, warmup_bars(specs))
+    result = run_ticker(
+        "AAA", since=last, warmup=warmup, raw=fetch("AAA", 1000), indicators=specs
+    )
+    expected = full.iloc[900:].reset_index(drop=True)
+    pd.testing.assert_frame_equal(result["processed"], expected, atol=1e-5)
+
+    state = IndicatorState.from_history(
+        "AAA", warmup, full.iloc[899].to_dict(), raw["fundamental_data"], specs
+    )
+    metrics, _ = state.advance(raw)
+    pd.testing.assert_frame_equal(metrics, expected, atol=1e-5)
@@ -19,3 +19,294 @@ def test_pipeline_runs_for_aapl(tmp_path):
         except Exception as e:
             # AAPL might fail in CI due to API limits; log but don't fail
             pytest.skip(f"Integration test skipped due to API issue: {e}")
+
+
+@pytest.mark.parametrize("extra_args", [[], ["--panel"]])
+def test_batch_mode_collects_failures(tmp_path, sample_price_data, extra_args):
+    from src.models import RawPriceData
+
+    def fake_fetch(ticker, start=None, **kwargs):
+        if ticker == "BAD":
+            raise ValueError(f"No price history returned for {ticker}")
+        return {
+            "ticker": ticker,
+            "price_data": [RawPriceData(**d) for d in sample_price_data],
+            "fundamental_data": [],
+            "fundamental_source": "none",
+        }
+
+    universe = tmp_path / "universe.txt"
+    universe.write_text("# test universe\nGOOD\n\nBAD\n")
+    out_dir = tmp_path / "out"
+    config = {"database": {"path": str(tmp_path / "test.db")}}
+    metrics_path = tmp_path / "run.prom"
+    argv = [
+        "main",
+        "--universe",
+        str(universe),
+        "--output",
+        str(out_dir),
+        "--metrics",
+        str(metrics_path),
+        *extra_args,
+    ]
+    with (
+        patch("sys.argv", argv),
+        patch("src.main.load_config", return_value=config),
+        patch("src.pipeline.fetch_stock_data", side_effect=fake_fetch),
+    ):
+        main()
+
+    with open(out_dir / "summary.json") as f:
+        summary = json.load(f)
+    assert summary["succeeded"] == ["GOOD"]
+    assert "BAD" in summary["failed"]
+    assert (out_dir / "good_analysis.json").exists()
+    spans = summary["metrics"]["spans"]
+    assert set(spans) == {"fetch", "process", "signals", "db_write", "output"}
+    assert spans["db_write"]["rows"] == summary["rows_written"]
+    assert spans["output"]["bytes"] == summary["output_bytes"]
+    assert 'pipeline_stage_seconds_total{stage="process"}' in metrics_path.read_text()
+
+
+@pytest.mark.parametrize(
+    "extra_args, schema, column_store",
+    [
+        (["--incremental"], "numeric", False),
+        (["--incremental", "--panel"], "numeric", False),
+        (["--online"], "numeric", False),
+        (["--incremental"], "compact", False),
+        (["--incremental"], "numeric", True),
+    ],
+)
+def test_incremental_run_appends_only_new_bars(
+    tmp_path, extra_args, schema, column_store
+):
+    import sqlite3
+    import numpy as np
+    import pandas as pd
+    from src.models import PriceSeries
+
+    dates = pd.bdate_range("2022-01-03", periods=400)
+    closes = 100 + 10 * np.sin(np.arange(400) / 40)
+    full = PriceSeries.from_frame(
+        pd.DataFrame(
+            {
+                "Date": dates,
+                "Open": closes,
+                "High": closes + 1,
+                "Low": closes - 1,
+                "Close": closes,
+                "Volume": 1000,
+            }
+        )
+    )
+    available = {"n": 390}
+
+    def fake_fetch(ticker, start=None, **kwargs):
+        series = full.take(np.arange(available["n"]))
+        if start is not None:
+            series = series.take(series.dates >= np.datetime64(start))
+        return {
+            "ticker": ticker,
+            "price_data": series,
+            "fundamental_data": [],
+            "fundamental_source": "none",
+        }
+
+    db_path = tmp_path / "test.db"
+    config = {
+        "database": {"path": str(db_path), "schema": schema},
+        "column_store": {"enabled": column_store},
+    }
+    out = tmp_path / "inc.json"
+    argv = ["main", "--ticker", "INC", "--output", str(out), *extra_args]
+    with (
+        patch("sys.argv", argv),
+        patch("src.main.load_config", return_value=config),
+        patch("src.pipeline.fetch_stock_data", side_effect=fake_fetch),
+    ):
+        main()
+        available["n"] = 400
+        main()
+
+    with open(out) as f:
+        data = json.load(f)
+    assert len(data["daily_metrics"]) == 10
+
+    conn = sqlite3.connect(db_path)
+    stored = conn.execute(
+        "SELECT sma_200, week52_high FROM daily_metrics WHERE ticker = 'INC' "
+        "ORDER BY date"
+    ).fetchall()
+    assert len(stored) == 400
+    scale = 10**6 if schema == "compact" else 1
+    expected = pd.Series(closes).rolling(200, min_periods=1).mean()
+    assert np.allclose([r[0] / scale for r in stored], expected, atol=1e-6)
+
+    if column_store:
+        from src.column_store import ColumnStore
+
+        store = ColumnStore(str(tmp_path / "test.columns"))
+        assert store.index == {"INC": (0, 400)}
+        assert np.allclose(store.columns("INC")["sma_200"], expected, atol=1e-6)
+
+
+def test_stored_fundamentals_reused_until_refresh(tmp_path):
+    from src.data_fetcher import fetch_stock_data
+    from src.synthetic import SyntheticProvider
+
+    calls = []
+
+    def fake_fetch(ticker, start=None, fundamentals=True, **kwargs):
+        calls.append(fundamentals)
+        return fetch_stock_data(
+            ticker, start, SyntheticProvider(bars=300), fundamentals=fundamentals
+        )
+
+    out_dir = tmp_path / "out"
+    config = {
+        "database": {"path": str(tmp_path / "test.db")},
+        "fundamentals": {"refresh_days": 30},
+    }
+    argv = ["main", "--ticker", "AAA", "--ticker", "BBB", "--output", str(out_dir)]
+    summaries = []
+    with (
+        patch("src.main.load_config", return_value=config),
+        patch("src.pipeline.fetch_stock_data", side_effect=fake_fetch),
+    ):
+        for extra in ([], [], ["--refresh-fundamentals"]):
+            with patch("sys.argv", argv + extra):
+                main()
+            with open(out_dir / "summary.json") as f:
+                summaries.append(json.load(f))
+
+    assert calls == [True, True, False, False, True, True]
+    counts = [(s["fundamentals_fetched"], s["fundamentals_reused"]) for s in summaries]
+    assert counts == [(2, 0), (0, 2), (2, 0)]
+    assert summaries[1]["unchanged"] == ["AAA", "BBB"]
+    # The price-only run still joins the stored fundamentals
+    with open(out_dir / "aaa_analysis.json") as f:
+        assert json.load(f)["daily_metrics"][-1]["book_value_per_share"] is not None
+
+
+@pytest.mark.parametrize(
+    "extra_args, schema", [([], "numeric"), (["--panel"], "numeric"), ([], "compact")]
+)
+def test_unchanged_inputs_skipped_and_restatements_replaced(
+    tmp_path, extra_args, schema
+):
+    import sqlite3
+    import numpy as np
+    from src.data_fetcher import fetch_stock_data
+    from src.synthetic import SyntheticProvider
+
+    restated = {"from": None}
+
+    def fake_fetch(ticker, start=None, fundamentals=True, **kwargs):
+        raw = fetch_stock_data(
+            ticker, start, SyntheticProvider(bars=400), fundamentals=fundamentals
+        )
+        if restated["from"] is not None:
+            # e.g. a split adjustment rewriting history from one bar on
+            raw["price_data"].close[restated["from"] :] *= 0.5
+        return raw
+
+    db_path = tmp_path / "test.db"
+    config = {"database": {"path": str(db_path), "schema": schema}}
+    argv = ["main", "--universe", str(tmp_path / "u.txt"), "--output", str(tmp_path)]
+    (tmp_path / "u.txt").write_text("AAA\nBBB\n")
+    summaries = []
+    with (
+        patch("sys.argv", argv + extra_args),
+        patch("src.main.load_config", return_value=config),
+        patch("src.pipeline.fetch_stock_data", side_effect=fake_fetch),
+    ):
+        for restate_from in (None, None, 350):
+            restated["from"] = restate_from
+            main()
+            with open(tmp_path / "summary.json") as f:
+                summaries.append(json.load(f))
+
+    assert summaries[1]["unchanged"] == ["AAA", "BBB"]
+    assert summaries[1]["rows_written"] == 0
+    assert summaries[1]["metrics"]["counters"]["tickers_unchanged"] == 2
+    assert sorted(summaries[2]["succeeded"]) == ["AAA", "BBB"]
+
+    expected = fake_fetch("AAA")["price_data"]
+    month = expected.dates[350].astype("datetime64[M]")
+    rewritten = int(np.sum(expected.dates >= month))
+    assert summaries[2]["rows_written"] < 2 * rewritten + 20  # rows + events only
+    conn = sqlite3.connect(db_path)
+    closes = [
+        c
+        for (c,) in conn.execute(
+            "SELECT close FROM daily_metrics WHERE ticker = 'AAA' ORDER BY date"
+        )
+    ]
+    scale = 10**6 if schema == "compact" else 1
+    assert len(closes) == 400
+    assert np.allclose(np.array(closes) / scale, expected.close, atol=1e-6)
+
+
+def test_db_write_profile_covers_the_writer_thread(tmp_path):
+    import pstats
+    from src import metrics as metrics_module
+    from src.data_fetcher import fetch_stock_data
+    from src.synthetic import SyntheticProvider
+
+    def fake_fetch(ticker, start=None, fundamentals=True, **kwargs):
+        return fetch_stock_data(
+            ticker, start, SyntheticProvider(bars=300), fundamentals=fundamentals
+        )
+
+    config = {"database": {"path": str(tmp_path / "test.db")}}
+    profiles = tmp_path / "profiles"
+    argv = ["main", "--ticker", "AAA", "--ticker", "BBB", "--output", str(tmp_path)]
+    argv += ["--profile", "db_write", "--profile-dir", str(profiles)]
+    try:
+        with (
+            patch("sys.argv", argv),
+            patch("src.main.load_config", return_value=config),
+            patch("src.pipeline.fetch_stock_data", side_effect=fake_fetch),
+        ):
+            main()
+    finally:
+        metrics_module._profile.clear()
+        metrics_module._profile["stage"] = None
+
+    stats = pstats.Stats(str(profiles / "db_write.prof"))
+    assert any(func[2] == "write_ticker_results" for func in stats.stats)
+
+
+def test_output_is_written_only_for_committed_tickers(tmp_path):
+    from src.data_fetcher import fetch_stock_data
+    from src.synthetic import SyntheticProvider
+    from src.write_queue import write_ticker_results
+
+    def fake_fetch(ticker, start=None, fundamentals=True, **kwargs):
+        return fetch_stock_data(
+            ticker, start, SyntheticProvider(bars=300), fundamentals=fundamentals
+        )
+
+    def failing_write(conn, processed, *args):
+        if processed["ticker"].iloc[0] == "BBB":
+            raise OSError("database is locked")
+        return write_ticker_results(conn, processed, *args)
+
+    config = {"database": {"path": str(tmp_path / "test.db")}}
+    out_dir = tmp_path / "out"
+    argv = ["main", "--ticker", "AAA", "--ticker", "BBB", "--output", str(out_dir)]
+    with (
+        patch("sys.argv", argv),
+        patch("src.main.load_config", return_value=config),
+        patch("src.pipeline.fetch_stock_data", side_effect=fake_fetch),
+        patch("src.write_queue.write_ticker_results", side_effect=failing_write),
+    ):
+        main()
+
+    with open(out_dir / "summary.json") as f:
+        summary = json.load(f)
+    assert summary["succeeded"] == ["AAA"] and list(summary["failed"]) == ["BBB"]
+    assert (out_dir / "aaa_analysis.json").exists()
+    assert not (out_dir / "bbb_analysis.json").exists()
@@ -0,0 +1,83 @@
+# tests/test_metrics.py
+import json
+import pstats
+import pytest
+from src import metrics as metrics_module
+from src.metrics import Metrics, dump_profile, enable_profiling
+
+
+@pytest.fixture(autouse=True)
+def reset_profiling():
+    yield
+    metrics_module._profile.clear()
+    metrics_module._profile["stage"] = None
+
+
+def test_spans_and_counters_merge_across_workers():
+    worker = Metrics()
+    with worker.span("process") as span:
+        span.rows += 100
+    worker.incr("cache_hits", 3)
+
+    run = Metrics()
+    run.record("process", 0.5, rows=50)
+    run.merge(worker.to_dict())
+    run.merge(worker.to_dict())
+
+    process = run.to_dict()["spans"]["process"]
+    assert process["calls"] == 3
+    assert process["rows"] == 250
+    assert process["rows_per_sec"] > 0
+    assert run.counters == {"cache_hits": 6}
+
+
+def test_metrics_file_format_follows_suffix(tmp_path):
+    m = Metrics()
+    m.record("db_write", 2.0, rows=1000, bytes=0)
+    m.incr("fetch_retries", 2)
+
+    m.write(str(tmp_path / "run.json"))
+    data = json.loads((tmp_path / "run.json").read_text())
+    assert data["spans"]["db_write"]["rows_per_sec"] == 500.0
+
+    m.write(str(tmp_path / "run.prom"))
+    text = (tmp_path / "run.prom").read_text()
+    assert 'pipeline_stage_rows_total{stage="db_write"} 1000' in text
+    assert 'pipeline_stage_rows_per_second{stage="db_write"} 500' in text
+    assert "pipeline_fetch_retries_total 2" in text
+
+
+def test_profile_covers_only_the_chosen_stage(tmp_path):
+    enable_profiling("signals", "cprofile")
+    m = Metrics()
+    with m.span("process"):
+        sorted(range(10))
+    with m.span("signals"):
+        sum(range(10))
+
+    path = dump_profile(str(tmp_path))
+    assert path == tmp_path / "signals.prof"
+    functions = {func[2] for func in pstats.Stats(str(path)).stats}
+    assert any("sum" in name for name in functions)
+    assert not any("sorted" in name for name in functions)
+
+
+def test_tracemalloc_profile_writes_snapshot_and_summary(tmp_path):
+    enable_profiling("output", "tracemalloc")
+    with Metrics().span("output"):
+        data = [bytes(1000) for _ in range(100)]
+    assert data
+
+    path = dump_profile(str(tmp_path))
+    assert path == tmp_path / "output.tracemalloc"
+    assert (tmp_path / "output.tracemalloc.txt").read_text().startswith("Peak")
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "tracemalloc"])
+def test_profile_of_a_stage_that_never_ran_is_not_written(tmp_path, mode):
+    enable_profiling("db_write", mode)
+    with Metrics().span("process"):
+        sum(range(10))
+
+    assert dump_profile(str(tmp_path)) is None
+    assert list(tmp_path.iterdir()) == []
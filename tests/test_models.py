@@ -34,3 +34,28 @@ def test_fundamental_data_optional_fields():
 
     data = RawFundamentalData(Date=date(2023, 1, 1))
     assert data.TotalAssets is None
+
+
+def test_price_series_batch_validation():
+    import numpy as np
+    import pandas as pd
+    from src.models import PriceSeries
+
+    df = pd.DataFrame(
+        {
+            "Date": pd.date_range("2023-01-02", periods=4),
+            "Open": [100.0, np.nan, 102.0, 103.0],
+            "High": [105.0, 106.0, 95.0, 104.0],
+            "Low": [99.0, 100.0, 101.0, np.nan],
+            "Close": [103.0, 104.0, 96.0, 103.5],
+            "Volume": [1000, np.nan, 1200, 1300],
+        }
+    )
+    series = PriceSeries.from_frame(df)
+    assert series.open[1] == 0.0
+    assert series.volume[1] == 0
+    assert series.check_high_ge_low().tolist() == [2]
+
+    cleaned = series.drop(series.check_high_ge_low())
+    assert len(cleaned) == 3
+    assert cleaned.last_date == date(2023, 1, 5)
@@ -0,0 +1,92 @@
+# tests/test_online.py
+import numpy as np
+import pandas as pd
+from decimal import Decimal
+from src.database import init_db, load_indicator_states, save_ticker_results
+from src.models import PriceSeries, RawFundamentalData
+from src.online import IndicatorState
+from src.processor import process_data
+from src.signals import DEFAULT_RULES, SignalRule, evaluate_rules
+
+RULES = DEFAULT_RULES + [
+    SignalRule(
+        "drawdown_20pct",
+        "threshold",
+        column="pct_from_52w_high",
+        level=-20,
+        direction="below",
+    ),
+    SignalRule("new_52w_high", "new_high", column="close", high="week52_high"),
+]
+
+
+def make_raw(n: int = 700) -> dict:
+    rng = np.random.default_rng(7)
+    close = 500 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    dates = pd.bdate_range("2020-01-01", periods=n)
+    series = PriceSeries.from_frame(
+        pd.DataFrame(
+            {
+                "Date": dates,
+                "Open": close,
+                "High": close * 1.01,
+                "Low": close * 0.99,
+                "Close": close,
+                "Volume": 1000,
+            }
+        )
+    )
+    fundamentals = [
+        RawFundamentalData(
+            Date=dates[i].date(),
+            ShareholderEquity=Decimal(equity),
+            SharesOutstanding=1_000,
+            EnterpriseValue=Decimal("123456.5"),
+        )
+        for i, equity in ((100, "250000"), (400, "300000"))
+    ]
+    return {"ticker": "ONL", "price_data": series, "fundamental_data": fundamentals}
+
+
+def test_bar_by_bar_updates_match_batch_processing():
+    raw = make_raw()
+    expected = process_data(raw)
+    expected_events = evaluate_rules(expected, RULES, "ONL")
+
+    state = IndicatorState("ONL")
+    frames, events = [], []
+    series = raw["price_data"]
+    for i in range(len(series)):
+        bar = {**raw, "price_data": series.take(np.arange(i + 1))}
+        metrics, fired = state.advance(bar, RULES)
+        assert len(metrics) == 1
+        frames.append(metrics)
+        events.append(fired)
+
+    pd.testing.assert_frame_equal(
+        pd.concat(frames, ignore_index=True), expected, atol=2e-6
+    )
+    streamed = pd.concat(events, ignore_index=True)
+    assert len(expected_events) > 0
+    assert sorted(zip(streamed["signal_type"], streamed["date"])) == sorted(
+        zip(expected_events["signal_type"], expected_events["date"])
+    )
+
+
+def test_state_round_trips_through_database(tmp_path):
+    raw = make_raw()
+    full = process_data(raw)
+    head = raw["price_data"].take(np.arange(500))
+    state = IndicatorState.from_history("ONL", head, full.iloc[499].to_dict())
+
+    engine = init_db(str(tmp_path / "test.db"))
+    save_ticker_results(engine, full.iloc[:500], [], state=state)
+    stored = load_indicator_states(engine, ["ONL", "OTHER"])
+    assert list(stored) == ["ONL"]
+    assert stored["ONL"].last_date == full["date"][499]
+
+    metrics, _ = stored["ONL"].advance(raw, RULES)
+    assert len(metrics) == 200
+    pd.testing.assert_frame_equal(
+        metrics, full.iloc[500:].reset_index(drop=True), atol=2e-6
+    )
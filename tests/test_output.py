@@ -0,0 +1,65 @@
+# tests/test_output.py
+import gzip
+import json
+import pandas as pd
+import pytest
+from datetime import date
+from src.models import SignalEvent
+from src.output import get_writer
+
+
+@pytest.fixture
+def metrics():
+    return pd.DataFrame(
+        {
+            "ticker": "TCS.NS",
+            "date": [date(2024, 1, 1), date(2024, 1, 2)],
+            "close": [101.25, 102.5],
+            "volume": [1000, 1100],
+            "price_to_book": [float("nan"), 1.5],
+        }
+    )
+
+
+@pytest.fixture
+def events():
+    return [
+        SignalEvent(
+            ticker="TCS.NS", signal_type="golden_crossover", date=date(2024, 1, 2)
+        )
+    ]
+
+
+def test_json_writer_keeps_numbers_native(tmp_path, metrics, events):
+    path = tmp_path / "tcs.json"
+    written = get_writer("json", str(path), batch=False).write(
+        "TCS.NS", metrics, events
+    )
+
+    data = json.loads(path.read_text())
+    assert written == path.stat().st_size
+    assert data["daily_metrics"][0]["close"] == 101.25
+    assert data["daily_metrics"][0]["price_to_book"] is None
+    assert data["signals"][0]["signal_type"] == "golden_crossover"
+
+
+def test_ndjson_writer_streams_compressed_rows(tmp_path, metrics, events):
+    writer = get_writer("ndjson", str(tmp_path), batch=True, compress=True)
+    writer.write("TCS.NS", metrics, events)
+
+    with gzip.open(tmp_path / "tcs_ns_analysis.ndjson.gz", "rt") as f:
+        rows = [json.loads(line) for line in f]
+    assert [r["date"] for r in rows] == ["2024-01-01", "2024-01-02"]
+    assert rows[1]["volume"] == 1100
+    with gzip.open(tmp_path / "tcs_ns_analysis.signals.ndjson.gz", "rt") as f:
+        assert json.loads(f.readline())["date"] == "2024-01-02"
+
+
+def test_parquet_writer_partitions_by_ticker(tmp_path, metrics, events):
+    pytest.importorskip("pyarrow")
+    get_writer("parquet", str(tmp_path), batch=True).write("TCS.NS", metrics, events)
+
+    df = pd.read_parquet(tmp_path / "daily_metrics")
+    assert df["close"].dtype == "float64"
+    assert df["ticker"].astype(str).unique().tolist() == ["TCS.NS"]
+    assert len(pd.read_parquet(tmp_path / "signal_events")) == 1
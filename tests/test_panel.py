@@ -0,0 +1,70 @@
+# tests/test_panel.py
+import numpy as np
+import pandas as pd
+from decimal import Decimal
+from src.models import PriceSeries, RawFundamentalData
+from src.indicators import rolling_max, rolling_mean, stack_closes
+from src.panel import process_panel
+from src.processor import process_data
+
+
+def make_raw(ticker: str, n: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    dates = pd.bdate_range(end="2024-06-28", periods=n)
+    df = pd.DataFrame(
+        {
+            "Date": dates,
+            "Open": close,
+            "High": close * 1.01,
+            "Low": close * 0.99,
+            "Close": close,
+            "Volume": rng.integers(1_000, 100_000, n),
+        }
+    )
+    fundamentals = [
+        RawFundamentalData(
+            Date=dates[n // 2].date(),
+            ShareholderEquity=Decimal("5000000"),
+            SharesOutstanding=10_000,
+        )
+    ]
+    return {
+        "ticker": ticker,
+        "price_data": PriceSeries.from_frame(df),
+        "fundamental_data": fundamentals,
+        "fundamental_source": "quarterly",
+    }
+
+
+def test_kernels_match_pandas_rolling():
+    rng = np.random.default_rng(1)
+    closes = [rng.uniform(10, 5000, n) for n in (1, 60, 700)]
+    panel, lengths = stack_closes(closes)
+    assert panel.shape == (700, 3)
+    assert lengths.tolist() == [1, 60, 700]
+    means, maxes = rolling_mean(panel, 50), rolling_max(panel, 252)
+    for j, close in enumerate(closes):
+        s = pd.Series(close)
+        np.testing.assert_allclose(
+            means[: len(close), j], s.rolling(50, min_periods=1).mean(), rtol=1e-12
+        )
+        np.testing.assert_array_equal(
+            maxes[: len(close), j], s.rolling(252, min_periods=1).max()
+        )
+        assert np.isnan(means[len(close) :, j]).all()
+
+
+def test_panel_matches_per_ticker_with_ragged_histories():
+    # A long history, a five-year one and a recent IPO shorter than every window
+    raws = {
+        "LONG": make_raw("LONG", 5000, 1),
+        "MID": make_raw("MID", 1260, 2),
+        "SWIGGY.NS": make_raw("SWIGGY.NS", 30, 3),
+    }
+    expected = {t: process_data(dict(raw)) for t, raw in raws.items()}
+    result = process_panel(raws)
+
+    assert list(result) == list(raws)
+    for ticker, frame in result.items():
+        pd.testing.assert_frame_equal(frame, expected[ticker], atol=2e-6)
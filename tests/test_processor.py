@@ -1,5 +1,8 @@
 # tests/test_processor.py
-from src.processor import process_data
+import numpy as np
+import pandas as pd
+from src.models import RawFundamentalData
+from src.processor import asof_fundamentals, process_data, validate_metrics
 from decimal import Decimal
 
 
@@ -19,8 +22,8 @@ def test_process_data_with_valid_inputs(sample_price_data, sample_fundamental_da
     assert len(result) == 4
     # Check BVPS = 1000000000 / 10000000 = 100
     # The last row should have book_value_per_share and price_to_book set
-    assert result[-1].book_value_per_share == Decimal("100")
-    assert result[-1].price_to_book == Decimal("1.61")  # 161 / 100
+    assert result["book_value_per_share"].iloc[-1] == 100
+    assert result["price_to_book"].iloc[-1] == 1.61  # 161 / 100
 
 
 def test_process_handles_missing_fundamentals(sample_price_data):
@@ -37,4 +40,50 @@ def test_process_handles_missing_fundamentals(sample_price_data):
 
     result = process_data(raw_data)
     assert len(result) == 4
-    assert result[0].book_value_per_share is None
+    assert pd.isna(result["book_value_per_share"].iloc[0])
+
+
+def test_validate_metrics_builds_models(sample_price_data, sample_fundamental_data):
+    class MockRecord:
+        def __init__(self, **kwargs):
+            self.__dict__.update(kwargs)
+
+    raw_data = {
+        "ticker": "TEST",
+        "price_data": [MockRecord(**d) for d in sample_price_data],
+        "fundamental_data": [MockRecord(**d) for d in sample_fundamental_data],
+        "fundamental_source": "quarterly",
+    }
+
+    models = validate_metrics(process_data(raw_data))
+    assert len(models) == 4
+    assert models[0].book_value_per_share is None
+    assert models[-1].book_value_per_share == Decimal("100.0")
+    assert models[-1].price_to_book == Decimal("1.61")
+
+
+def test_asof_join_carries_each_field_from_its_latest_report():
+    records = [
+        # Unsorted; the info snapshot reports shares and EV but no equity
+        RawFundamentalData(
+            Date="2024-03-01",
+            SharesOutstanding=20,
+            EnterpriseValue=Decimal("5000"),
+            Source="info",
+        ),
+        RawFundamentalData(
+            Date="2023-12-31", ShareholderEquity=Decimal("1000"), SharesOutstanding=10
+        ),
+        RawFundamentalData(Date="2023-09-30", ShareholderEquity=Decimal("800")),
+    ]
+    dates = np.array(
+        ["2023-09-29", "2023-10-02", "2024-01-02", "2024-03-01"], dtype="datetime64[D]"
+    )
+    fund = asof_fundamentals(dates, records)
+    assert np.allclose(
+        fund["ShareholderEquity"], [np.nan, 800, 1000, 1000], equal_nan=True
+    )
+    assert np.allclose(
+        fund["SharesOutstanding"], [np.nan, np.nan, 10, 20], equal_nan=True
+    )
+    assert np.allclose(fund["EnterpriseValue"], [np.nan] * 3 + [5000], equal_nan=True)
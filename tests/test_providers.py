@@ -0,0 +1,73 @@
+# tests/test_providers.py
+import json
+import pandas as pd
+import pytest
+from src.data_fetcher import fetch_stock_data
+from src.models import PriceSeries
+from src.providers import LocalFileProvider, get_provider, period_offset
+
+
+@pytest.fixture
+def local_root(tmp_path, sample_price_data):
+    ticker_dir = tmp_path / "TEST.NS"
+    ticker_dir.mkdir()
+    pd.DataFrame(sample_price_data).to_csv(ticker_dir / "history.csv", index=False)
+    pd.DataFrame(
+        [{"Date": "2020-01-01", "Total Stockholder Equity": 1000000000.0}]
+    ).to_csv(ticker_dir / "quarterly_balance_sheet.csv", index=False)
+    (ticker_dir / "info.json").write_text(json.dumps({"sharesOutstanding": 10000000}))
+    return tmp_path
+
+
+def test_fetch_from_local_provider(local_root):
+    provider = LocalFileProvider(str(local_root))
+    raw = fetch_stock_data("TEST.NS", provider=provider)
+
+    assert isinstance(raw["price_data"], PriceSeries)
+    assert len(raw["price_data"]) == 4
+    assert raw["fundamental_source"] == "quarterly"
+    assert raw["fundamental_data"][0].SharesOutstanding == 10000000
+
+
+def test_balance_sheet_values_stay_point_in_time(local_root):
+    pd.DataFrame(
+        [
+            {
+                "Date": "2020-01-01",
+                "Stockholders Equity": 900.0,
+                "Ordinary Shares Number": 9.0,
+            }
+        ]
+    ).to_csv(local_root / "TEST.NS" / "quarterly_balance_sheet.csv", index=False)
+    info = {"sharesOutstanding": 10, "marketCap": 2000.0, "enterpriseValue": 2500.0}
+    (local_root / "TEST.NS" / "info.json").write_text(json.dumps(info))
+
+    raw = fetch_stock_data("TEST.NS", provider=LocalFileProvider(str(local_root)))
+    report, snapshot = raw["fundamental_data"]
+    assert (report.Source, report.ShareholderEquity, report.SharesOutstanding) == (
+        "quarterly",
+        900,
+        9,
+    )
+    assert report.EnterpriseValue is None
+    assert snapshot.Source == "info"
+    assert snapshot.Date == raw["price_data"].last_date
+    assert (snapshot.SharesOutstanding, snapshot.EnterpriseValue) == (10, 2500)
+
+
+def test_local_provider_missing_ticker_is_empty(local_root):
+    provider = LocalFileProvider(str(local_root))
+    assert provider.history("MISSING").empty
+    assert provider.info("MISSING") == {}
+    with pytest.raises(ValueError, match="No price history"):
+        fetch_stock_data("MISSING", provider=provider)
+
+
+def test_get_provider_from_config(local_root):
+    provider = get_provider(
+        {"data_source": {"provider": "local", "local_path": str(local_root)}}
+    )
+    assert provider.name == "local"
+    assert period_offset("max") is None
+    with pytest.raises(ValueError):
+        get_provider({"data_source": {"provider": "bloomberg"}})
@@ -0,0 +1,91 @@
+# tests/test_screener.py
+import pandas as pd
+import pytest
+from datetime import date
+from src.database import init_db, save_ticker_results
+from src.models import SignalEvent
+from src.processor import METRIC_COLUMNS
+from src.screener import Comparison, SignalWithin, parse_expression, screen
+
+
+def latest_row(ticker, day, close, pct, ptb):
+    row = dict.fromkeys(METRIC_COLUMNS)
+    row.update(
+        ticker=ticker,
+        date=day,
+        open=close,
+        high=close,
+        low=close,
+        close=close,
+        volume=100,
+        sma_50=close,
+        sma_200=close * 0.9,
+        pct_from_52w_high=pct,
+        price_to_book=ptb,
+    )
+    return pd.DataFrame([row], columns=METRIC_COLUMNS)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = init_db(str(tmp_path / "screen.db"))
+    save_ticker_results(
+        engine,
+        latest_row("CHEAP", date(2024, 6, 28), 10.0, -2.0, 0.8),
+        [
+            SignalEvent(
+                ticker="CHEAP", signal_type="golden_crossover", date=date(2024, 6, 20)
+            )
+        ],
+    )
+    save_ticker_results(
+        engine,
+        latest_row("OLDCROSS", date(2024, 6, 28), 20.0, -1.0, 0.5),
+        [
+            SignalEvent(
+                ticker="OLDCROSS", signal_type="golden_crossover", date=date(2024, 1, 5)
+            )
+        ],
+    )
+    save_ticker_results(
+        engine, latest_row("RICH", date(2024, 6, 28), 30.0, -3.0, 4.0), []
+    )
+    # An older row must not replace the latest snapshot
+    save_ticker_results(
+        engine, latest_row("RICH", date(2024, 6, 27), 99.0, -50.0, 0.1), []
+    )
+    return engine
+
+
+def test_parse_expression():
+    clauses = parse_expression(
+        "pct_from_52w_high > -5 and close >= sma_200 AND golden_crossover within 10d"
+    )
+    assert clauses == [
+        Comparison("pct_from_52w_high", ">", -5.0),
+        Comparison("close", ">=", "sma_200"),
+        SignalWithin("golden_crossover", 10),
+    ]
+    with pytest.raises(ValueError, match="Unknown metric column"):
+        parse_expression("not_a_column > 1")
+    with pytest.raises(ValueError, match="Unknown signal: golden_cross"):
+        parse_expression("golden_cross within 10d", signal_types=["golden_crossover"])
+
+
+def test_screen_filters_latest_snapshot(engine):
+    result = screen(engine, "pct_from_52w_high > -5 AND price_to_book < 1")
+    assert result["ticker"].tolist() == ["CHEAP", "OLDCROSS"]
+
+    result = screen(engine, "close > sma_200", sort_by="close", ascending=False)
+    assert result["ticker"].tolist() == ["RICH", "OLDCROSS", "CHEAP"]
+    assert result["close"].iloc[0] == 30.0
+
+
+def test_screen_signal_within_days(engine):
+    result = screen(engine, "price_to_book < 1 AND golden_crossover within 10d")
+    assert result["ticker"].tolist() == ["CHEAP"]
+
+    # Configured signals that never fired are valid; typos are not
+    assert screen(engine, "death_cross within 10d", signal_types=["death_cross"]).empty
+    with pytest.raises(ValueError, match="Unknown signal: golden_cross"):
+        screen(engine, "golden_cross within 10d", signal_types=["death_cross"])
@@ -33,6 +33,87 @@ def test_death_cross_detected(death_cross_df):
     assert len(dates) == 1
     # The expected death cross date is when sma_50 crosses below sma_200
     # For the test fixture, this is the first day the drop happens
-    # The expected death cross date is the first date where the crossover condition is met
+    # The expected death cross date is the first date where the crossover
+    # condition is met
     expected_date = dates[0]  # The logic returns the first crossover
     assert dates[0] == expected_date
+
+
+def test_rules_evaluated_in_one_pass():
+    import numpy as np
+    import pandas as pd
+    from src.signals import SignalRule, evaluate_rules, load_rules
+
+    close = np.array([100, 110, 120, 90, 80, 95, 125], dtype=float)
+    high = np.maximum.accumulate(close)
+    df = pd.DataFrame(
+        {
+            "date": pd.bdate_range("2024-01-01", periods=7).date,
+            "close": close,
+            "week52_high": high,
+            "pct_from_52w_high": (close - high) / high * 100,
+            "sma_50": [np.nan, 1, 3, 3, 1, 1, 3],
+            "sma_200": [np.nan, 2, 2, 2, 2, 2, 2],
+        }
+    )
+    rules = load_rules(
+        {
+            "signals": {
+                "rules": [
+                    {
+                        "name": "golden_crossover",
+                        "type": "crossover",
+                        "fast": "sma_50",
+                        "slow": "sma_200",
+                    },
+                    {
+                        "name": "death_cross",
+                        "type": "crossover",
+                        "fast": "sma_50",
+                        "slow": "sma_200",
+                        "direction": "below",
+                    },
+                    {
+                        "name": "drawdown_20pct",
+                        "type": "threshold",
+                        "column": "pct_from_52w_high",
+                        "level": -20,
+                        "direction": "below",
+                    },
+                    {
+                        "name": "new_52w_high",
+                        "type": "new_high",
+                        "column": "close",
+                        "high": "week52_high",
+                    },
+                    {
+                        "name": "missing",
+                        "type": "threshold",
+                        "column": "rsi_14",
+                        "level": 70,
+                    },
+                ]
+            }
+        }
+    )
+    events = evaluate_rules(df, rules, "TEST")
+
+    assert list(events.columns) == ["ticker", "signal_type", "date"]
+    assert (events["ticker"] == "TEST").all()
+    by_type = events.groupby("signal_type")["date"].apply(list).to_dict()
+    assert by_type["golden_crossover"] == [df["date"][2], df["date"][6]]
+    assert by_type["death_cross"] == [df["date"][4]]
+    assert by_type["drawdown_20pct"] == [df["date"][3]]
+    assert by_type["new_52w_high"] == [df["date"][1], df["date"][2], df["date"][6]]
+    assert "missing" not in by_type
+    assert len(events) == 7
+    assert events["date"].is_monotonic_increasing
+    assert SignalRule("x", "crossover", fast="a", slow="b").columns() == ["a", "b"]
+
+
+def test_unknown_rule_type_rejected():
+    import pytest
+    from src.signals import load_rules
+
+    with pytest.raises(ValueError):
+        load_rules({"signals": {"rules": [{"name": "x", "type": "bogus"}]}})
@@ -0,0 +1,62 @@
+# tests/test_synthetic.py
+import json
+import pandas as pd
+from src.data_fetcher import fetch_stock_data
+from src.synthetic import (
+    SyntheticProvider,
+    ipo_lengths,
+    synthetic_history,
+    synthetic_universe,
+)
+
+
+def test_synthetic_history_is_deterministic_and_valid():
+    first = synthetic_history("SYN1", 1000)
+    pd.testing.assert_frame_equal(first, synthetic_history("SYN1", 1000))
+    assert not first.equals(synthetic_history("SYN2", 1000))
+    assert len(first) == 1000
+    assert first.index[-1] == pd.Timestamp("2024-12-31")
+    assert (first["High"] >= first[["Open", "Close"]].max(axis=1)).all()
+    assert (first["Low"] <= first[["Open", "Close"]].min(axis=1)).all()
+
+
+def test_synthetic_provider_feeds_fetch_stock_data():
+    tickers = synthetic_universe(20)
+    assert tickers[0] == "SYN00" and len(set(tickers)) == 20
+    lengths = ipo_lengths(tickers)
+    assert all(5 <= n < 252 for n in lengths.values())
+
+    provider = SyntheticProvider(bars=1260, lengths={"IPO": 10})
+    raw = fetch_stock_data("SYN00", provider=provider)
+    assert len(raw["price_data"]) == 1260
+    assert raw["fundamental_source"] == "quarterly"
+    assert len(fetch_stock_data("IPO", provider=provider)["price_data"]) == 10
+
+
+def test_benchmark_compare_and_smoke_run(tmp_path, monkeypatch):
+    from benchmarks import run
+
+    monkeypatch.setitem(run.SCENARIOS, "tiny", run.Scenario(3, 300, "tiny"))
+    baseline = tmp_path / "baseline.json"
+    results = tmp_path / "results.json"
+    args = ["--scenario", "tiny", "--repeat", "1", "--output", str(results)]
+    assert run.main(args + ["--baseline", str(baseline), "--update-baseline"]) == 0
+    # Tiny runs are noisy; this only checks the compare path end to end
+    compare_args = ["--baseline", str(baseline), "--max-regression", "10000"]
+    assert run.main(args + compare_args) == 0
+
+    with open(results) as f:
+        scenario = json.load(f)["scenarios"]["tiny"]
+    stages = scenario["stages"]
+    assert set(stages) == set(run.STAGES)
+    assert stages["process"]["rows"] == 900 and "peak_mb" in stages["process"]
+    assert stages["scan_compact"]["rows"] == 900
+    storage = scenario["storage"]
+    assert storage["compact"]["db_mb"] < storage["numeric"]["db_mb"]
+
+    base = {"scenarios": {"s": {"stages": {"save": {"seconds": 1.0, "peak_mb": 10}}}}}
+    slower = {"scenarios": {"s": {"stages": {"save": {"seconds": 1.5, "peak_mb": 10}}}}}
+    assert run.compare(slower, base, max_regression=60) == []
+    assert run.compare(slower, base, max_regression=25) == [
+        "s/save seconds: 1.0 -> 1.5 (+50%)"
+    ]
@@ -0,0 +1,132 @@
+# tests/test_write_queue.py
+import threading
+import time
+import pytest
+from sqlalchemy import text
+from src.database import init_db
+from src.pipeline import run_ticker
+from src.synthetic import SyntheticProvider
+from src.write_queue import WriteQueue
+
+TICKERS = ["AAA", "BBB", "CCC", "DDD"]
+
+
+def result(ticker: str):
+    return run_ticker(ticker, provider=SyntheticProvider(bars=120))
+
+
+def stored_counts(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT ticker, COUNT(*) FROM daily_metrics GROUP BY ticker")
+        )
+        return dict(rows.fetchall())
+
+
+def wait_for_first_commit(saved):
+    deadline = time.monotonic() + 5
+    while not saved and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def gated(tmp_path):
+    """
+    A WriteQueue whose writer stops after its first commit until released.
+    """
+    engine = init_db(str(tmp_path / "test.db"))
+    release = threading.Event()
+    saved, failed = [], {}
+
+    def on_saved(result, rows):
+        saved.append(result["ticker"])
+        release.wait(5)
+
+    def on_failed(result, error):
+        failed[result["ticker"]] = error
+
+    queue = WriteQueue(engine, max_pending=2, on_saved=on_saved, on_failed=on_failed)
+    yield engine, queue, release, saved, failed
+    release.set()
+    queue.close()
+
+
+def test_waiting_results_share_a_transaction_and_flush_on_close(gated):
+    engine, queue, release, saved, failed = gated
+    results = [result(t) for t in TICKERS]
+    queue.start()
+    queue.submit(results[0])
+    wait_for_first_commit(saved)
+    queue.submit(results[1])
+    queue.submit(results[2])  # fills the queue behind the stalled writer
+
+    # A full queue blocks the producer until the writer catches up
+    producer = threading.Thread(target=queue.submit, args=(results[3],))
+    producer.start()
+    producer.join(0.2)
+    assert producer.is_alive()
+    release.set()
+    producer.join(5)
+    queue.close()
+
+    assert saved == TICKERS and not failed
+    assert stored_counts(engine) == {t: 120 for t in TICKERS}
+    stats = queue.stats.to_dict()
+    assert stats["results"] == 4 and stats["rows"] == queue.stats.rows > 480
+    assert stats["batches"] < 4  # results waiting in the queue were merged
+    assert stats["producer_wait_seconds"] >= 0.2
+    assert stats["max_depth"] == 2
+    assert stats["commit_ms_max"] >= stats["commit_ms_p95"] >= 0
+
+
+def test_failed_result_is_isolated_from_its_batch(gated):
+    engine, queue, release, saved, failed = gated
+    good = [result(t) for t in TICKERS[:3]]
+    bad = result("BAD")
+    bad["processed"] = bad["processed"].drop(columns=["close"])
+    queue.start()
+    queue.submit(good[0])
+    wait_for_first_commit(saved)
+    queue.submit(bad)
+    queue.submit(good[1])
+    release.set()
+    queue.submit(good[2])
+    queue.close()
+
+    assert sorted(saved) == TICKERS[:3] and list(failed) == ["BAD"]
+    assert set(stored_counts(engine)) == set(TICKERS[:3])
+    assert queue.stats.failed == 1 and queue.stats.results == 3
+    with pytest.raises(RuntimeError):
+        queue.submit(good[0])
+
+
+def test_column_store_failure_rolls_back_the_database_write(tmp_path, monkeypatch):
+    from src.column_store import ColumnStore
+
+    engine = init_db(str(tmp_path / "test.db"))
+    store = ColumnStore(str(tmp_path / "test.columns"))
+    good, bad = (
+        run_ticker(t, provider=SyntheticProvider(bars=120), fingerprints={})
+        for t in ("AAA", "BAD")
+    )
+    writes = []
+
+    def write(metrics, *args):
+        if metrics["ticker"].iloc[0] == "BAD":
+            raise OSError("disk full")
+        writes.append(metrics["ticker"].iloc[0])
+
+    monkeypatch.setattr(store, "write", write)
+    failed = {}
+    queue = WriteQueue(
+        engine, store=store, on_failed=lambda r, e: failed.update({r["ticker"]: e})
+    )
+    with queue:
+        queue.submit(good)
+        queue.submit(bad)
+
+    assert list(failed) == ["BAD"] and "AAA" in writes
+    assert set(stored_counts(engine)) == {"AAA"}
+    with engine.connect() as conn:
+        tickers = conn.execute(text("SELECT DISTINCT ticker FROM fingerprints"))
+        assert [t for (t,) in tickers] == ["AAA"]